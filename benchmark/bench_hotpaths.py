@@ -0,0 +1,175 @@
+"""
+热点路径微基准测试（完全离线）
+
+覆盖地址/钱包生成、私钥解析与交易签名（原生币和ERC20）、链与代币配置查找、地址校验。
+结果写入JSON，并与保存的基线对比，任一项变慢超过阈值时以非0状态退出。
+
+用法:
+    python benchmark/bench_hotpaths.py                      # 运行并与基线对比
+    python benchmark/bench_hotpaths.py --update-baseline    # 运行并覆盖基线
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from eth_account import Account
+from web3 import Web3
+from util.walletUtil import WalletUtil, ERC20_TRANSFER_ABI
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results.json')
+
+# 固定的测试私钥和地址，仅用于离线签名
+TEST_PRIVATE_KEY = "0x" + "42" * 32
+TEST_TO_ADDRESS = "0x8ba1f109551bD432803012645Ac136ddd64DBA72"
+TEST_SOL_ADDRESS = "4Nd1mBQtrMJVYVfKf2PJy9NZUZdTAsp7D4xWLs4gDB4T"
+USDC_ETHEREUM = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+
+
+def build_cases(wallet_util):
+    """构建基准用例：名称 -> 无参可调用对象"""
+    w3 = Web3()
+    contract = w3.eth.contract(address=USDC_ETHEREUM, abi=ERC20_TRANSFER_ABI)
+    native_tx = {
+        'nonce': 0,
+        'to': TEST_TO_ADDRESS,
+        'value': w3.to_wei('0.01', 'ether'),
+        'gas': 21000,
+        'gasPrice': 1_000_000_000,
+        'chainId': 1
+    }
+
+    def sign_native():
+        account = Account.from_key(TEST_PRIVATE_KEY)
+        return account.sign_transaction(native_tx)
+
+    def sign_erc20():
+        account = Account.from_key(TEST_PRIVATE_KEY)
+        transaction = contract.functions.transfer(TEST_TO_ADDRESS, 1_000_000).build_transaction({
+            'nonce': 0,
+            'gas': 100000,
+            'gasPrice': 1_000_000_000,
+            'chainId': 1
+        })
+        return account.sign_transaction(transaction)
+
+    return {
+        'generate_random_evm_address': wallet_util.generate_random_evm_address,
+        'generate_random_sol_address': wallet_util.generate_random_sol_address,
+        'generate_wallet_info': wallet_util.generate_wallet_info,
+        'account_from_key': lambda: Account.from_key(TEST_PRIVATE_KEY),
+        'sign_native_transfer': sign_native,
+        'sign_erc20_transfer': sign_erc20,
+        'validate_chain_and_token': lambda: wallet_util._validate_chain_and_token("Arbitrum One", "USDC"),
+        'validate_evm_address': lambda: wallet_util._validate_address(TEST_TO_ADDRESS, "Ethereum"),
+        'validate_sol_address': lambda: wallet_util._validate_address(TEST_SOL_ADDRESS, "Solana Mainnet"),
+    }
+
+
+def measure(func, min_time, repeats):
+    """
+    测量单次调用耗时
+
+    先自动确定每轮调用次数使一轮耗时不少于 min_time，再重复 repeats 轮，取每次调用耗时的中位数和最小值
+
+    Returns:
+        dict: {'median_us', 'min_us', 'loops'}
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops * 1e6)
+    return {'median_us': round(statistics.median(samples), 3), 'min_us': round(min(samples), 3), 'loops': loops}
+
+
+def compare(results, baseline, threshold):
+    """
+    与基线对比
+
+    Returns:
+        list: 变慢超过阈值的 (名称, 基线us, 当前us, 变化比例)
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = current['median_us'] / base['median_us'] - 1
+        if ratio > threshold:
+            regressions.append((name, base['median_us'], current['median_us'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="热点路径微基准测试")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="本次结果输出路径")
+    parser.add_argument('--threshold', type=float, default=0.25, help="允许的变慢比例，默认0.25即25%%")
+    parser.add_argument('--min-time', type=float, default=0.2, help="每轮最少耗时（秒）")
+    parser.add_argument('--repeats', type=int, default=5, help="重复轮数")
+    parser.add_argument('--only', nargs='*', help="只运行指定用例")
+    parser.add_argument('--update-baseline', action='store_true', help="用本次结果覆盖基线")
+    args = parser.parse_args(argv)
+
+    # 生成类方法每次调用都会打印INFO日志，基准测试时关闭
+    logging.getLogger("MyWalletTool").setLevel(logging.WARNING)
+
+    cases = build_cases(WalletUtil())
+    if args.only:
+        cases = {name: func for name, func in cases.items() if name in args.only}
+
+    results = {}
+    for name, func in cases.items():
+        results[name] = measure(func, args.min_time, args.repeats)
+        print(f"{name:<30} {results[name]['median_us']:>12.2f} us/op  (min {results[name]['min_us']:.2f}, loops {results[name]['loops']})")
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"基线已更新: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"基线文件不存在，跳过对比: {args.baseline}")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f).get('results', {})
+    regressions = compare(results, baseline, args.threshold)
+    for name, base_us, current_us, ratio in regressions:
+        print(f"[回归] {name}: {base_us:.2f} us -> {current_us:.2f} us (+{ratio:.0%})")
+    if regressions:
+        return 1
+    print(f"全部用例未超过 {args.threshold:.0%} 回归阈值")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
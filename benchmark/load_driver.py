@@ -0,0 +1,146 @@
+"""
+转账链路压测驱动
+
+在本地桩服务（或 --url 指定的节点）上以不同并发度执行 _transfer_evm / _transfer_solana，
+报告每秒转账数和 p50/p99 延迟。
+
+用法:
+    python benchmark/load_driver.py --chain evm --transfers 200 --concurrency 1 4 16
+    python benchmark/load_driver.py --chain solana --latency-ms 30 --rate-429 0.05
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from solders.keypair import Keypair
+from util.walletUtil import WalletUtil
+from stub_rpc import StubRpcServer, STUB_CHAIN_ID
+
+TEST_PRIVATE_KEY = "0x" + "42" * 32
+TEST_TO_ADDRESS = "0x8ba1f109551bD432803012645Ac136ddd64DBA72"
+
+
+def percentile(sorted_values, pct):
+    """已排序列表的百分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def make_evm_task(wallet_util, url, coin):
+    chain_info = {"chainName": "Stub EVM", "chain_id": str(STUB_CHAIN_ID), "rpc": url}
+    if coin == "native":
+        token_info = {"coinName": "ETH", "contractAddress": "0x" + "00" * 20, "decimals": 18, "isNative": True}
+    else:
+        token_info = {"coinName": "USDC", "contractAddress": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",
+                      "decimals": 6, "isNative": False}
+    counter = itertools.count(1)
+
+    def task(index):
+        # 桩服务不校验nonce，每笔金额不同以保证交易哈希唯一
+        amount = f"0.{next(counter):06d}"
+        return wallet_util._transfer_evm(TEST_PRIVATE_KEY, TEST_TO_ADDRESS, chain_info, token_info,
+                                         amount, token_info["coinName"])
+    return task
+
+
+def make_solana_task(wallet_util, url, coin):
+    keypair = str(Keypair.from_seed(bytes([7]) * 32))
+    receiver = str(Keypair.from_seed(bytes([8]) * 32).pubkey())
+    if coin == "native":
+        token_info = {"coinName": "SOL", "contractAddress": "So11111111111111111111111111111111111111112",
+                      "decimals": 9, "isNative": True}
+    else:
+        token_info = {"coinName": "USDC", "contractAddress": "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",
+                      "decimals": 6, "isNative": False}
+    counter = itertools.count(1)
+
+    def task(index):
+        # 每笔金额不同，保证签名（即交易ID）唯一
+        amount = f"0.{next(counter):06d}"
+        return wallet_util._transfer_solana(keypair, receiver, token_info, amount, rpc_url=url)
+    return task
+
+
+def run_level(task, transfers, concurrency):
+    """以指定并发度执行 transfers 笔转账"""
+    latencies = []
+    failures = 0
+
+    def timed(index):
+        start = time.perf_counter()
+        result = task(index)
+        return time.perf_counter() - start, result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, result in pool.map(timed, range(transfers)):
+            latencies.append(elapsed)
+            if not result.get("success"):
+                failures += 1
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "transfers": transfers,
+        "failures": failures,
+        "transfers_per_sec": round(transfers / wall, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="转账链路压测驱动")
+    parser.add_argument("--chain", choices=["evm", "solana"], default="evm")
+    parser.add_argument("--coin", choices=["native", "token"], default="native")
+    parser.add_argument("--transfers", type=int, default=100, help="每个并发度执行的转账笔数")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--url", help="使用已运行的节点/桩服务，不指定则在进程内启动桩服务")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rps-limit", type=float, default=0.0, help="桩服务每秒请求数上限")
+    parser.add_argument("--output", help="结果JSON输出路径")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("MyWalletTool").setLevel(logging.CRITICAL)
+    server = None
+    url = args.url
+    if url is None:
+        server = StubRpcServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                               error_rate=args.error_rate, rate_429=args.rate_429,
+                               rps_limit=args.rps_limit).start()
+        url = server.url
+
+    wallet_util = WalletUtil()
+    make_task = make_evm_task if args.chain == "evm" else make_solana_task
+    task = make_task(wallet_util, url, args.coin)
+    report = []
+    try:
+        for concurrency in args.concurrency:
+            row = run_level(task, args.transfers, concurrency)
+            report.append(row)
+            print(f"并发 {row['concurrency']:>3}: {row['transfers_per_sec']:>8.2f} 笔/秒  "
+                  f"p50 {row['p50_ms']:>8.2f} ms  p99 {row['p99_ms']:>8.2f} ms  失败 {row['failures']}")
+    finally:
+        if server is not None:
+            print(f"桩服务调用统计: {json.dumps(server.state.calls, ensure_ascii=False)}")
+            server.stop()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"chain": args.chain, "coin": args.coin, "url": url, "levels": report}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
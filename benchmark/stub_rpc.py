@@ -0,0 +1,390 @@
+"""
+本地 EVM / Solana JSON-RPC 桩服务，用于在不消耗真实gas的情况下压测转账链路
+
+支持的方法：
+    EVM:    web3_clientVersion, net_version, eth_chainId, eth_blockNumber, eth_getTransactionCount,
+            eth_gasPrice, eth_getBalance, eth_call(balanceOf/transfer/allowance), eth_estimateGas（含
+            disperseEther/disperseToken）, eth_getBlockByNumber, eth_getLogs（ERC20 Transfer）,
+            eth_getCode（任意地址都有代码）, eth_sendRawTransaction, eth_getTransactionReceipt（含批量请求）
+    Solana: getLatestBlockhash, isBlockhashValid, getBlockHeight, sendTransaction, getAccountInfo, getBalance,
+            getMinimumBalanceForRentExemption, getMultipleAccounts, getSignatureStatuses,
+            getRecentPrioritizationFees, simulateTransaction
+
+可注入固定延迟/抖动、JSON-RPC错误、随机HTTP 429、每秒请求数上限和Solana交易丢弃；eth_getLogs 可模拟
+节点的查询区块范围和结果数上限。
+
+用法:
+    python benchmark/stub_rpc.py --port 8545 --latency-ms 20 --error-rate 0.01 --rate-429 0.02
+"""
+import sys
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import base58
+from eth_utils import keccak
+from solders.transaction import Transaction
+
+STUB_CHAIN_ID = 31337
+STUB_BLOCK_GAS_LIMIT = 30_000_000
+# eth_getCode 对任意地址返回的字节码（合约存在检查用）
+STUB_CODE = "0x6080604052"
+STUB_BLOCKHASH = base58.b58encode(hashlib.sha256(b"stub-blockhash").digest()).decode()
+TRANSFER_TOPIC = "0x" + keccak(text="Transfer(address,address,uint256)").hex()
+
+
+class StubState:
+    """桩服务的链状态与故障注入配置"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rate_429=0.0, confirm_delay=0.0,
+                 chain_id=STUB_CHAIN_ID, rps_limit=0.0, drop_rate=0.0, logs_per_block=0, logs_max_range=0,
+                 logs_max_results=10000):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.confirm_delay = confirm_delay
+        self.chain_id = chain_id
+        self.rps_limit = rps_limit
+        self.drop_rate = drop_rate
+        # eth_getLogs：每个区块每个代币合约生成的无关转账数、单次查询的区块范围上限（0为不限）和结果数上限
+        self.logs_per_block = logs_per_block
+        self.logs_max_range = logs_max_range
+        self.logs_max_results = logs_max_results
+        # 额外的转账日志 {"block", "address", "from", "to", "value"}，用于模拟转入指定地址的充值
+        self.transfer_logs = []
+        self.lock = threading.Lock()
+        self._window = (0, 0)
+        self.block_number = 1
+        self.sent = {}
+        self.calls = {}
+
+    def count(self, method):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+    def over_limit(self):
+        """按1秒固定窗口模拟节点限额，超出返回True"""
+        if not self.rps_limit:
+            return False
+        second = int(time.time())
+        with self.lock:
+            window, count = self._window
+            count = count + 1 if window == second else 1
+            self._window = (second, count)
+        return count > self.rps_limit
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            time.sleep((self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000.0)
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _evm_receipt(tx_hash, sent):
+    return {
+        "transactionHash": tx_hash,
+        "transactionIndex": "0x0",
+        "blockHash": "0x" + hashlib.sha256(tx_hash.encode()).hexdigest(),
+        "blockNumber": hex(sent["block"]),
+        "from": "0x" + "00" * 20,
+        "to": "0x" + "00" * 20,
+        "cumulativeGasUsed": "0x5208",
+        "gasUsed": "0x5208",
+        "effectiveGasPrice": "0x3b9aca00",
+        "contractAddress": None,
+        "logs": [],
+        "logsBloom": "0x" + "00" * 256,
+        "status": "0x1",
+        "type": "0x0",
+    }
+
+
+def _token_account():
+    data = bytes(64) + (10 ** 15).to_bytes(8, "little") + bytes(93)
+    return {"data": [base64.b64encode(data).decode(), "base64"], "executable": False, "lamports": 2039280,
+            "owner": "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA", "rentEpoch": 0, "space": 165}
+
+
+def _check_erc20_transfer(call):
+    """ERC20 transfer 到零地址时与 OpenZeppelin 合约一样 revert"""
+    data = call.get("data") or call.get("input") or ""
+    if data.startswith("0xa9059cbb") and int(data[10:74] or "0", 16) == 0:
+        raise RpcError(3, "execution reverted: ERC20: transfer to the zero address")
+
+
+# disperseEther(address[],uint256[]) / disperseToken(address,address[],uint256[])：gas按收款地址数线性增长
+_DISPERSE_GAS = {"0x" + keccak(text="disperseEther(address[],uint256[])")[:4].hex(): (132, 30000, 12000),
+                 "0x" + keccak(text="disperseToken(address,address[],uint256[])")[:4].hex(): (164, 40000, 32000)}
+_ALLOWANCE_SELECTOR = "0xdd62ed3e"
+
+
+def _estimate_gas(call):
+    data = call.get("data") or call.get("input") or ""
+    disperse = _DISPERSE_GAS.get(data[:10])
+    if disperse is not None:
+        header, base, per_recipient = disperse
+        return base + per_recipient * ((len(data) - 2) // 2 - header) // 64
+    return 52000 if data else 21000
+
+
+def _transfer_log(address, block, index, from_address, to_address, value):
+    return {"address": address, "blockNumber": hex(block), "logIndex": hex(index), "transactionIndex": hex(index),
+            "blockHash": "0x" + hashlib.sha256(str(block).encode()).hexdigest(),
+            "transactionHash": "0x" + hashlib.sha256(f"{address}{block}{index}".encode()).hexdigest(),
+            "topics": [TRANSFER_TOPIC, "0x" + from_address[2:].lower().rjust(64, "0"),
+                       "0x" + to_address[2:].lower().rjust(64, "0")],
+            "data": "0x" + hex(value)[2:].rjust(64, "0"), "removed": False}
+
+
+def _get_logs(state, params):
+    """按区块生成确定的 Transfer 日志（无关转账 + transfer_logs），支持 address 和 topics 过滤"""
+    query = params[0]
+    from_block, to_block = int(query["fromBlock"], 16), int(query["toBlock"], 16)
+    if state.logs_max_range and to_block - from_block + 1 > state.logs_max_range:
+        raise RpcError(-32005, f"block range is too large, max {state.logs_max_range} blocks")
+    addresses = query.get("address") or []
+    addresses = [addresses] if isinstance(addresses, str) else addresses
+    addresses = [address.lower() for address in addresses]
+    topics = query.get("topics") or []
+    wanted_to = topics[2] if len(topics) > 2 else None
+    wanted_to = {topic.lower() for topic in ([wanted_to] if isinstance(wanted_to, str) else wanted_to or [])}
+    logs = []
+
+    def add(log):
+        if wanted_to and log["topics"][2] not in wanted_to:
+            return
+        logs.append(log)
+        if len(logs) > state.logs_max_results:
+            raise RpcError(-32005, f"query returned more than {state.logs_max_results} results")
+
+    for block in range(from_block, to_block + 1):
+        for address in addresses:
+            for index in range(state.logs_per_block):
+                seed = hashlib.sha256(f"{address}{block}{index}".encode()).hexdigest()
+                add(_transfer_log(address, block, index, "0x" + seed[:40], "0x" + seed[24:64], int(seed[:8], 16)))
+    for index, extra in enumerate(state.transfer_logs):
+        if from_block <= extra["block"] <= to_block and extra["address"].lower() in addresses:
+            add(_transfer_log(extra["address"].lower(), extra["block"], 100000 + index, extra["from"], extra["to"],
+                              extra["value"]))
+    return logs
+
+
+def _solana_context(state):
+    return {"context": {"slot": state.block_number}}
+
+
+def handle_method(state, method, params):
+    """处理单个JSON-RPC方法，返回result或抛出RpcError"""
+    state.count(method)
+    # ---- EVM ----
+    if method == "web3_clientVersion":
+        return "MyWalletTool-stub/1.0"
+    if method == "net_version":
+        return str(state.chain_id)
+    if method == "eth_chainId":
+        return hex(state.chain_id)
+    if method == "eth_blockNumber":
+        return hex(state.block_number)
+    if method == "eth_gasPrice":
+        return hex(1_000_000_000)
+    if method == "eth_getBalance":
+        return hex(10 ** 24)
+    if method == "eth_call":
+        # 只模拟 balanceOf 和 transfer（返回非0即 true）；授权额度始终为0，分发代币前总会 approve
+        _check_erc20_transfer(params[0])
+        if (params[0].get("data") or params[0].get("input") or "").startswith(_ALLOWANCE_SELECTOR):
+            return "0x" + "00" * 32
+        return "0x" + hex(10 ** 30)[2:].rjust(64, "0")
+    if method == "eth_estimateGas":
+        _check_erc20_transfer(params[0])
+        return hex(_estimate_gas(params[0]))
+    if method == "eth_getBlockByNumber":
+        return {"number": hex(state.block_number), "hash": "0x" + hashlib.sha256(str(state.block_number).encode()).hexdigest(),
+                "parentHash": "0x" + "00" * 32, "gasLimit": hex(STUB_BLOCK_GAS_LIMIT), "gasUsed": "0x0",
+                "timestamp": hex(int(time.time())), "transactions": [], "baseFeePerGas": hex(1_000_000_000)}
+    if method == "eth_getLogs":
+        return _get_logs(state, params)
+    if method == "eth_getCode":
+        return STUB_CODE
+    if method == "eth_getTransactionCount":
+        return "0x0"
+    if method == "eth_sendRawTransaction":
+        raw = bytes.fromhex(params[0][2:] if params[0].startswith("0x") else params[0])
+        tx_hash = "0x" + keccak(raw).hex()
+        with state.lock:
+            if tx_hash in state.sent:
+                raise RpcError(-32000, "already known")
+            state.block_number += 1
+            state.sent[tx_hash] = {"block": state.block_number, "time": time.time()}
+        return tx_hash
+    if method == "eth_getTransactionByHash":
+        with state.lock:
+            sent = state.sent.get(params[0])
+        return None if sent is None else {"hash": params[0], "blockNumber": hex(sent["block"])}
+    if method == "eth_getTransactionReceipt":
+        with state.lock:
+            sent = state.sent.get(params[0])
+        if sent is None or time.time() - sent["time"] < state.confirm_delay:
+            return None
+        return _evm_receipt(params[0], sent)
+    # ---- Solana ----
+    if method == "getLatestBlockhash":
+        return {**_solana_context(state), "value": {"blockhash": STUB_BLOCKHASH,
+                                                    "lastValidBlockHeight": state.block_number + 150}}
+    if method == "isBlockhashValid":
+        return {**_solana_context(state), "value": True}
+    if method == "getBlockHeight":
+        return state.block_number
+    if method == "getBalance":
+        return {**_solana_context(state), "value": 10 ** 15}
+    if method == "getMinimumBalanceForRentExemption":
+        return 2039280
+    if method == "getMultipleAccounts":
+        # 所有账户都视为已存在、余额充足的 Token 账户
+        return {**_solana_context(state), "value": [_token_account() for _ in params[0]]}
+    if method == "getAccountInfo":
+        return {**_solana_context(state), "value": _token_account()}
+    if method == "getRecentPrioritizationFees":
+        # 最近150个slot的优先费，大部分为0，少数较高
+        return [{"slot": state.block_number - i, "prioritizationFee": 0 if i % 3 else (i % 50) * 1000}
+                for i in range(150)]
+    if method == "simulateTransaction":
+        # 每条指令按3000计算单元
+        txn = Transaction.from_bytes(base64.b64decode(params[0]))
+        return {**_solana_context(state), "value": {"err": None, "logs": [], "accounts": None,
+                                                    "unitsConsumed": 3000 * len(txn.message.instructions),
+                                                    "returnData": None}}
+    if method == "sendTransaction":
+        txn = Transaction.from_bytes(base64.b64decode(params[0]))
+        signature = str(txn.signatures[0])
+        with state.lock:
+            # 按 drop_rate 模拟拥堵时被丢弃的Solana交易（重新广播时再次判定）；重新广播已收到的交易不改变状态
+            if signature not in state.sent and not (state.drop_rate and random.random() < state.drop_rate):
+                state.block_number += 1
+                state.sent[signature] = {"block": state.block_number, "time": time.time()}
+        return signature
+    if method == "getSignatureStatuses":
+        statuses = []
+        now = time.time()
+        with state.lock:
+            for signature in params[0]:
+                sent = state.sent.get(signature)
+                if sent is None or now - sent["time"] < state.confirm_delay:
+                    statuses.append(None)
+                else:
+                    statuses.append({"slot": sent["block"], "confirmations": None, "err": None,
+                                     "status": {"Ok": None}, "confirmationStatus": "confirmed"})
+        return {**_solana_context(state), "value": statuses}
+    raise RpcError(-32601, f"Method not found: {method}")
+
+
+def handle_request(state, request):
+    """处理单个JSON-RPC请求对象"""
+    response = {"jsonrpc": "2.0", "id": request.get("id")}
+    if state.error_rate and random.random() < state.error_rate:
+        response["error"] = {"code": -32000, "message": "stub injected error"}
+        return response
+    try:
+        response["result"] = handle_method(state, request.get("method"), request.get("params") or [])
+    except RpcError as e:
+        response["error"] = {"code": e.code, "message": e.message}
+    return response
+
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"null")
+            state.delay()
+            if state.over_limit() or (state.rate_429 and random.random() < state.rate_429):
+                state.count("http_429")
+                self._reply(429, {"jsonrpc": "2.0", "id": None,
+                                  "error": {"code": -32005, "message": "Too many requests"}})
+                return
+            if isinstance(payload, list):
+                self._reply(200, [handle_request(state, request) for request in payload])
+            else:
+                self._reply(200, handle_request(state, payload))
+
+    return StubHandler
+
+
+class StubRpcServer:
+    """在后台线程中运行的桩服务"""
+
+    def __init__(self, host="127.0.0.1", port=0, **state_kwargs):
+        self.state = StubState(**state_kwargs)
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地 EVM / Solana JSON-RPC 桩服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每个HTTP请求的固定延迟")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="附加的随机延迟上限")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回JSON-RPC错误的概率")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="返回HTTP 429的概率")
+    parser.add_argument("--confirm-delay", type=float, default=0.0, help="交易发送后多少秒可查到回执")
+    parser.add_argument("--rps-limit", type=float, default=0.0, help="每秒请求数上限，超出返回HTTP 429")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Solana交易被丢弃（不上链）的概率")
+    parser.add_argument("--logs-per-block", type=int, default=0, help="eth_getLogs 每个区块每个代币生成的转账日志数")
+    parser.add_argument("--logs-max-range", type=int, default=0, help="eth_getLogs 单次查询的区块范围上限（0为不限）")
+    parser.add_argument("--logs-max-results", type=int, default=10000, help="eth_getLogs 单次查询的结果数上限")
+    args = parser.parse_args(argv)
+    server = StubRpcServer(args.host, args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           error_rate=args.error_rate, rate_429=args.rate_429, confirm_delay=args.confirm_delay,
+                           rps_limit=args.rps_limit, drop_rate=args.drop_rate, logs_per_block=args.logs_per_block,
+                           logs_max_range=args.logs_max_range, logs_max_results=args.logs_max_results)
+    print(f"桩服务已启动: {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,12 @@
 MyWalletTool 工具包
 """
 
-from .walletUtil import WalletUtil
+__all__ = ['WalletUtil']
 
-__all__ = ['WalletUtil'] 
\ No newline at end of file
+
+def __getattr__(name):
+    # WalletUtil 依赖 web3/solana，导入较慢；按需导入，只用到轻量模块（如转账日志）时不加载
+    if name == 'WalletUtil':
+        from .walletUtil import WalletUtil
+        return WalletUtil
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,241 @@
+import os
+import json
+import math
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_SCREEN_DB_PATH = os.path.join("data", "screening.db")
+
+# 命中等级：block 拒绝转账，warn 记录警告后继续
+LEVEL_BLOCK = "block"
+LEVEL_WARN = "warn"
+
+# 布隆过滤器误判率（误判只会多一次SQLite精确查询，不会漏判）
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+# 导入时每批写入的行数
+_INSERT_CHUNK = 10000
+# bech32 地址不区分大小写，统一转小写
+_BECH32_PREFIXES = ("bc1", "tb1", "ltc1", "cosmos1", "osmo1")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS screened_addresses (
+    address TEXT PRIMARY KEY,
+    level TEXT NOT NULL,
+    source TEXT NOT NULL,
+    chain TEXT,
+    tags TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS screen_bloom (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bit_count INTEGER NOT NULL,
+    hash_count INTEGER NOT NULL,
+    bits BLOB NOT NULL
+);
+"""
+
+
+def normalize_address(address: str) -> str:
+    """统一地址写法：EVM十六进制地址和 bech32 地址转小写，base58 地址区分大小写保持原样"""
+    address = address.strip()
+    lower = address.lower()
+    if lower.startswith("0x") or lower.startswith(_BECH32_PREFIXES):
+        return lower
+    return address
+
+
+class BloomFilter:
+    """位数组布隆过滤器（双重哈希），只判断“一定不在”或“可能在”"""
+
+    def __init__(self, bit_count: int, hash_count: int, bits: Optional[bytes] = None):
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.bits = bytearray(bits) if bits is not None else bytearray((bit_count + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE) -> "BloomFilter":
+        """按预计条目数和误判率计算位数和哈希函数个数"""
+        capacity = max(1, capacity)
+        bit_count = max(8, int(math.ceil(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2))))
+        hash_count = max(1, int(round(bit_count / capacity * math.log(2))))
+        return cls(bit_count, hash_count)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.bit_count
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class AddressScreen:
+    """
+    收款地址风险筛查索引
+
+    地址来源为 OKX 搜索导出文件（addressVoList，带 entityTags / isInteraction）和用户提供的黑名单，
+    精确集合保存在SQLite中，前面放一个布隆过滤器：绝大多数正常地址只做几次位运算即可放行，
+    只有布隆过滤器判断“可能在”时才查询SQLite确认。筛查上百万个地址也不需要把名单读进内存字典。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_SCREEN_DB_PATH):
+        """
+        打开筛查索引（不存在时创建）
+
+        Args:
+            db_path: SQLite数据库文件路径
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._bloom = self._load_bloom()
+
+    def import_okx_dump(self, path: str, level: str = LEVEL_WARN, rebuild: bool = True) -> int:
+        """
+        导入 OKX 搜索导出文件中的 addressVoList
+
+        Args:
+            path: 导出文件（JSON）
+            level: 命中等级
+            rebuild: 导入后重建布隆过滤器；连续导入多个文件时可以只在最后一次重建
+
+        Returns:
+            int: 导入的地址数
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        source = f"okx:{os.path.basename(path)}"
+
+        def rows():
+            for item in data.get("addressVoList") or []:
+                if not item.get("address"):
+                    continue
+                tags = {"entityTags": (item.get("newAddressTagsVo") or {}).get("entityTags") or [],
+                        "isInteraction": bool(item.get("isInteraction")), "addressType": item.get("addressType")}
+                yield normalize_address(item["address"]), level, source, item.get("blockChain"), json.dumps(tags)
+        return self._insert(rows(), rebuild)
+
+    def import_blocklist(self, path: str, level: str = LEVEL_BLOCK, rebuild: bool = True) -> int:
+        """
+        导入黑名单文件：每行 "地址[,原因]"，空行和 # 开头的行忽略
+
+        Args:
+            path: 黑名单文件
+            level: 命中等级
+            rebuild: 导入后重建布隆过滤器
+
+        Returns:
+            int: 导入的地址数
+        """
+        source = f"blocklist:{os.path.basename(path)}"
+
+        def rows():
+            with open(path, "r", encoding="utf-8-sig") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    address, _, reason = line.partition(",")
+                    tags = json.dumps({"reason": reason.strip()}, ensure_ascii=False) if reason.strip() else None
+                    yield normalize_address(address), level, source, None, tags
+        return self._insert(rows(), rebuild)
+
+    def rebuild_bloom(self, false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE) -> BloomFilter:
+        """导入完成后按当前地址数重建布隆过滤器（流式读取，不把地址读进内存）"""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM screened_addresses").fetchone()[0]
+            bloom = BloomFilter.for_capacity(count, false_positive_rate)
+            for (address,) in self._conn.execute("SELECT address FROM screened_addresses"):
+                bloom.add(address)
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO screen_bloom (id, bit_count, hash_count, bits) "
+                                   "VALUES (1, ?, ?, ?)", (bloom.bit_count, bloom.hash_count, bytes(bloom.bits)))
+            self._bloom = bloom
+        return bloom
+
+    def check(self, address: str) -> Optional[Dict]:
+        """
+        筛查单个地址
+
+        Returns:
+            Optional[Dict]: 未命中返回None，命中返回 {'address', 'level', 'source', 'chain', 'tags'}
+        """
+        key = normalize_address(address)
+        bloom = self._bloom
+        if bloom is not None and key not in bloom:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT address, level, source, chain, tags FROM screened_addresses "
+                                     "WHERE address = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return {'address': address, 'level': row[1], 'source': row[2], 'chain': row[3],
+                'tags': json.loads(row[4]) if row[4] else None}
+
+    def screen(self, addresses: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+        """批量筛查，只返回命中的 (地址, 命中信息)"""
+        for address in addresses:
+            hit = self.check(address)
+            if hit is not None:
+                yield address, hit
+
+    def stats(self) -> Dict:
+        """索引统计：各来源地址数和布隆过滤器大小"""
+        with self._lock:
+            sources = dict(self._conn.execute("SELECT source, COUNT(*) FROM screened_addresses GROUP BY source"))
+        bloom = self._bloom
+        return {'sources': sources, 'total': sum(sources.values()),
+                'bloom_bytes': len(bloom.bits) if bloom else 0, 'bloom_hashes': bloom.hash_count if bloom else 0}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _insert(self, rows: Iterable[Tuple], rebuild: bool) -> int:
+        count = 0
+        chunk: List[Tuple] = []
+        with self._lock:
+            with self._conn:
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) >= _INSERT_CHUNK:
+                        self._conn.executemany("INSERT OR REPLACE INTO screened_addresses VALUES (?, ?, ?, ?, ?)", chunk)
+                        count += len(chunk)
+                        chunk.clear()
+                if chunk:
+                    self._conn.executemany("INSERT OR REPLACE INTO screened_addresses VALUES (?, ?, ?, ?, ?)", chunk)
+                    count += len(chunk)
+                # 旧的布隆过滤器不包含新地址会漏判，与导入在同一事务中删除，重建前直接查SQLite
+                self._conn.execute("DELETE FROM screen_bloom")
+            self._bloom = None
+        if rebuild:
+            self.rebuild_bloom()
+        return count
+
+    def _load_bloom(self) -> Optional[BloomFilter]:
+        row = self._conn.execute("SELECT bit_count, hash_count, bits FROM screen_bloom WHERE id = 1").fetchone()
+        return BloomFilter(row[0], row[1], row[2]) if row else None
+
+
+def describe_hit(hit: Dict) -> str:
+    """命中信息的可读描述"""
+    text = f"{hit['address']} 命中风险名单（{hit['source']}，{'拒绝' if hit['level'] == LEVEL_BLOCK else '警告'}）"
+    tags = hit.get('tags') or {}
+    if tags.get('reason'):
+        text += f"：{tags['reason']}"
+    elif tags.get('entityTags'):
+        text += f"：实体标签 {', '.join(tags['entityTags'])}"
+    return text
@@ -0,0 +1,415 @@
+import json
+import asyncio
+import threading
+from decimal import Decimal
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from web3 import Web3
+from web3.exceptions import TimeExhausted
+from solders.pubkey import Pubkey
+from solders.transaction import Transaction
+from spl.token.instructions import get_associated_token_address
+from .walletUtil import (WalletUtil, resolve_signer, build_evm_transfer, build_solana_transfer, log_info, log_error,
+                         EVM_RECEIPT_TIMEOUT, is_definite_rejection)
+from .rpcClient import make_web3, make_async_web3, make_async_solana_client
+from .rpcCache import RPC_CACHE, account_cache_key, remember_accounts, forget_account
+from .recipientValidator import SOLANA_CHAIN_NAME
+from .addressScreen import LEVEL_BLOCK, describe_hit
+from .preflight import token_account_amount
+from .priorityFee import async_compute_budget, with_compute_budget
+from .solanaConfirm import AsyncSolanaConfirmer
+from .txJournal import entry_to_result, FINAL_STATES, STATE_SIGNED, STATE_BROADCAST, STATE_CONFIRMED, STATE_FAILED
+
+# 每条链同时进行的请求/转账数（chain.json 中的 maxConcurrency 优先）
+DEFAULT_CHAIN_CONCURRENCY = 32
+# 批量执行时整个引擎同时进行的转账数
+DEFAULT_BATCH_CONCURRENCY = 64
+# 等待回执的轮询间隔（秒）
+RECEIPT_POLL_INTERVAL = 1.0
+
+# ERC20 balanceOf(address) 选择器
+_BALANCE_OF_SELECTOR = "0x70a08231"
+# 构建交易不需要网络，共用一个没有 provider 的实例
+_OFFLINE_WEB3 = Web3()
+
+
+class AsyncTransferEngine:
+    """
+    asyncio 转账引擎：一个事件循环中同时进行数百笔转账和查询
+
+    EVM 使用 AsyncWeb3，Solana 使用 AsyncClient，与同步版本共用节点限速器、RPC指标、只读数据缓存、
+    转账日志、nonce管理器和风险筛查（均取自 wallet_util）。每条链一个信号量限制同时进行的数量，
+    单个慢节点不会占满整个引擎。只能在一个事件循环中使用，跨线程调用请通过 AsyncEngineHost。
+    """
+
+    def __init__(self, wallet_util: Optional[WalletUtil] = None, chain_concurrency: int = DEFAULT_CHAIN_CONCURRENCY):
+        """
+        初始化引擎
+
+        Args:
+            wallet_util: 提供链配置、转账日志、nonce管理器和风险筛查的钱包工具实例
+            chain_concurrency: 每条链同时进行的数量
+        """
+        self.wallet_util = wallet_util or WalletUtil()
+        self.chain_concurrency = chain_concurrency
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._web3: Dict[str, Any] = {}
+        self._solana: Dict[str, Any] = {}
+        self._confirmers: Dict[str, AsyncSolanaConfirmer] = {}
+        # 没有nonce管理器时在事件循环内分配nonce：{(链, 地址): 下一个nonce}
+        self._nonces: Dict[Tuple[str, str], int] = {}
+        self._nonce_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def _semaphore(self, chain_info: Dict) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(chain_info['chainName'])
+        if semaphore is None:
+            limit = int(chain_info.get('maxConcurrency') or self.chain_concurrency)
+            semaphore = self._semaphores[chain_info['chainName']] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def _evm(self, chain_info: Dict):
+        """每条链复用一个 AsyncWeb3（共用连接池）"""
+        w3 = self._web3.get(chain_info['chainName'])
+        if w3 is None:
+            w3 = self._web3[chain_info['chainName']] = make_async_web3(chain_info)
+        return w3
+
+    def _solana_client(self, chain_info: Dict):
+        client = self._solana.get(chain_info['rpc'])
+        if client is None:
+            client = self._solana[chain_info['rpc']] = make_async_solana_client(
+                chain_info['rpc'], chain_info['chainName'], chain_info.get('rateLimit'))
+        return client
+
+    def _confirmer(self, chain_info: Dict) -> AsyncSolanaConfirmer:
+        """每个Solana节点一个确认器，等待中的转账共用一个轮询任务"""
+        confirmer = self._confirmers.get(chain_info['rpc'])
+        if confirmer is None:
+            confirmer = self._confirmers[chain_info['rpc']] = AsyncSolanaConfirmer(self._solana_client(chain_info),
+                                                                                   chain_info['chainName'])
+        return confirmer
+
+    async def transfer(self, private_key, to_address: str, chain_name: str, coin_name: str, amount: str,
+                       job_id: Optional[str] = None, item_id: Optional[str] = None,
+                       priority: Optional[str] = None, simulate: bool = False) -> Dict:
+        """
+        转账，参数和返回值与 WalletUtil.transfer_token 相同
+
+        已完成的条目直接返回日志中的结果；已签名未完成的条目（崩溃后续跑）和模拟转账交给同步实现，
+        在线程中执行，不阻塞事件循环。
+        """
+        wallet_util = self.wallet_util
+        journal_key = (job_id, str(item_id)) if wallet_util.journal is not None and job_id is not None else None
+        try:
+            log_info(f"开始{chain_name}异步转账——请求参数:{{'private_key': '***', 'to_address': '{to_address}', 'chain_name': '{chain_name}', 'coin_name': '{coin_name}', 'amount': '{amount}'}}")
+            entry = await asyncio.to_thread(wallet_util._journal_entry, journal_key)
+            if entry and entry['state'] in FINAL_STATES:
+                return entry_to_result(entry)
+            if simulate or (entry and entry.get('raw_tx')):
+                return await asyncio.to_thread(wallet_util.transfer_token, private_key, to_address, chain_name,
+                                               coin_name, amount, job_id, item_id, priority, simulate)
+            hit = wallet_util.screener.check(to_address) if wallet_util.screener is not None else None
+            if hit is not None:
+                if hit['level'] == LEVEL_BLOCK:
+                    error_result = {"success": False, "error": describe_hit(hit), "tx_hash": None}
+                    log_error(f"{chain_name}转账被拒绝——{json.dumps(error_result, ensure_ascii=False)}")
+                    return error_result
+                log_error(f"{chain_name}转账警告——{describe_hit(hit)}")
+            chain_info, token_info = wallet_util._validate_chain_and_token(chain_name, coin_name)
+            async with self._semaphore(chain_info):
+                if chain_name == SOLANA_CHAIN_NAME:
+                    result = await self._transfer_solana(private_key, to_address, chain_info, token_info, amount,
+                                                         journal_key, priority or wallet_util.solana_priority)
+                else:
+                    result = await self._transfer_evm(private_key, to_address, chain_info, token_info, amount,
+                                                      coin_name, journal_key)
+            log_info(f"完成{chain_name}异步转账——响应结果:{json.dumps(result, ensure_ascii=False)}")
+            return result
+        except Exception as e:
+            error_result = {"success": False, "error": f"{chain_name}转账失败: {e}", "tx_hash": None}
+            log_error(f"{chain_name}异步转账异常——{json.dumps(error_result, ensure_ascii=False)}")
+            return error_result
+
+    async def _transfer_evm(self, private_key, to_address: str, chain_info: Dict, token_info: Dict, amount: str,
+                            coin_name: str, journal_key: Optional[Tuple[str, str]]) -> Dict:
+        wallet_util = self.wallet_util
+        chain_name = chain_info['chainName']
+        w3 = self._evm(chain_info)
+        account = resolve_signer(private_key, chain_name)
+        from_address = account.address
+        journal_fields = {'chain_name': chain_name, 'coin_name': coin_name, 'from_address': from_address,
+                          'to_address': to_address, 'amount': amount}
+        nonce = await self._allocate_nonce(w3, chain_info, from_address, journal_key)
+        signed = False
+        try:
+            gas_price = await w3.eth.gas_price
+            transaction = build_evm_transfer(_OFFLINE_WEB3, to_address, token_info, amount, nonce, gas_price,
+                                             int(chain_info['chain_id']))
+            signed_txn = account.sign_transaction(transaction)
+            tx_hash_hex = Web3.to_hex(signed_txn.hash)
+            # 转账日志和nonce记录都是同步SQLite读写，一律放到线程中执行，不阻塞事件循环
+            await asyncio.to_thread(wallet_util._journal_record, journal_key, STATE_SIGNED, True,
+                                    raw_tx=Web3.to_hex(signed_txn.raw_transaction), tx_hash=tx_hash_hex,
+                                    **journal_fields)
+            signed = True
+            if wallet_util.nonce_manager is not None:
+                await asyncio.to_thread(wallet_util.nonce_manager.track, chain_name, from_address, nonce,
+                                        tx_hash_hex, transaction)
+            tx_hash = await w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+        except Exception as e:
+            await self._release_nonce(chain_info, from_address, nonce, e)
+            # 与同步实现相同：节点明确拒绝时清除签名结果，网络异常时保留以便续跑时重播
+            if signed and is_definite_rejection(e):
+                await asyncio.to_thread(wallet_util._journal_discard_signed, journal_key, e)
+            raise
+        await asyncio.to_thread(wallet_util._journal_record, journal_key, STATE_BROADCAST)
+        try:
+            receipt = await w3.eth.wait_for_transaction_receipt(tx_hash, timeout=EVM_RECEIPT_TIMEOUT,
+                                                                poll_latency=RECEIPT_POLL_INTERVAL)
+        except TimeExhausted:
+            if wallet_util.nonce_manager is None:
+                raise
+            # 超时未确认：交给同步实现检查是否需要提价重发
+            return await asyncio.to_thread(wallet_util._wait_evm_receipt, make_web3(chain_info), tx_hash,
+                                           journal_key, journal_fields, account, nonce)
+        if wallet_util.nonce_manager is not None:
+            await asyncio.to_thread(wallet_util.nonce_manager.settle, chain_name, from_address, nonce)
+        if receipt["status"] != 1:
+            await asyncio.to_thread(wallet_util._journal_record, journal_key, STATE_FAILED,
+                                    block_number=receipt["blockNumber"], error="交易执行失败")
+            return {"success": False, "error": "交易执行失败", "tx_hash": Web3.to_hex(tx_hash)}
+        await asyncio.to_thread(wallet_util._journal_record, journal_key, STATE_CONFIRMED,
+                                block_number=receipt["blockNumber"])
+        return {"success": True, "tx_hash": Web3.to_hex(tx_hash), "from_address": from_address, "to_address": to_address,
+                "amount": amount, "chain_name": chain_name, "coin_name": coin_name,
+                "block_number": receipt["blockNumber"]}
+
+    async def _allocate_nonce(self, w3, chain_info: Dict, from_address: str,
+                              journal_key: Optional[Tuple[str, str]]) -> int:
+        """有nonce管理器时由其原子分配（与其它线程/进程共享）；否则在事件循环内按地址递增"""
+        chain_name = chain_info['chainName']
+        nonce_manager = self.wallet_util.nonce_manager
+        if nonce_manager is not None:
+            job_id, item_id = journal_key or (None, None)
+            return await asyncio.to_thread(nonce_manager.allocate, chain_name, from_address, make_web3(chain_info),
+                                           job_id, item_id)
+        key = (chain_name, from_address)
+        lock = self._nonce_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in self._nonces:
+                self._nonces[key] = await w3.eth.get_transaction_count(from_address, 'pending')
+            nonce = self._nonces[key]
+            self._nonces[key] = nonce + 1
+        return nonce
+
+    async def _release_nonce(self, chain_info: Dict, from_address: str, nonce: int, error: Exception) -> None:
+        if self.wallet_util.nonce_manager is not None:
+            await asyncio.to_thread(self.wallet_util._release_nonce, make_web3(chain_info), chain_info['chainName'],
+                                    from_address, nonce, error)
+        else:
+            # 本地计数已不可信，下一笔转账重新查询链上 pending nonce
+            self._nonces.pop((chain_info['chainName'], from_address), None)
+
+    async def _transfer_solana(self, private_key, to_address: str, chain_info: Dict, token_info: Dict, amount: str,
+                               journal_key: Optional[Tuple[str, str]], priority: str) -> Dict:
+        client = self._solana_client(chain_info)
+        keypair = resolve_signer(private_key, SOLANA_CHAIN_NAME)
+        from_pub = keypair.pubkey()
+        to_pub = Pubkey.from_string(to_address)
+        journal_fields = {'chain_name': SOLANA_CHAIN_NAME, 'coin_name': token_info['coinName'],
+                          'from_address': str(from_pub), 'to_address': str(to_pub), 'amount': amount}
+        to_ata = None
+        creates_ata = False
+        if not token_info.get('isNative', False):
+            to_ata = get_associated_token_address(to_pub, Pubkey.from_string(token_info['contractAddress']))
+            creates_ata = not await self._account_exists(client, to_ata)
+        instructions = build_solana_transfer(from_pub, to_pub, token_info, amount, creates_ata)
+        latest = (await client.get_latest_blockhash()).value
+        blockhash = latest.blockhash
+        limit, price = await async_compute_budget(client, SOLANA_CHAIN_NAME, instructions, from_pub, blockhash,
+                                                  priority)
+        txn = Transaction.new_signed_with_payer(with_compute_budget(instructions, limit, price), from_pub, [keypair],
+                                                blockhash)
+        await asyncio.to_thread(self.wallet_util._journal_record, journal_key, STATE_SIGNED, True,
+                                raw_tx=bytes(txn).hex(), tx_hash=str(txn.signatures[0]), **journal_fields)
+        resp = None
+        try:
+            resp = await client.send_transaction(txn)
+        except Exception as e:
+            if is_definite_rejection(e):
+                await asyncio.to_thread(self.wallet_util._journal_discard_signed, journal_key, e)
+            raise
+        finally:
+            if to_ata is not None and (creates_ata or not getattr(resp, 'value', None)):
+                forget_account(SOLANA_CHAIN_NAME, to_ata)
+        if getattr(resp, 'value', None) and not getattr(resp, 'error', None):
+            await asyncio.to_thread(self.wallet_util._journal_record, journal_key, STATE_BROADCAST)
+            outcome = await self._confirmer(chain_info).confirm(txn, latest.last_valid_block_height)
+            return await asyncio.to_thread(self.wallet_util._finish_solana,
+                                           {"success": True, "tx_hash": str(resp.value), **journal_fields},
+                                           outcome, journal_key)
+        await asyncio.to_thread(self.wallet_util._journal_discard_signed, journal_key, resp)
+        return {"success": False, "error": str(resp), "tx_hash": None}
+
+    async def _account_exists(self, client, address) -> bool:
+        """查询Solana账户是否存在，与同步版本共用缓存"""
+        exists = RPC_CACHE.get("account_exists", account_cache_key(SOLANA_CHAIN_NAME, str(address)))
+        if exists is None:
+            exists = (await client.get_account_info(address)).value is not None
+            remember_accounts(SOLANA_CHAIN_NAME, {str(address): exists})
+        return exists
+
+    async def balance(self, chain_name: str, coin_name: str, address: str) -> Decimal:
+        """
+        查询地址余额
+
+        Args:
+            chain_name: 链名称
+            coin_name: 币种
+            address: 地址
+
+        Returns:
+            Decimal: 余额（已按精度换算）
+        """
+        chain_info, token_info = self.wallet_util._validate_chain_and_token(chain_name, coin_name)
+        async with self._semaphore(chain_info):
+            if chain_name == SOLANA_CHAIN_NAME:
+                client = self._solana_client(chain_info)
+                owner = Pubkey.from_string(address)
+                if token_info.get('isNative', False):
+                    raw = (await client.get_balance(owner)).value
+                else:
+                    ata = get_associated_token_address(owner, Pubkey.from_string(token_info['contractAddress']))
+                    account = (await client.get_account_info(ata)).value
+                    remember_accounts(SOLANA_CHAIN_NAME, {str(ata): account is not None})
+                    raw = token_account_amount(account)
+            else:
+                w3 = self._evm(chain_info)
+                address = Web3.to_checksum_address(address)
+                if token_info['isNative']:
+                    raw = await w3.eth.get_balance(address)
+                else:
+                    data = _BALANCE_OF_SELECTOR + address[2:].lower().rjust(64, "0")
+                    result = await w3.eth.call({'to': Web3.to_checksum_address(token_info['contractAddress']),
+                                                'data': data})
+                    raw = int.from_bytes(result, "big") if result else 0
+        return Decimal(raw) / (Decimal(10) ** token_info['decimals'])
+
+    async def run_batch(self, job_id: str, items: Iterable[Dict], private_key,
+                        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+                        on_result: Optional[Callable[[Dict, Dict], None]] = None,
+                        should_stop: Optional[Callable[[], bool]] = None) -> None:
+        """
+        并发执行批量转账条目（不登记计划、不跳过已完成条目，由 BatchRunner 负责）
+
+        Args:
+            job_id: 批量任务ID
+            items: 转账条目
+            private_key: 发送方私钥，或密钥库引用 VaultKey
+            concurrency: 同时进行的转账数（各链还受链信号量限制）
+            on_result: 每个条目完成后的回调 (item, result)，在事件循环线程中执行
+            should_stop: 返回True时不再开始新的条目
+        """
+        slots = asyncio.Semaphore(concurrency)
+        # 私钥字符串每条链类型只解析一次（解析一次约3毫秒，逐笔解析会占满事件循环）
+        signers = {}
+
+        async def run_item(item: Dict) -> None:
+            try:
+                is_solana = item['chain_name'] == SOLANA_CHAIN_NAME
+                try:
+                    if is_solana not in signers:
+                        signers[is_solana] = resolve_signer(private_key, item['chain_name'])
+                    signer = signers[is_solana]
+                except Exception as e:
+                    result = {"success": False, "error": f"私钥格式错误: {e}", "tx_hash": None}
+                else:
+                    result = await self.transfer(signer, item['to_address'], item['chain_name'], item['coin_name'],
+                                                 str(item['amount']), job_id=job_id, item_id=item['item_id'],
+                                                 priority=item.get('priority'))
+                if on_result is not None:
+                    on_result(item, result)
+            finally:
+                slots.release()
+
+        tasks = set()
+        for item in items:
+            # 先占位再创建任务，条目再多也只有 concurrency 个协程同时存在
+            await slots.acquire()
+            if should_stop is not None and should_stop():
+                slots.release()
+                break
+            task = asyncio.create_task(run_item(item))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def close(self) -> None:
+        """关闭全部连接"""
+        for client in self._solana.values():
+            await client.close()
+        for w3 in self._web3.values():
+            await w3.provider.disconnect()
+        self._solana.clear()
+        self._web3.clear()
+        self._confirmers.clear()
+
+
+class AsyncEngineHost:
+    """
+    在后台线程中运行事件循环并托管 AsyncTransferEngine，供图形界面和命令行等同步代码调用
+
+    submit 返回 concurrent.futures.Future，可以阻塞等待结果，也可以添加完成回调（回调在事件循环线程中执行）。
+    """
+
+    def __init__(self, engine: Optional[AsyncTransferEngine] = None):
+        self.engine = engine or AsyncTransferEngine()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> "AsyncEngineHost":
+        """启动事件循环线程（已启动时直接返回）"""
+        with self._lock:
+            if self._thread is None:
+                self._loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._run_loop, args=(ready,), name="async-engine",
+                                                daemon=True)
+                self._thread.start()
+                ready.wait()
+        return self
+
+    def _run_loop(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+
+    def submit(self, coro: Awaitable) -> Future:
+        """把协程提交到事件循环（未启动时自动启动）"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def call(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """提交协程并阻塞等待结果"""
+        return self.submit(coro).result(timeout)
+
+    def transfer(self, *args, **kwargs) -> Future:
+        """提交一笔转账，参数同 AsyncTransferEngine.transfer"""
+        return self.submit(self.engine.transfer(*args, **kwargs))
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """关闭连接并停止事件循环"""
+        with self._lock:
+            if self._thread is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self.engine.close(), self._loop).result(timeout)
+            except Exception as e:
+                log_error(f"关闭异步引擎连接失败: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            self._loop.close()
+            self._thread = None
+            self._loop = None
@@ -0,0 +1,251 @@
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Optional, Callable, Tuple
+from .walletUtil import WalletUtil, log_info, log_error
+from .recipientValidator import SOLANA_CHAIN_NAME
+from .txJournal import TxJournal, FINAL_STATES, entry_to_result
+from .taskProfiler import TaskProfiler, WorkerProfiles
+from .preflight import preflight_check, simulate_items, PreflightError
+from .asyncEngine import AsyncEngineHost
+from .disperse import disperse_items
+
+
+def load_job(job_path: str) -> Dict:
+    """
+    加载批量任务文件
+
+    任务文件格式: {"job_id": "...", "key_label": "...", "items": [{"item_id": "1", "to_address": "...",
+    "chain_name": "...", "coin_name": "...", "amount": "..."}]}，item_id 缺省时使用条目序号；
+    key_label 可选，引用加密密钥库中的私钥，任务文件中不保存私钥；priority 可选，Solana优先费档位
+    economy / fast / urgent，写在任务上作为默认值，写在条目上只对该条目生效
+
+    Args:
+        job_path: 任务文件路径
+
+    Returns:
+        Dict: 任务内容
+    """
+    with open(job_path, 'r', encoding='utf-8') as f:
+        job = json.load(f)
+    if not job.get('job_id'):
+        raise ValueError(f"任务文件缺少 job_id: {job_path}")
+    for index, item in enumerate(job.get('items', [])):
+        item.setdefault('item_id', str(index))
+        item['item_id'] = str(item['item_id'])
+    return job
+
+
+class BatchRunner:
+    """批量转账执行器，配合转账日志实现幂等的断点续跑"""
+
+    def __init__(self, journal: TxJournal, wallet_util: Optional[WalletUtil] = None,
+                 profiler: Optional[TaskProfiler] = None, preflight: bool = False, concurrency: int = 1,
+                 engine: Optional[AsyncEngineHost] = None, simulate: bool = False, disperse: bool = False):
+        """
+        初始化批量转账执行器
+
+        Args:
+            journal: 转账日志
+            wallet_util: 钱包工具实例，缺省时使用该日志新建
+            profiler: 性能分析器，传入后每次批量执行输出一份分析结果（包含并发转账的工作线程和异步引擎）
+            preflight: 执行前检查余额和手续费是否足够，不足时抛出 PreflightError，不发出任何交易
+            concurrency: 同时进行的转账数；大于1时EVM条目需要 wallet_util 带nonce管理器
+            engine: 传入后由异步引擎在一个事件循环中执行（wallet_util 缺省时使用引擎的实例），
+                    不再为每笔进行中的转账占用一个线程
+            simulate: 执行前逐条模拟，模拟失败的条目不发送（保持计划状态，问题解决后重新运行任务即可续跑）
+            disperse: EVM条目按 (链, 代币) 分组通过 Disperse 合约发送，多个收款地址合并成一笔交易；
+                      Solana条目仍逐笔发送
+        """
+        if concurrency < 1:
+            raise ValueError(f"并发数必须大于0: {concurrency}")
+        self.journal = journal
+        self.wallet_util = wallet_util or (engine.engine.wallet_util if engine is not None else WalletUtil(journal=journal))
+        self.profiler = profiler
+        self.preflight = preflight
+        self.concurrency = concurrency
+        self.engine = engine
+        self.simulate = simulate
+        self.disperse = disperse
+        self._stop = threading.Event()
+        self._workers: Optional[WorkerProfiles] = None
+
+    def stop(self) -> None:
+        """停止提交新的条目（进行中的转账会等待完成），未执行的条目保持计划状态，重新运行任务即可续跑"""
+        self._stop.set()
+
+    def run(self, job_id: str, items: List[Dict], private_key: str,
+            on_result: Optional[Callable[[Dict, Dict], None]] = None) -> List[Dict]:
+        """
+        执行批量转账；已完成的条目直接返回日志中的结果，已签名未完成的条目重播原交易
+
+        Args:
+            job_id: 批量任务ID
+            items: 转账条目
+            private_key: 发送方私钥，或密钥库引用 VaultKey
+            on_result: 每个条目完成后的回调 (item, result)，在调用 run 的线程中执行
+
+        Returns:
+            List[Dict]: 与 items 顺序一致的转账结果
+        """
+        if self.profiler is None:
+            return self._run(job_id, items, private_key, on_result)
+        # 并发转账在线程池或事件循环中执行，CPU分析需要在这些线程中分别开启
+        self._workers = WorkerProfiles() if self.profiler.cpu and (self.concurrency > 1 or self.engine) else None
+        try:
+            return self.profiler.run(f"batch_{job_id}", self._run, job_id, items, private_key, on_result,
+                                     workers=self._workers)
+        finally:
+            self._workers = None
+
+    def _run(self, job_id: str, items: List[Dict], private_key: str,
+             on_result: Optional[Callable[[Dict, Dict], None]]) -> List[Dict]:
+        self._stop.clear()
+        if self.concurrency > 1 and self.engine is None and self.wallet_util.nonce_manager is None and any(
+                item['chain_name'] != SOLANA_CHAIN_NAME for item in items):
+            raise ValueError("EVM并发转账需要nonce管理器，否则同一地址的交易会重复使用nonce")
+        self.journal.plan(job_id, items)
+        entries = self.journal.job_entries(job_id)
+        if self.preflight:
+            unfinished = [item for item in items
+                          if entries.get(item['item_id'], {}).get('state') not in FINAL_STATES]
+            report = preflight_check(unfinished, private_key, self.wallet_util)
+            if not report['ok']:
+                raise PreflightError(report)
+        results: List[Optional[Dict]] = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            entry = entries.get(item['item_id'])
+            if entry and entry['state'] in FINAL_STATES:
+                results[index] = entry_to_result(entry)
+                if on_result is not None:
+                    on_result(item, results[index])
+            else:
+                pending.append(index)
+        skipped = len(items) - len(pending)
+        rejected = 0
+        if self.simulate:
+            pending, rejected = self._simulate(items, pending, entries, private_key, results, on_result)
+        if self.disperse:
+            pending = self._run_disperse(job_id, items, pending, private_key, results, on_result)
+        if self.engine is not None:
+            self._run_engine(job_id, items, pending, private_key, results, on_result)
+        elif self.concurrency > 1:
+            self._run_concurrent(job_id, items, pending, private_key, results, on_result)
+        else:
+            for index in pending:
+                if self._stop.is_set():
+                    break
+                results[index] = self._transfer(job_id, items[index], private_key)
+                if on_result is not None:
+                    on_result(items[index], results[index])
+        stopped = 0
+        for index in pending:
+            if results[index] is None:
+                results[index] = {"success": False, "error": "任务已停止，未执行", "stopped": True}
+                stopped += 1
+                if on_result is not None:
+                    on_result(items[index], results[index])
+        self.journal.flush()
+        succeeded = sum(1 for r in results if r.get('success'))
+        log_info(f"批量任务 {job_id} 完成: 共{len(items)}笔, 成功{succeeded}笔, 跳过已完成{skipped}笔"
+                 + (f", 模拟失败未发送{rejected}笔" if rejected else "")
+                 + (f", 停止后未执行{stopped}笔" if stopped else ""))
+        if succeeded < len(items):
+            log_error(f"批量任务 {job_id} 有{len(items) - succeeded}笔未成功，未上链的条目重新运行任务即可续跑")
+        return results
+
+    def _simulate(self, items: List[Dict], pending: List[int], entries: Dict, private_key, results: List,
+                  on_result: Optional[Callable[[Dict, Dict], None]]) -> Tuple[List[int], int]:
+        """模拟未签名的条目，返回 (仍需执行的条目, 模拟失败的条目数)；已签名的条目需要重播原交易，不模拟"""
+        unsigned = [index for index in pending if not entries.get(items[index]['item_id'], {}).get('raw_tx')]
+        rows = simulate_items([items[index] for index in unsigned], private_key, self.wallet_util)
+        failed = set()
+        for index, row in zip(unsigned, rows):
+            if row['ok']:
+                continue
+            failed.add(index)
+            results[index] = {"success": False, "error": f"模拟失败: {row['error']}", "tx_hash": None,
+                              "simulated": True}
+            if on_result is not None:
+                on_result(items[index], results[index])
+        return [index for index in pending if index not in failed], len(failed)
+
+    def _run_disperse(self, job_id: str, items: List[Dict], pending: List[int], private_key, results: List,
+                      on_result: Optional[Callable[[Dict, Dict], None]]) -> List[int]:
+        """EVM条目按 (链, 代币) 分组经 Disperse 合约发送，返回仍需逐笔执行的条目（Solana）"""
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        remaining = []
+        for index in pending:
+            item = items[index]
+            if item['chain_name'] == SOLANA_CHAIN_NAME:
+                remaining.append(index)
+            else:
+                groups.setdefault((item['chain_name'], item['coin_name']), []).append(index)
+        for indexes in groups.values():
+            if self._stop.is_set():
+                break
+            group_results = disperse_items([items[index] for index in indexes], private_key, self.wallet_util,
+                                           job_id=job_id)
+            for index, result in zip(indexes, group_results):
+                results[index] = result
+                if on_result is not None:
+                    on_result(items[index], result)
+        return remaining
+
+    def _transfer(self, job_id: str, item: Dict, private_key) -> Dict:
+        return self.wallet_util.transfer_token(private_key, item['to_address'], item['chain_name'],
+                                               item['coin_name'], str(item['amount']),
+                                               job_id=job_id, item_id=item['item_id'], priority=item.get('priority'))
+
+    def _run_engine(self, job_id: str, items: List[Dict], pending: List[int], private_key,
+                    results: List[Optional[Dict]], on_result: Optional[Callable[[Dict, Dict], None]]) -> None:
+        """交给异步引擎执行；结果经队列传回调用线程，on_result 仍在调用 run 的线程中执行"""
+        done = queue.Queue()
+        index_of = {items[index]['item_id']: index for index in pending}
+        batch = self.engine.engine.run_batch(
+            job_id, [items[index] for index in pending], private_key, self.concurrency,
+            lambda item, result: done.put((item, result)), self._stop.is_set)
+        if self._workers is not None:
+            batch = self._workers.call_async(batch)
+        future = self.engine.submit(batch)
+        while not (future.done() and done.empty()):
+            try:
+                item, result = done.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            index = index_of[item['item_id']]
+            results[index] = result
+            if on_result is not None:
+                on_result(items[index], result)
+        future.result()
+
+    def _run_concurrent(self, job_id: str, items: List[Dict], pending: List[int], private_key,
+                        results: List[Optional[Dict]], on_result: Optional[Callable[[Dict, Dict], None]]) -> None:
+        """最多 concurrency 笔同时进行：完成一笔再提交下一笔，不会一次把全部条目放进线程池队列"""
+        remaining = iter(pending)
+        in_flight = {}
+        workers = self._workers
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"batch-{job_id}") as pool:
+            while True:
+                while len(in_flight) < self.concurrency and not self._stop.is_set():
+                    index = next(remaining, None)
+                    if index is None:
+                        break
+                    if workers is not None:
+                        future = pool.submit(workers.call, self._transfer, job_id, items[index], private_key)
+                    else:
+                        future = pool.submit(self._transfer, job_id, items[index], private_key)
+                    in_flight[future] = index
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = in_flight.pop(future)
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        results[index] = {"success": False, "error": f"转账异常: {e}"}
+                    if on_result is not None:
+                        on_result(items[index], results[index])
@@ -0,0 +1,35 @@
+import os
+import json
+import threading
+from typing import Any, Dict, Tuple
+
+# 进程内共享的配置文件解析结果：路径 -> ((修改时间, 文件大小), 内容)
+_configs: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+_lock = threading.Lock()
+
+
+def load_json_config(path: str) -> Any:
+    """
+    读取JSON配置文件，按修改时间和文件大小缓存，文件修改后再次读取时重新解析
+
+    图形界面、WalletUtil 和命令行共用同一份解析结果（调用方不要修改返回的对象）。
+    只依赖标准库，图形界面启动时导入不会拖慢首次绘制。
+
+    Args:
+        path: 配置文件路径
+
+    Returns:
+        解析后的配置；文件不存在或格式错误时抛出异常
+    """
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _configs.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    with _lock:
+        _configs[path] = (version, data)
+    return data
@@ -0,0 +1,336 @@
+import os
+import time
+import sqlite3
+import threading
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from eth_utils import keccak
+from web3 import Web3
+from .walletUtil import WalletUtil, log_info, log_error
+from .rpcClient import make_web3
+from .rateLimiter import is_range_limit_error, is_transient_error
+
+DEFAULT_DEPOSIT_DB_PATH = os.path.join("data", "deposits.db")
+
+# ERC20 Transfer(address indexed from, address indexed to, uint256 value)
+TRANSFER_TOPIC = "0x" + keccak(text="Transfer(address,address,uint256)").hex()
+# 只扫描到 最新区块 - 确认数，避免链重组后漏记或记下被回滚的充值
+DEFAULT_CONFIRMATIONS = 12
+# 每次 eth_getLogs 查询的区块数：初始值和上下限（实际值随节点限制自动调整并保存在游标中）
+INITIAL_CHUNK_BLOCKS = 2000
+MIN_CHUNK_BLOCKS = 1
+MAX_CHUNK_BLOCKS = 100000
+# 一次查询返回的日志少于该数时扩大查询范围（大多数节点单次最多返回1万条）
+GROW_BELOW_LOGS = 2500
+# 超限后缩小的范围要连续成功这么多次才再扩大
+GROW_AFTER_SUCCESSES = 10
+# 监控地址不超过该数量时按收款地址（topic）在节点上过滤，更多时取回全部 Transfer 日志在本地过滤
+TOPIC_FILTER_LIMIT = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deposit_cursors (
+    chain_name TEXT PRIMARY KEY,
+    next_block INTEGER NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deposits (
+    chain_name TEXT NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    block_number INTEGER NOT NULL,
+    coin_name TEXT NOT NULL,
+    token_address TEXT NOT NULL,
+    from_address TEXT NOT NULL,
+    to_address TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    raw_amount TEXT NOT NULL,
+    detected_at REAL NOT NULL,
+    PRIMARY KEY (chain_name, tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS idx_deposits_to ON deposits (to_address, chain_name);
+CREATE INDEX IF NOT EXISTS idx_deposits_block ON deposits (chain_name, block_number);
+"""
+
+_DEPOSIT_COLUMNS = ("chain_name", "tx_hash", "log_index", "block_number", "coin_name", "token_address",
+                    "from_address", "to_address", "amount", "raw_amount", "detected_at")
+
+
+class BlockRangeSizer:
+    """
+    eth_getLogs 查询区块范围的自适应调整
+
+    节点返回范围/结果数超限时减半；查询成功且日志不多时翻倍。超限后要连续成功 GROW_AFTER_SUCCESSES 次
+    才再扩大，避免在节点上限附近反复超限浪费请求（每次超限都要重新查询这一段）。
+    """
+
+    def __init__(self, size: int = INITIAL_CHUNK_BLOCKS, minimum: int = MIN_CHUNK_BLOCKS,
+                 maximum: int = MAX_CHUNK_BLOCKS):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.size = max(minimum, min(maximum, size))
+        self.limited = False
+        self._successes = 0
+
+    def on_success(self, log_count: int) -> None:
+        self._successes += 1
+        if self.limited and self._successes >= GROW_AFTER_SUCCESSES:
+            self.limited = False
+        if log_count < GROW_BELOW_LOGS and not self.limited:
+            self.size = min(self.maximum, self.size * 2)
+
+    def on_limit(self, tried: int) -> None:
+        """tried 为超限的查询范围（末尾不足一个范围时小于 size）"""
+        self._successes = 0
+        self.limited = True
+        self.size = max(self.minimum, min(self.size, tried) // 2)
+
+
+def normalize_address(address) -> Optional[str]:
+    """地址转为小写 0x 字符串（接受字符串或20字节地址），格式不正确时返回None"""
+    if isinstance(address, (bytes, bytearray, memoryview)):
+        return "0x" + bytes(address).hex() if len(address) == 20 else None
+    address = str(address).strip().lower()
+    if not address.startswith("0x"):
+        address = "0x" + address
+    if len(address) != 42:
+        return None
+    try:
+        int(address[2:], 16)
+    except ValueError:
+        return None
+    return address
+
+
+def _get_logs(w3: Web3, query: Dict) -> List[Dict]:
+    """
+    直接经 provider 请求 eth_getLogs，返回节点的原始日志
+
+    不经过 web3 的结果格式化（每条日志计算校验和地址、转为 AttributeDict），几万条日志时格式化占了
+    扫描的大部分耗时；只有命中监控地址的少数日志才需要解析。限速、重试和RPC指标仍由 provider 处理。
+    """
+    response = w3.provider.make_request("eth_getLogs", [query])
+    if "error" in response:
+        raise ValueError(response["error"])
+    return response["result"]
+
+
+class DepositWatcher:
+    """
+    ERC20 充值监控（增量扫描 Transfer 事件，SQLite持久化）
+
+    按链扫描 contract.json 中该链ERC20代币的 Transfer 日志，收款地址在监控集合中的记为充值。
+    每条链保存一个游标（下一个要扫描的区块和学到的查询范围），每扫完一段在同一事务中写入充值和
+    游标，中断后重新运行从游标继续；同一日志 (tx_hash, log_index) 只记录一次，重复扫描不会重复记账。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DEPOSIT_DB_PATH, wallet_util: Optional[WalletUtil] = None):
+        """
+        初始化充值监控
+
+        Args:
+            db_path: SQLite数据库文件路径
+            wallet_util: 读取链和代币配置用，缺省时新建
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.db_path = db_path
+        self.wallet_util = wallet_util or WalletUtil()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def chain_tokens(self, chain_name: str, coin_names: Optional[Iterable[str]] = None) -> List[Dict]:
+        """该链上要监控的ERC20代币（contract.json 中的非原生币），coin_names 缺省时为全部"""
+        coin_names = set(coin_names) if coin_names else None
+        tokens = [token for token in self.wallet_util._load_contract_config().get('tokens', [])
+                  if token['chainName'] == chain_name and not token.get('isNative')
+                  and (coin_names is None or token['coinName'] in coin_names)]
+        if not tokens:
+            raise ValueError(f"链 '{chain_name}' 没有可监控的ERC20代币" + (f": {sorted(coin_names)}" if coin_names else ""))
+        return tokens
+
+    def cursor(self, chain_name: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT next_block, chunk_size, updated_at FROM deposit_cursors WHERE chain_name = ?",
+                                     (chain_name,)).fetchone()
+        if row is None:
+            return None
+        return {"chain_name": chain_name, "next_block": row[0], "chunk_size": row[1], "updated_at": row[2]}
+
+    def reset_cursor(self, chain_name: str) -> None:
+        """删除游标（已记录的充值保留），下次扫描按 from_block / lookback 重新确定起点"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM deposit_cursors WHERE chain_name = ?", (chain_name,))
+
+    def scan(self, chain_names: List[str], addresses: Iterable, **kwargs) -> Dict[str, Dict]:
+        """
+        多条链并行扫描（每条链一个线程，各链节点的限速互不影响）
+
+        Args:
+            chain_names: 链名称列表
+            addresses: 监控的收款地址
+            **kwargs: 传给 scan_chain 的其他参数
+
+        Returns:
+            Dict[str, Dict]: 链名 -> scan_chain 的结果；某条链出错时为 {"error": ...}，不影响其他链
+        """
+        watched = self._watched(addresses)
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(chain_names)), thread_name_prefix="deposit-scan") as pool:
+            futures = {chain_name: pool.submit(self.scan_chain, chain_name, watched, **kwargs)
+                       for chain_name in chain_names}
+            for chain_name, future in futures.items():
+                try:
+                    results[chain_name] = future.result()
+                except Exception as e:
+                    log_error(f"[充值监控] {chain_name} 扫描失败: {e}")
+                    results[chain_name] = {"chain_name": chain_name, "error": str(e)}
+        return results
+
+    def scan_chain(self, chain_name: str, addresses: Iterable, coin_names: Optional[Iterable[str]] = None,
+                   from_block: Optional[int] = None, to_block: Optional[int] = None, lookback: int = 0,
+                   confirmations: int = DEFAULT_CONFIRMATIONS, topic_filter: Optional[bool] = None,
+                   on_deposit: Optional[Callable[[Dict], None]] = None,
+                   stop: Optional[Callable[[], bool]] = None) -> Dict:
+        """
+        扫描一条链，从游标处继续到安全高度（最新区块 - confirmations）
+
+        Args:
+            chain_name: 链名称
+            addresses: 监控的收款地址（字符串或20字节地址）
+            coin_names: 只监控这些代币，缺省时为该链全部ERC20代币
+            from_block: 指定起始区块（忽略游标，用于补扫；已记录的充值不会重复）
+            to_block: 扫描到该区块为止（不超过安全高度）
+            lookback: 没有游标时从安全高度往前这么多个区块开始；为0时只监控之后的新区块
+            confirmations: 确认数
+            topic_filter: 是否在节点上按收款地址过滤，缺省时监控地址不超过 TOPIC_FILTER_LIMIT 个才过滤
+            on_deposit: 每条新充值写入后的回调
+            stop: 返回True时在当前这段扫完后停止（游标已保存）
+
+        Returns:
+            Dict: 扫描统计
+        """
+        started = time.perf_counter()
+        watched = addresses if isinstance(addresses, set) else self._watched(addresses)
+        tokens = {Web3.to_checksum_address(token['contractAddress']): token
+                  for token in self.chain_tokens(chain_name, coin_names)}
+        token_by_address = {address.lower(): token for address, token in tokens.items()}
+        w3 = make_web3(self.wallet_util._get_chain_info(chain_name))
+        head = w3.eth.block_number - confirmations
+        if to_block is not None:
+            head = min(head, to_block)
+        cursor = self.cursor(chain_name)
+        if from_block is not None:
+            start = from_block
+        elif cursor is not None:
+            start = cursor['next_block']
+        else:
+            start = max(0, head + 1 - lookback)
+        sizer = BlockRangeSizer(cursor['chunk_size'] if cursor else INITIAL_CHUNK_BLOCKS)
+        if topic_filter is None:
+            topic_filter = len(watched) <= TOPIC_FILTER_LIMIT
+        topics = [TRANSFER_TOPIC]
+        if topic_filter:
+            topics += [None, ["0x" + address[2:].rjust(64, "0") for address in sorted(watched)]]
+        summary = {"chain_name": chain_name, "from_block": start, "to_block": head, "requests": 0, "shrinks": 0,
+                   "logs": 0, "deposits": 0, "topic_filter": topic_filter}
+        log_info(f"[充值监控] {chain_name} 扫描区块 {start} ~ {head}（{max(0, head - start + 1)}个区块, "
+                 f"{len(tokens)}个代币, 监控{len(watched)}个地址）")
+        block = start
+        while block <= head and not (stop is not None and stop()):
+            end = min(head, block + sizer.size - 1)
+            summary['requests'] += 1
+            try:
+                logs = _get_logs(w3, {"fromBlock": hex(block), "toBlock": hex(end),
+                                      "address": list(tokens), "topics": topics})
+            except Exception as e:
+                # 范围/结果数超限，或大范围查询超时：缩小范围重试；单个区块也失败时无法再缩小
+                if end == block or not (is_range_limit_error(e) or is_transient_error(e)):
+                    raise
+                sizer.on_limit(end - block + 1)
+                summary['shrinks'] += 1
+                continue
+            sizer.on_success(len(logs))
+            summary['logs'] += len(logs)
+            rows = []
+            for log in logs:
+                log_topics = log['topics']
+                # indexed 参数个数不同的同名事件（如 ERC721 的 Transfer）和被回滚的日志跳过
+                if len(log_topics) != 3 or log.get('removed'):
+                    continue
+                to_address = "0x" + log_topics[2][-40:].lower()
+                token = token_by_address.get(log['address'].lower())
+                if to_address not in watched or token is None:
+                    continue
+                raw_amount = int(log['data'], 16) if log['data'] not in ("0x", "") else 0
+                rows.append((chain_name, log['transactionHash'], int(log['logIndex'], 16), int(log['blockNumber'], 16),
+                             token['coinName'], Web3.to_checksum_address(log['address']),
+                             Web3.to_checksum_address("0x" + log_topics[1][-40:]), Web3.to_checksum_address(to_address),
+                             f"{Decimal(raw_amount).scaleb(-token['decimals']):f}", str(raw_amount), time.time()))
+            inserted = self._commit(chain_name, rows, end + 1, sizer.size)
+            summary['deposits'] += len(inserted)
+            if on_deposit is not None:
+                for row in inserted:
+                    on_deposit(dict(zip(_DEPOSIT_COLUMNS, row)))
+            block = end + 1
+        if cursor is None and block == start:
+            # 第一次运行且没有可扫描的区块：保存起点，之后从这里继续
+            self._commit(chain_name, [], block, sizer.size)
+        summary['next_block'] = block
+        summary['chunk_size'] = sizer.size
+        summary['seconds'] = round(time.perf_counter() - started, 3)
+        log_info(f"[充值监控] {chain_name} 扫描到区块 {block - 1}: {summary['requests']}次查询（缩小范围{summary['shrinks']}次）, "
+                 f"{summary['logs']}条日志, 新充值{summary['deposits']}笔, 耗时{summary['seconds']}秒")
+        return summary
+
+    def deposits(self, chain_name: Optional[str] = None, address: Optional[str] = None,
+                 since_block: Optional[int] = None, limit: int = 100) -> List[Dict]:
+        """查询已记录的充值（按区块倒序）"""
+        conditions, params = [], []
+        if chain_name:
+            conditions.append("chain_name = ?")
+            params.append(chain_name)
+        if address:
+            conditions.append("to_address = ?")
+            params.append(Web3.to_checksum_address(address))
+        if since_block is not None:
+            conditions.append("block_number >= ?")
+            params.append(since_block)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(_DEPOSIT_COLUMNS)} FROM deposits {where} "
+                                      f"ORDER BY block_number DESC, log_index DESC LIMIT ?", (*params, limit)).fetchall()
+        return [dict(zip(_DEPOSIT_COLUMNS, row)) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _watched(self, addresses: Iterable) -> Set[str]:
+        watched = set()
+        for address in addresses:
+            normalized = normalize_address(address)
+            if normalized is None:
+                raise ValueError(f"监控地址格式不正确: {address}")
+            watched.add(normalized)
+        return watched
+
+    def _commit(self, chain_name: str, rows: List[tuple], next_block: int, chunk_size: int) -> List[tuple]:
+        """在一个事务中写入这一段的充值和游标，返回新写入的充值（已记录过的跳过）"""
+        inserted = []
+        with self._lock, self._conn:
+            for row in rows:
+                cursor = self._conn.execute(f"INSERT OR IGNORE INTO deposits ({', '.join(_DEPOSIT_COLUMNS)}) "
+                                            f"VALUES ({', '.join('?' * len(_DEPOSIT_COLUMNS))})", row)
+                if cursor.rowcount:
+                    inserted.append(row)
+            self._conn.execute("INSERT INTO deposit_cursors (chain_name, next_block, chunk_size, updated_at) "
+                               "VALUES (?, ?, ?, ?) ON CONFLICT(chain_name) DO UPDATE SET "
+                               "next_block = excluded.next_block, chunk_size = excluded.chunk_size, "
+                               "updated_at = excluded.updated_at", (chain_name, next_block, chunk_size, time.time()))
+        return inserted
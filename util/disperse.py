@@ -0,0 +1,342 @@
+import json
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from web3 import Web3
+from .walletUtil import (WalletUtil, resolve_signer, is_definite_rejection, log_info, log_error, EVM_RECEIPT_TIMEOUT)
+from .rpcClient import make_web3
+from .addressScreen import LEVEL_BLOCK, describe_hit
+from .recipientValidator import SOLANA_CHAIN_NAME
+from .txJournal import FINAL_STATES, STATE_SIGNED, STATE_BROADCAST, STATE_CONFIRMED, STATE_FAILED, entry_to_result
+
+# Disperse 合约（disperse.app），下列链（chain_id）上部署在同一地址；其它链（如 zkSync Era，合约地址推导
+# 规则不同）需要在 chain.json 中配置 disperseContract
+DISPERSE_CONTRACT = "0xD152f549545093347A162Dce210e7293f1452150"
+DISPERSE_CHAIN_IDS = frozenset({1, 10, 56, 137, 8453, 42161, 43114, 11155111})
+# 每笔分发交易最多的收款地址数
+DEFAULT_CHUNK_SIZE = 200
+# 每笔分发交易的gas上限不超过区块gas上限的该比例，太接近区块上限的交易难以被打包
+BLOCK_GAS_FRACTION = 0.5
+# 估算的gas乘以该倍数作为交易gas上限
+DISPERSE_GAS_MARGIN = 1.2
+# approve 交易的gas上限
+APPROVE_GAS = 100000
+
+DISPERSE_ABI = [
+    {
+        "name": "disperseEther",
+        "inputs": [{"name": "recipients", "type": "address[]"}, {"name": "values", "type": "uint256[]"}],
+        "outputs": [],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "name": "disperseToken",
+        "inputs": [{"name": "token", "type": "address"}, {"name": "recipients", "type": "address[]"},
+                   {"name": "values", "type": "uint256[]"}],
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    }
+]
+
+ERC20_APPROVE_ABI = [
+    {
+        "constant": False,
+        "inputs": [{"name": "_spender", "type": "address"}, {"name": "_value", "type": "uint256"}],
+        "name": "approve",
+        "outputs": [{"name": "", "type": "bool"}],
+        "type": "function"
+    },
+    {
+        "constant": True,
+        "inputs": [{"name": "_owner", "type": "address"}, {"name": "_spender", "type": "address"}],
+        "name": "allowance",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "type": "function"
+    }
+]
+
+
+def disperse_contract_address(chain_info: Dict) -> str:
+    """链上 Disperse 合约地址：优先取 chain.json 的 disperseContract，已知部署了默认地址的链才使用默认值"""
+    if chain_info.get('disperseContract'):
+        return Web3.to_checksum_address(chain_info['disperseContract'])
+    if int(chain_info['chain_id']) not in DISPERSE_CHAIN_IDS:
+        raise ValueError(f"{chain_info['chainName']} 上没有已知的 Disperse 合约，请在 chain.json 中配置 disperseContract")
+    return Web3.to_checksum_address(DISPERSE_CONTRACT)
+
+
+def base_amount(token_info: Dict, amount: str) -> int:
+    """转账数量换算为最小单位（wei / 代币最小精度）"""
+    decimals = 18 if token_info['isNative'] else token_info['decimals']
+    return int(Decimal(str(amount)) * (10 ** decimals))
+
+
+def disperse_call(contract, token_info: Dict, recipients: List[str], values: List[int]):
+    """构建 disperseEther / disperseToken 调用"""
+    if token_info['isNative']:
+        return contract.functions.disperseEther(recipients, values)
+    return contract.functions.disperseToken(Web3.to_checksum_address(token_info['contractAddress']), recipients,
+                                            values)
+
+
+def plan_chunks(w3: Web3, contract, sender: str, token_info: Dict, recipients: List[str], values: List[int],
+                chunk_size: int = DEFAULT_CHUNK_SIZE, gas_cap: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    """
+    把收款地址拆成多笔分发交易，逐笔估算gas
+
+    每笔最多 chunk_size 个地址；估算的gas（含余量）超过 gas_cap 时按比例缩小这一笔的地址数重新估算。
+
+    Args:
+        w3: Web3实例
+        contract: Disperse 合约
+        sender: 发送方地址
+        token_info: 代币配置
+        recipients: 收款地址（校验和格式）
+        values: 最小单位的金额
+        chunk_size: 每笔最多的地址数
+        gas_cap: 每笔交易的gas上限，缺省为最新区块gas上限的 BLOCK_GAS_FRACTION
+
+    Returns:
+        List[Tuple[int, int, int]]: 每笔交易 (起始下标, 结束下标, gas上限)
+    """
+    if gas_cap is None:
+        gas_cap = int(w3.eth.get_block('latest')['gasLimit'] * BLOCK_GAS_FRACTION)
+    chunks = []
+    start = 0
+    while start < len(recipients):
+        size = min(chunk_size, len(recipients) - start)
+        while True:
+            end = start + size
+            tx_params = {'from': sender}
+            if token_info['isNative']:
+                tx_params['value'] = sum(values[start:end])
+            gas = int(disperse_call(contract, token_info, recipients[start:end], values[start:end])
+                      .estimate_gas(tx_params) * DISPERSE_GAS_MARGIN)
+            if gas <= gas_cap:
+                break
+            if size == 1:
+                raise ValueError(f"单个地址的分发交易需要 {gas} gas，超过每笔上限 {gas_cap}")
+            size = max(1, min(size - 1, size * gas_cap // gas))
+        chunks.append((start, end, gas))
+        start = end
+    return chunks
+
+
+def disperse_items(items: List[Dict], private_key, wallet_util: WalletUtil, job_id: Optional[str] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Dict]:
+    """
+    通过 Disperse 合约批量转账：多个收款地址合并成一笔交易，代币先 approve 合约
+
+    每个收款地址省去一笔交易的21000基础gas和各自的签名、广播、等待回执。条目必须属于同一条EVM链
+    和同一种代币。启用转账日志时每个条目记录所在分发交易的原始交易，续跑时已签名的分发交易按交易重播一次，
+    未签名的条目重新拆分发送。
+
+    Args:
+        items: 转账条目 {item_id, to_address, chain_name, coin_name, amount}
+        private_key: 发送方私钥（或 VaultKey）
+        wallet_util: 钱包工具实例（使用其转账日志、nonce管理器和风险筛查）
+        job_id: 批量任务ID，与转账日志一起用于断点续跑
+        chunk_size: 每笔分发交易最多的收款地址数
+
+    Returns:
+        List[Dict]: 与 items 顺序一致的转账结果（同一笔分发交易中的条目 tx_hash 相同）
+    """
+    if not items:
+        return []
+    chain_name, coin_name = items[0]['chain_name'], items[0]['coin_name']
+    if chain_name == SOLANA_CHAIN_NAME:
+        raise ValueError("Disperse 合约只支持EVM链")
+    if any(item['chain_name'] != chain_name or item['coin_name'] != coin_name for item in items):
+        raise ValueError("同一次分发的条目必须属于同一条链和同一种代币")
+    results: List[Optional[Dict]] = [None] * len(items)
+    try:
+        chain_info, token_info = wallet_util._validate_chain_and_token(chain_name, coin_name)
+        w3 = make_web3(chain_info)
+        account = resolve_signer(private_key, chain_name)
+        contract = w3.eth.contract(address=disperse_contract_address(chain_info), abi=DISPERSE_ABI)
+        if not w3.eth.get_code(contract.address):
+            # 没有代码的地址同样能估算gas、交易也会成功，分发的金额会全部转到这个地址
+            raise ValueError(f"{chain_name} 上 {contract.address} 没有合约代码，请检查 disperseContract 配置")
+        use_journal = wallet_util.journal is not None and job_id is not None
+        entries = wallet_util.journal.job_entries(job_id) if use_journal else {}
+        keys = [(job_id, str(item['item_id'])) if use_journal else None for item in items]
+        fields = [{'chain_name': chain_name, 'coin_name': coin_name, 'from_address': account.address,
+                   'to_address': item['to_address'], 'amount': str(item['amount'])} for item in items]
+
+        replays: Dict[str, List[int]] = {}
+        fresh = []
+        for index, item in enumerate(items):
+            entry = entries.get(str(item['item_id']))
+            if entry and entry['state'] in FINAL_STATES:
+                results[index] = entry_to_result(entry)
+            elif entry and entry.get('raw_tx'):
+                replays.setdefault(entry['tx_hash'], []).append(index)
+            else:
+                results[index] = _reject(item, wallet_util, chain_name)
+                if results[index] is None:
+                    fresh.append(index)
+
+        # 已签名的分发交易按交易重播一次（already known / nonce too low 说明已在内存池或已上链）
+        sent = []
+        for tx_hash, indexes in replays.items():
+            log_info(f"从转账日志恢复已签名的分发交易: {tx_hash}（{len(indexes)}个地址）")
+            try:
+                w3.eth.send_raw_transaction(entries[str(items[indexes[0]]['item_id'])]['raw_tx'])
+            except Exception as e:
+                log_info(f"重播已签名交易返回: {e}")
+            sent.append((Web3.to_bytes(hexstr=tx_hash), indexes, None))
+
+        if fresh:
+            sent.extend(_send_fresh(w3, contract, account, chain_info, token_info, items, fresh, keys, fields,
+                                    wallet_util, chunk_size, results))
+        for tx_hash, indexes, nonce in sent:
+            _finish_chunk(w3, tx_hash, indexes, nonce, keys, fields, wallet_util, account.address, results)
+    except Exception as e:
+        log_error(f"{chain_name}分发转账异常: {e}")
+        for index in range(len(items)):
+            if results[index] is None:
+                results[index] = {"success": False, "error": f"分发转账失败: {e}", "tx_hash": None}
+    return results
+
+
+def _reject(item: Dict, wallet_util: WalletUtil, chain_name: str) -> Optional[Dict]:
+    """收款地址格式错误或命中风险筛查拒绝名单时返回失败结果（不写入转账日志）"""
+    if not wallet_util._validate_address(item['to_address'], chain_name):
+        return {"success": False, "error": f"收款地址格式无效: {item['to_address']}", "tx_hash": None}
+    hit = wallet_util.screener.check(item['to_address']) if wallet_util.screener is not None else None
+    if hit is not None:
+        if hit['level'] == LEVEL_BLOCK:
+            return {"success": False, "error": describe_hit(hit), "tx_hash": None}
+        log_error(f"{chain_name}转账警告——{describe_hit(hit)}")
+    return None
+
+
+def _allocate_nonce(w3: Web3, wallet_util: WalletUtil, chain_name: str, address: str) -> int:
+    if wallet_util.nonce_manager is not None:
+        return wallet_util.nonce_manager.allocate(chain_name, address, w3)
+    return w3.eth.get_transaction_count(address, 'pending')
+
+
+def _sign_and_send(w3: Web3, account, chain_name: str, transaction: Dict, wallet_util: WalletUtil,
+                   on_signed=None) -> bytes:
+    """签名并广播，失败时归还nonce；on_signed 在广播前调用（写入转账日志）"""
+    nonce = transaction['nonce']
+    try:
+        signed_txn = account.sign_transaction(transaction)
+        if on_signed is not None:
+            on_signed(signed_txn)
+        if wallet_util.nonce_manager is not None:
+            wallet_util.nonce_manager.track(chain_name, account.address, nonce, Web3.to_hex(signed_txn.hash),
+                                            transaction)
+        return w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+    except Exception as e:
+        wallet_util._release_nonce(w3, chain_name, account.address, nonce, e)
+        raise
+
+
+def _approve(w3: Web3, account, chain_info: Dict, token_info: Dict, spender: str, total: int, gas_price: int,
+             wallet_util: WalletUtil) -> None:
+    """
+    授权额度不足时 approve 本次分发的总额并等待上链
+
+    USDT 等代币不允许把非0额度直接改成另一个非0额度，剩余额度不足时先 approve 0 再授权总额
+    """
+    token = w3.eth.contract(address=Web3.to_checksum_address(token_info['contractAddress']), abi=ERC20_APPROVE_ABI)
+    allowance = token.functions.allowance(account.address, spender).call()
+    if allowance >= total:
+        return
+    if allowance > 0:
+        _send_approve(w3, token, account, chain_info, spender, 0, gas_price, wallet_util)
+    _send_approve(w3, token, account, chain_info, spender, total, gas_price, wallet_util)
+
+
+def _send_approve(w3: Web3, token, account, chain_info: Dict, spender: str, amount: int, gas_price: int,
+                  wallet_util: WalletUtil) -> None:
+    """发送一笔 approve 交易并等待上链"""
+    chain_name = chain_info['chainName']
+    nonce = _allocate_nonce(w3, wallet_util, chain_name, account.address)
+    transaction = token.functions.approve(spender, amount).build_transaction({
+        'from': account.address, 'nonce': nonce, 'gas': APPROVE_GAS, 'gasPrice': gas_price,
+        'chainId': int(chain_info['chain_id'])})
+    tx_hash = _sign_and_send(w3, account, chain_name, transaction, wallet_util)
+    log_info(f"授权 Disperse 合约 {spender} 使用 {amount}（最小单位）: {Web3.to_hex(tx_hash)}")
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=EVM_RECEIPT_TIMEOUT)
+    if wallet_util.nonce_manager is not None:
+        wallet_util.nonce_manager.settle(chain_name, account.address, nonce)
+    if receipt['status'] != 1:
+        raise Exception(f"approve 交易执行失败: {Web3.to_hex(tx_hash)}")
+
+
+def _send_fresh(w3: Web3, contract, account, chain_info: Dict, token_info: Dict, items: List[Dict],
+                fresh: List[int], keys: List, fields: List[Dict], wallet_util: WalletUtil, chunk_size: int,
+                results: List) -> List[Tuple[bytes, List[int], int]]:
+    """拆分、签名并依次广播未签名的条目（不等待回执），返回 [(交易哈希, 条目下标, nonce)]"""
+    chain_name = chain_info['chainName']
+    recipients = [Web3.to_checksum_address(items[index]['to_address']) for index in fresh]
+    values = [base_amount(token_info, items[index]['amount']) for index in fresh]
+    gas_price = w3.eth.gas_price
+    if not token_info['isNative']:
+        _approve(w3, account, chain_info, token_info, contract.address, sum(values), gas_price, wallet_util)
+    chunks = plan_chunks(w3, contract, account.address, token_info, recipients, values, chunk_size)
+    log_info(f"{chain_name}分发{len(fresh)}个地址，拆成{len(chunks)}笔交易: {[end - start for start, end, _ in chunks]}")
+    sent = []
+    for start, end, gas in chunks:
+        indexes = fresh[start:end]
+        signed = []
+        try:
+            nonce = _allocate_nonce(w3, wallet_util, chain_name, account.address)
+            transaction = disperse_call(contract, token_info, recipients[start:end], values[start:end]).build_transaction({
+                'from': account.address, 'nonce': nonce, 'gas': gas, 'gasPrice': gas_price,
+                'chainId': int(chain_info['chain_id']),
+                'value': sum(values[start:end]) if token_info['isNative'] else 0})
+
+            def journal_signed(signed_txn, indexes=indexes, signed=signed):
+                # 广播前落盘；只在最后一条立即提交，同一笔交易的条目一次落盘
+                raw_tx, tx_hash = Web3.to_hex(signed_txn.raw_transaction), Web3.to_hex(signed_txn.hash)
+                for position, index in enumerate(indexes):
+                    wallet_util._journal_record(keys[index], STATE_SIGNED, durable=position == len(indexes) - 1,
+                                                raw_tx=raw_tx, tx_hash=tx_hash, **fields[index])
+                signed.append(tx_hash)
+
+            tx_hash = _sign_and_send(w3, account, chain_name, transaction, wallet_util, journal_signed)
+        except Exception as e:
+            log_error(f"{chain_name}分发交易发送失败（{len(indexes)}个地址）: {e}")
+            for index in indexes:
+                results[index] = {"success": False, "error": f"分发转账失败: {e}", "tx_hash": None}
+                if signed and is_definite_rejection(e):
+                    # 节点明确拒绝，nonce已归还：清除签名结果，避免续跑时重播
+                    wallet_util._journal_discard_signed(keys[index], e)
+            continue
+        for index in indexes:
+            wallet_util._journal_record(keys[index], STATE_BROADCAST)
+        sent.append((tx_hash, indexes, nonce))
+    return sent
+
+
+def _finish_chunk(w3: Web3, tx_hash: bytes, indexes: List[int], nonce: Optional[int], keys: List, fields: List[Dict],
+                  wallet_util: WalletUtil, sender: str, results: List) -> None:
+    """等待分发交易上链，记录其中每个条目的终态"""
+    chain_name = fields[indexes[0]]['chain_name']
+    try:
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=EVM_RECEIPT_TIMEOUT)
+    except Exception as e:
+        # 未确认的条目保持已签名状态，重新运行任务时重播原交易
+        log_error(f"等待分发交易 {Web3.to_hex(tx_hash)} 确认失败: {e}")
+        for index in indexes:
+            results[index] = {"success": False, "error": f"等待确认失败: {e}", "tx_hash": Web3.to_hex(tx_hash)}
+        return
+    if nonce is not None and wallet_util.nonce_manager is not None:
+        wallet_util.nonce_manager.settle(chain_name, sender, nonce)
+    tx_hex = Web3.to_hex(tx_hash)
+    block_number = receipt['blockNumber']
+    for index in indexes:
+        if receipt['status'] == 1:
+            results[index] = {"success": True, "tx_hash": tx_hex, "block_number": block_number,
+                              **{key: fields[index][key] for key in
+                                 ('from_address', 'to_address', 'amount', 'chain_name', 'coin_name')}}
+            wallet_util._journal_record(keys[index], STATE_CONFIRMED, block_number=block_number)
+        else:
+            results[index] = {"success": False, "error": "分发交易执行失败", "tx_hash": tx_hex}
+            wallet_util._journal_record(keys[index], STATE_FAILED, block_number=block_number, error="分发交易执行失败")
+    log_info(f"分发交易已上链: {json.dumps({'tx_hash': tx_hex, 'recipients': len(indexes), 'status': receipt['status']}, ensure_ascii=False)}")
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import hashlib
+import secrets
+import threading
+from typing import Dict, Optional, Tuple
+from Crypto.Cipher import AES
+from eth_account import Account
+from solders.keypair import Keypair
+
+DEFAULT_VAULT_PATH = os.path.join("data", "keys.vault")
+# 解锁密钥库口令的环境变量（无人值守批量任务使用，缺省时交互输入）
+VAULT_PASSPHRASE_ENV = "MYWALLET_VAULT_PASSPHRASE"
+
+KIND_EVM = "evm"
+KIND_SOLANA = "solana"
+
+# scrypt 参数与以太坊 keystore 默认值一致，解锁一次约0.5秒
+SCRYPT_N = 2 ** 17
+SCRYPT_R = 8
+SCRYPT_P = 1
+# 解密出的签名对象在内存中保留的时间（秒），超时后从密钥库重新解密（不需要再次输入口令）
+DEFAULT_SIGNER_TTL = 900.0
+
+_CHECK_PLAINTEXT = b"mywallet-vault"
+_CHECK_AAD = b"check"
+
+
+class KeyVault:
+    """
+    加密密钥库：一个文件保存多个私钥，按标签引用
+
+    口令经 scrypt 派生出加密密钥，每个私钥单独用 AES-GCM 加密（标签和链类型作为附加数据，
+    防止条目被互换）。每次会话只需解锁一次；解密出的 LocalAccount / Keypair 按 signer_ttl
+    缓存在内存中，批量转账不必每笔重复派生密钥和解析私钥。标签对应的地址明文保存，查看列表不需要解锁。
+    """
+
+    def __init__(self, path: str = DEFAULT_VAULT_PATH, signer_ttl: float = DEFAULT_SIGNER_TTL):
+        """
+        初始化密钥库（不解锁）
+
+        Args:
+            path: 密钥库文件路径
+            signer_ttl: 签名对象缓存时间（秒）
+        """
+        self.path = path
+        self.signer_ttl = signer_ttl
+        self._data: Optional[Dict] = None
+        self._key: Optional[bytes] = None
+        self._signers: Dict[Tuple[str, str], Tuple[object, float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @property
+    def is_unlocked(self) -> bool:
+        return self._key is not None
+
+    def create(self, passphrase: str) -> None:
+        """
+        新建空密钥库并解锁
+
+        Raises:
+            ValueError: 文件已存在或口令为空
+        """
+        if self.exists:
+            raise ValueError(f"密钥库已存在: {self.path}")
+        if not passphrase:
+            raise ValueError("密钥库口令不能为空")
+        kdf = {"name": "scrypt", "salt": secrets.token_hex(16), "n": SCRYPT_N, "r": SCRYPT_R, "p": SCRYPT_P}
+        key = _derive_key(passphrase, kdf)
+        with self._lock:
+            self._data = {"version": 1, "kdf": kdf, "check": _encrypt(key, _CHECK_PLAINTEXT, _CHECK_AAD), "keys": {}}
+            self._key = key
+            self._save_locked()
+
+    def unlock(self, passphrase: str) -> None:
+        """
+        用口令解锁密钥库
+
+        Raises:
+            ValueError: 口令错误
+        """
+        data = self._load()
+        key = _derive_key(passphrase, data["kdf"])
+        try:
+            _decrypt(key, data["check"], _CHECK_AAD)
+        except ValueError:
+            raise ValueError("密钥库口令错误")
+        with self._lock:
+            self._data = data
+            self._key = key
+            self._signers.clear()
+
+    def lock(self) -> None:
+        """锁定密钥库，清除内存中的加密密钥和签名对象"""
+        with self._lock:
+            self._key = None
+            self._signers.clear()
+
+    def labels(self) -> Dict[str, Dict[str, str]]:
+        """
+        列出全部标签（不需要解锁）
+
+        Returns:
+            Dict[str, Dict[str, str]]: {标签: {链类型: 地址}}
+        """
+        data = self._data if self._data is not None else self._load()
+        return {label: {kind: entry["address"] for kind, entry in kinds.items()}
+                for label, kinds in data["keys"].items()}
+
+    def add(self, label: str, kind: str, secret: bytes) -> str:
+        """
+        加入私钥（同一标签可以同时保存一个EVM私钥和一个Solana私钥）
+
+        Args:
+            label: 标签
+            kind: 链类型 evm / solana
+            secret: EVM为32字节私钥，Solana为64字节密钥对
+
+        Returns:
+            str: 地址
+        """
+        signer = _make_signer(kind, secret)
+        address = signer.address if kind == KIND_EVM else str(signer.pubkey())
+        with self._lock:
+            key = self._require_unlocked()
+            entry = _encrypt(key, secret, _aad(label, kind))
+            entry["address"] = address
+            self._data["keys"].setdefault(label, {})[kind] = entry
+            self._signers.pop((label, kind), None)
+            self._save_locked()
+        return address
+
+    def remove(self, label: str) -> None:
+        """删除标签下的全部私钥"""
+        with self._lock:
+            self._require_unlocked()
+            if self._data["keys"].pop(label, None) is None:
+                raise ValueError(f"密钥库中没有标签: {label}")
+            self._signers = {k: v for k, v in self._signers.items() if k[0] != label}
+            self._save_locked()
+
+    def signer(self, label: str, kind: str):
+        """
+        获取签名对象（缓存未过期时直接返回）
+
+        Args:
+            label: 标签
+            kind: 链类型 evm / solana
+
+        Returns:
+            LocalAccount 或 Keypair
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._signers.get((label, kind))
+            if cached is not None and cached[1] > now:
+                return cached[0]
+            key = self._require_unlocked()
+            entry = self._data["keys"].get(label, {}).get(kind)
+            if entry is None:
+                raise ValueError(f"密钥库中没有标签 {label} 的{kind}私钥")
+            signer = _make_signer(kind, _decrypt(key, entry, _aad(label, kind)))
+            self._signers[(label, kind)] = (signer, now + self.signer_ttl)
+            return signer
+
+    def _require_unlocked(self) -> bytes:
+        if self._key is None:
+            raise ValueError("密钥库未解锁")
+        return self._key
+
+    def _load(self) -> Dict:
+        if not self.exists:
+            raise ValueError(f"密钥库不存在: {self.path}")
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_locked(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = self.path + ".tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class VaultKey:
+    """密钥库中私钥的引用，可以代替私钥字符串传给 WalletUtil.transfer_token / BatchRunner"""
+
+    def __init__(self, vault: KeyVault, label: str):
+        self.vault = vault
+        self.label = label
+
+    def signer(self, kind: str):
+        return self.vault.signer(self.label, kind)
+
+    def __repr__(self) -> str:
+        return f"VaultKey({self.label!r})"
+
+
+def _derive_key(passphrase: str, kdf: Dict) -> bytes:
+    return hashlib.scrypt(passphrase.encode("utf-8"), salt=bytes.fromhex(kdf["salt"]), n=kdf["n"], r=kdf["r"],
+                          p=kdf["p"], maxmem=256 * kdf["r"] * kdf["n"], dklen=32)
+
+
+def _aad(label: str, kind: str) -> bytes:
+    return f"{label}:{kind}".encode("utf-8")
+
+
+def _encrypt(key: bytes, plaintext: bytes, aad: bytes) -> Dict:
+    cipher = AES.new(key, AES.MODE_GCM)
+    cipher.update(aad)
+    ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+    return {"nonce": cipher.nonce.hex(), "ciphertext": (ciphertext + tag).hex()}
+
+
+def _decrypt(key: bytes, entry: Dict, aad: bytes) -> bytes:
+    """解密条目，密钥错误或数据被篡改时抛出 ValueError"""
+    data = bytes.fromhex(entry["ciphertext"])
+    cipher = AES.new(key, AES.MODE_GCM, nonce=bytes.fromhex(entry["nonce"]))
+    cipher.update(aad)
+    return cipher.decrypt_and_verify(data[:-16], data[-16:])
+
+
+def _make_signer(kind: str, secret: bytes):
+    if kind == KIND_EVM:
+        return Account.from_key(secret)
+    if kind == KIND_SOLANA:
+        return Keypair.from_bytes(secret)
+    raise ValueError(f"不支持的链类型: {kind}")
@@ -0,0 +1,330 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from decimal import Decimal
+from typing import List, Dict, Optional, Tuple
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+DEFAULT_NONCE_DB_PATH = os.path.join("data", "nonces.db")
+
+# 替换交易的gas价格至少上浮12.5%（节点要求至少10%，否则返回 replacement transaction underpriced）
+REPLACEMENT_BUMP = Decimal("1.125")
+# 已分配但一直没有签名记录的nonce，超过该秒数视为丢失（进程在广播前崩溃），可重新分配
+ALLOCATION_TTL = 300.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nonce_cursors (
+    chain_name TEXT NOT NULL,
+    address TEXT NOT NULL,
+    next_nonce INTEGER NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (chain_name, address)
+);
+CREATE TABLE IF NOT EXISTS nonce_txs (
+    chain_name TEXT NOT NULL,
+    address TEXT NOT NULL,
+    nonce INTEGER NOT NULL,
+    tx_hash TEXT,
+    gas_price INTEGER,
+    tx_json TEXT,
+    hashes TEXT,
+    job_id TEXT,
+    item_id TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (chain_name, address, nonce)
+);
+CREATE TABLE IF NOT EXISTS free_nonces (
+    chain_name TEXT NOT NULL,
+    address TEXT NOT NULL,
+    nonce INTEGER NOT NULL,
+    PRIMARY KEY (chain_name, address, nonce)
+);
+"""
+
+_TX_COLUMNS = ("chain_name", "address", "nonce", "tx_hash", "gas_price", "tx_json", "hashes", "job_id", "item_id",
+               "created_at", "updated_at")
+
+
+class NonceManager:
+    """
+    EVM nonce 管理器（SQLite持久化）
+
+    按 (链, 发送方) 原子地分配nonce：线程间用锁互斥，进程间用 BEGIN IMMEDIATE 事务互斥，
+    多个线程/进程从同一地址并发转账不会拿到重复的nonce。每隔 resync_interval 秒与链上nonce
+    对齐（采纳外部发出的交易，回收丢失的nonce）。已广播交易按nonce记录gas价格和原始交易参数，
+    长时间未上链且gas价格低于市价时可用同一nonce提价重发。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_NONCE_DB_PATH, resync_interval: float = 60.0):
+        """
+        初始化nonce管理器
+
+        Args:
+            db_path: SQLite数据库文件路径
+            resync_interval: 与链上nonce对齐的间隔（秒）
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.db_path = db_path
+        self.resync_interval = resync_interval
+        self._lock = threading.Lock()
+        # 手动控制事务，分配nonce时用 BEGIN IMMEDIATE 取得写锁
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def allocate(self, chain_name: str, address: str, w3: Web3, job_id: Optional[str] = None,
+                 item_id: Optional[str] = None) -> int:
+        """
+        分配下一个nonce（优先复用已归还的nonce）
+
+        Args:
+            chain_name: 链名称
+            address: 发送方地址
+            w3: 用于查询链上 pending nonce 的Web3实例
+            job_id: 批量任务ID（仅用于记录）
+            item_id: 条目ID（仅用于记录）
+
+        Returns:
+            int: nonce
+        """
+        address = Web3.to_checksum_address(address)
+        cursor = self._cursor(chain_name, address)
+        chain_nonces = None
+        if cursor is None or time.time() - cursor[1] >= self.resync_interval:
+            # 网络查询放在事务之外，避免持有写锁等待RPC
+            chain_nonces = _chain_nonces(w3, address)
+        with self._transaction():
+            if chain_nonces is not None:
+                self._sync_locked(chain_name, address, *chain_nonces)
+            row = self._conn.execute("SELECT MIN(nonce) FROM free_nonces WHERE chain_name = ? AND address = ?",
+                                     (chain_name, address)).fetchone()
+            if row[0] is not None:
+                nonce = row[0]
+                self._conn.execute("DELETE FROM free_nonces WHERE chain_name = ? AND address = ? AND nonce = ?",
+                                   (chain_name, address, nonce))
+            else:
+                nonce = self._conn.execute("SELECT next_nonce FROM nonce_cursors WHERE chain_name = ? AND address = ?",
+                                           (chain_name, address)).fetchone()[0]
+                self._conn.execute("UPDATE nonce_cursors SET next_nonce = ? WHERE chain_name = ? AND address = ?",
+                                   (nonce + 1, chain_name, address))
+            now = time.time()
+            self._conn.execute("INSERT OR REPLACE INTO nonce_txs (chain_name, address, nonce, job_id, item_id, "
+                               "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (chain_name, address, nonce, job_id, item_id, now, now))
+        return nonce
+
+    def release(self, chain_name: str, address: str, nonce: int) -> None:
+        """
+        归还未被使用的nonce（交易被节点拒绝、确定没有进入内存池时调用），下次分配优先复用
+        """
+        address = Web3.to_checksum_address(address)
+        with self._transaction():
+            self._conn.execute("DELETE FROM nonce_txs WHERE chain_name = ? AND address = ? AND nonce = ?",
+                               (chain_name, address, nonce))
+            self._conn.execute("INSERT OR IGNORE INTO free_nonces (chain_name, address, nonce) VALUES (?, ?, ?)",
+                               (chain_name, address, nonce))
+
+    def resync(self, chain_name: str, address: str, w3: Web3) -> int:
+        """
+        立即与链上 pending nonce 对齐
+
+        Returns:
+            int: 对齐后的下一个nonce
+        """
+        address = Web3.to_checksum_address(address)
+        chain_nonces = _chain_nonces(w3, address)
+        with self._transaction():
+            self._sync_locked(chain_name, address, *chain_nonces)
+            return self._conn.execute("SELECT next_nonce FROM nonce_cursors WHERE chain_name = ? AND address = ?",
+                                      (chain_name, address)).fetchone()[0]
+
+    def track(self, chain_name: str, address: str, nonce: int, tx_hash: str, transaction: Dict) -> None:
+        """
+        记录已签名（即将广播）的交易，供卡单时提价重发
+
+        Args:
+            transaction: 待签名交易参数（包含 gasPrice），重发时只修改 gasPrice
+        """
+        address = Web3.to_checksum_address(address)
+        with self._transaction():
+            self._conn.execute("UPDATE nonce_txs SET tx_hash = ?, gas_price = ?, tx_json = ?, hashes = ?, updated_at = ? "
+                               "WHERE chain_name = ? AND address = ? AND nonce = ?",
+                               (tx_hash, transaction['gasPrice'], json.dumps(transaction), json.dumps([tx_hash]),
+                                time.time(), chain_name, address, nonce))
+
+    def settle(self, chain_name: str, address: str, nonce: int) -> None:
+        """交易（或其替换交易）已上链，删除记录"""
+        address = Web3.to_checksum_address(address)
+        with self._transaction():
+            self._conn.execute("DELETE FROM nonce_txs WHERE chain_name = ? AND address = ? AND nonce = ?",
+                               (chain_name, address, nonce))
+
+    def find(self, chain_name: str, tx_hash: str) -> Optional[Dict]:
+        """按交易哈希（含已被替换的哈希）查找记录"""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(_TX_COLUMNS)} FROM nonce_txs "
+                                      f"WHERE chain_name = ? AND hashes LIKE ?",
+                                      (chain_name, f'%"{tx_hash}"%')).fetchall()
+        return _tx_row(rows[0]) if rows else None
+
+    def pending(self, chain_name: str, address: Optional[str] = None) -> List[Dict]:
+        """列出已分配但尚未确认的nonce记录"""
+        sql = f"SELECT {', '.join(_TX_COLUMNS)} FROM nonce_txs WHERE chain_name = ?"
+        params: Tuple = (chain_name,)
+        if address is not None:
+            sql += " AND address = ?"
+            params += (Web3.to_checksum_address(address),)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY address, nonce", params).fetchall()
+        return [_tx_row(row) for row in rows]
+
+    def replace(self, w3: Web3, chain_name: str, account, nonce: int,
+                bump: Decimal = REPLACEMENT_BUMP) -> Optional[Dict]:
+        """
+        gas价格低于当前市价时，用同一nonce提价重发交易
+
+        Args:
+            w3: Web3实例
+            chain_name: 链名称
+            account: 发送方账户（eth_account LocalAccount）
+            nonce: 卡住的交易的nonce
+            bump: 相对原gas价格的最小上浮倍数
+
+        Returns:
+            Optional[Dict]: 替换交易 {'nonce', 'tx_hash', 'raw_tx', 'gas_price', 'hashes'}；
+                            无记录或gas价格不低于市价（只需继续等待）时返回None
+        """
+        address = account.address
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_TX_COLUMNS)} FROM nonce_txs "
+                                     f"WHERE chain_name = ? AND address = ? AND nonce = ?",
+                                     (chain_name, address, nonce)).fetchone()
+        if row is None or row[5] is None:
+            return None
+        tx = _tx_row(row)
+        market_price = w3.eth.gas_price
+        if tx['gas_price'] >= market_price:
+            return None
+        gas_price = max(market_price, int(Decimal(tx['gas_price']) * bump) + 1)
+        transaction = json.loads(tx['tx_json'])
+        transaction['gasPrice'] = gas_price
+        signed_txn = account.sign_transaction(transaction)
+        tx_hash = Web3.to_hex(signed_txn.hash)
+        hashes = tx['hashes'] + [tx_hash]
+        # 先记录再广播，崩溃后仍能按任一哈希找到这笔交易
+        with self._transaction():
+            self._conn.execute("UPDATE nonce_txs SET tx_hash = ?, gas_price = ?, tx_json = ?, hashes = ?, updated_at = ? "
+                               "WHERE chain_name = ? AND address = ? AND nonce = ?",
+                               (tx_hash, gas_price, json.dumps(transaction), json.dumps(hashes), time.time(),
+                                chain_name, address, nonce))
+        w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+        return {'nonce': nonce, 'tx_hash': tx_hash, 'raw_tx': Web3.to_hex(signed_txn.raw_transaction),
+                'gas_price': gas_price, 'hashes': hashes}
+
+    def replace_stuck(self, w3: Web3, chain_name: str, account, min_age: float = 120.0,
+                      bump: Decimal = REPLACEMENT_BUMP) -> List[Dict]:
+        """
+        扫描发送方超过 min_age 秒未确认的交易：已上链的删除记录，gas价格低于市价的提价重发
+
+        Returns:
+            List[Dict]: 替换交易列表（附带 job_id/item_id，便于调用方更新转账日志）
+        """
+        replaced = []
+        now = time.time()
+        for tx in self.pending(chain_name, account.address):
+            if tx['tx_json'] is None or now - tx['updated_at'] < min_age:
+                continue
+            if any(_has_receipt(w3, tx_hash) for tx_hash in tx['hashes']):
+                self.settle(chain_name, account.address, tx['nonce'])
+                continue
+            replacement = self.replace(w3, chain_name, account, tx['nonce'], bump)
+            if replacement is not None:
+                replaced.append({**replacement, 'job_id': tx['job_id'], 'item_id': tx['item_id']})
+        return replaced
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _cursor(self, chain_name: str, address: str) -> Optional[Tuple[int, float]]:
+        with self._lock:
+            return self._conn.execute("SELECT next_nonce, synced_at FROM nonce_cursors WHERE chain_name = ? AND address = ?",
+                                      (chain_name, address)).fetchone()
+
+    def _sync_locked(self, chain_name: str, address: str, latest_nonce: int, pending_nonce: int) -> None:
+        """
+        与链上nonce对齐（需在事务内调用）
+
+        - 链上 pending nonce 更大：外部发出了交易，游标前移
+        - 已上链（小于 latest nonce）的记录删除；已在内存池（小于 pending nonce）的nonce不再复用
+        - pending nonce 与游标之间没有记录（或分配后长时间未签名）的nonce视为丢失，加入待复用
+        """
+        now = time.time()
+        row = self._conn.execute("SELECT next_nonce FROM nonce_cursors WHERE chain_name = ? AND address = ?",
+                                 (chain_name, address)).fetchone()
+        next_nonce = max(row[0], pending_nonce) if row else pending_nonce
+        self._conn.execute("INSERT OR REPLACE INTO nonce_cursors (chain_name, address, next_nonce, synced_at) "
+                           "VALUES (?, ?, ?, ?)", (chain_name, address, next_nonce, now))
+        self._conn.execute("DELETE FROM free_nonces WHERE chain_name = ? AND address = ? AND nonce < ?",
+                           (chain_name, address, pending_nonce))
+        self._conn.execute("DELETE FROM nonce_txs WHERE chain_name = ? AND address = ? AND nonce < ?",
+                           (chain_name, address, latest_nonce))
+        self._conn.execute("DELETE FROM nonce_txs WHERE chain_name = ? AND address = ? AND tx_hash IS NULL "
+                           "AND created_at < ?", (chain_name, address, now - ALLOCATION_TTL))
+        used = {r[0] for r in self._conn.execute("SELECT nonce FROM nonce_txs WHERE chain_name = ? AND address = ?",
+                                                  (chain_name, address))}
+        lost = [(chain_name, address, n) for n in range(pending_nonce, next_nonce) if n not in used]
+        self._conn.executemany("INSERT OR IGNORE INTO free_nonces (chain_name, address, nonce) VALUES (?, ?, ?)", lost)
+
+    def _transaction(self):
+        return _Transaction(self._lock, self._conn)
+
+
+class _Transaction:
+    """持有线程锁并执行 BEGIN IMMEDIATE ... COMMIT，异常时回滚"""
+
+    def __init__(self, lock: threading.Lock, conn: sqlite3.Connection):
+        self._lock = lock
+        self._conn = conn
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self._lock.release()
+            raise
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._lock.release()
+        return False
+
+
+def _chain_nonces(w3: Web3, address: str) -> Tuple[int, int]:
+    """查询链上 (latest, pending) nonce"""
+    return w3.eth.get_transaction_count(address, 'latest'), w3.eth.get_transaction_count(address, 'pending')
+
+
+def _has_receipt(w3: Web3, tx_hash: str) -> bool:
+    try:
+        w3.eth.get_transaction_receipt(tx_hash)
+        return True
+    except TransactionNotFound:
+        return False
+
+
+def _tx_row(row: Tuple) -> Dict:
+    tx = dict(zip(_TX_COLUMNS, row))
+    tx['hashes'] = json.loads(tx['hashes']) if tx['hashes'] else []
+    return tx
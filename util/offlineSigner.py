@@ -0,0 +1,327 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Iterable, List, Dict, Optional, Iterator, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from eth_account import Account
+from web3 import Web3
+from .walletUtil import WalletUtil, build_evm_transfer, log_info, log_error
+from .rpcClient import EvmHTTPProvider
+from .rateLimiter import is_throttle_error
+from .addressScreen import LEVEL_BLOCK, describe_hit
+from .txJournal import TxJournal, STATE_PLANNED, STATE_SIGNED, STATE_BROADCAST, STATE_CONFIRMED, FINAL_STATES
+
+# 广播时视为“原交易已在内存池或已上链”的错误，重复广播同一批文件是安全的
+_ALREADY_SENT_ERRORS = ("already known", "known transaction", "already imported")
+# nonce too low 可能是这笔交易已上链，也可能是该nonce已被其它交易使用，需要按交易哈希向节点确认
+_NONCE_TOO_LOW = "nonce too low"
+
+
+def _bounded_map(pool, fn: Callable, tasks: Iterable, limit: int) -> Iterator[Any]:
+    """
+    与 pool.map 相同，按输入顺序返回结果，但最多 limit 个任务在途或等待输出：
+    完成一个再从输入中取下一个，不会一次读完整个输入（如逐行读取的已签名文件）
+    """
+    tasks = iter(tasks)
+    in_flight = {}
+    ready = {}
+    submitted = 0
+    next_index = 0
+    while True:
+        while len(in_flight) + len(ready) < limit:
+            task = next(tasks, None)
+            if task is None:
+                break
+            in_flight[pool.submit(fn, task)] = submitted
+            submitted += 1
+        if not in_flight:
+            break
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            ready[in_flight.pop(future)] = future
+        while next_index in ready:
+            yield ready.pop(next_index).result()
+            next_index += 1
+
+
+def build_plan(job: Dict, from_address: str, nonce_start: int, gas_price: int,
+               wallet_util: Optional[WalletUtil] = None) -> Dict:
+    """
+    由批量任务生成签名计划（nonce和gas价格在此确定，签名阶段完全离线）
+
+    Args:
+        job: 批量任务（load_job 的结果），全部条目需在同一条EVM链上
+        from_address: 发送方地址
+        nonce_start: 第一笔交易的nonce
+        gas_price: gas价格（wei）
+        wallet_util: 用于读取链和代币配置
+
+    Returns:
+        Dict: 签名计划
+    """
+    wallet_util = wallet_util or WalletUtil()
+    items = job.get('items', [])
+    if not items:
+        raise ValueError("任务中没有转账条目")
+    chain_name = items[0]['chain_name']
+    transactions = []
+    for offset, item in enumerate(items):
+        if item['chain_name'] != chain_name:
+            raise ValueError(f"签名计划只支持单条链: {chain_name} / {item['chain_name']}")
+        chain_info, token_info = wallet_util._validate_chain_and_token(item['chain_name'], item['coin_name'])
+        hit = wallet_util.screener.check(item['to_address']) if wallet_util.screener is not None else None
+        if hit is not None:
+            # 计划中的nonce是连续的，不能跳过条目，命中拒绝名单时整个计划不生成
+            if hit['level'] == LEVEL_BLOCK:
+                raise ValueError(f"条目 {item['item_id']}: {describe_hit(hit)}")
+            log_error(f"条目 {item['item_id']}: {describe_hit(hit)}")
+        transactions.append({
+            'item_id': item['item_id'],
+            'from_address': from_address,
+            'to_address': item['to_address'],
+            'coin_name': item['coin_name'],
+            'amount': str(item['amount']),
+            'nonce': nonce_start + offset,
+            'token': {k: token_info[k] for k in ('contractAddress', 'decimals', 'isNative')},
+        })
+    return {
+        'job_id': job['job_id'],
+        'chain_name': chain_name,
+        'chain_id': int(chain_info['chain_id']),
+        'gas_price': gas_price,
+        'transactions': transactions,
+    }
+
+
+def fetch_plan_params(chain_info: Dict, from_address: str) -> Dict:
+    """
+    在线查询签名计划需要的nonce和gas价格（一次批量请求）
+
+    Returns:
+        Dict: {'nonce': int, 'gas_price': int}
+    """
+    provider = EvmHTTPProvider(chain_info['chainName'], chain_info['rpc'])
+    nonce_resp, gas_resp = provider.make_batch_request([
+        ('eth_getTransactionCount', [from_address, 'pending']),
+        ('eth_gasPrice', []),
+    ])
+    for resp in (nonce_resp, gas_resp):
+        if 'error' in resp:
+            raise Exception(f"查询签名参数失败: {resp['error']}")
+    return {'nonce': int(nonce_resp['result'], 16), 'gas_price': int(gas_resp['result'], 16)}
+
+
+# ---- 签名阶段（进程池，每个进程按私钥缓存账户） ----
+
+_worker_accounts: Dict[str, object] = {}
+_worker_w3: Optional[Web3] = None
+
+
+def _init_sign_worker(private_keys: List[str]) -> None:
+    global _worker_w3
+    _worker_w3 = Web3()
+    for private_key in private_keys:
+        account = Account.from_key(private_key)
+        _worker_accounts[account.address.lower()] = account
+
+
+def _sign_chunk(args) -> List[Dict]:
+    chain_id, gas_price, transactions = args
+    signed = []
+    for tx in transactions:
+        account = _worker_accounts.get(tx['from_address'].lower())
+        if account is None:
+            raise ValueError(f"缺少发送方私钥: {tx['from_address']}")
+        transaction = build_evm_transfer(_worker_w3, tx['to_address'], tx['token'], tx['amount'],
+                                         tx['nonce'], tx.get('gas_price', gas_price), chain_id)
+        signed_txn = account.sign_transaction(transaction)
+        signed.append({
+            'item_id': tx['item_id'],
+            'from_address': account.address,
+            'to_address': tx['to_address'],
+            'coin_name': tx['coin_name'],
+            'amount': tx['amount'],
+            'nonce': tx['nonce'],
+            'tx_hash': Web3.to_hex(signed_txn.hash),
+            'raw_tx': Web3.to_hex(signed_txn.raw_transaction),
+        })
+    return signed
+
+
+def sign_plan(plan: Dict, private_keys: List[str], output_path: str, workers: Optional[int] = None,
+              chunk_size: int = 200) -> int:
+    """
+    离线批量签名，结果按计划顺序写入JSONL文件
+
+    Args:
+        plan: 签名计划
+        private_keys: 发送方私钥（每个工作进程只解析一次）
+        output_path: 输出文件，第一行为计划头信息，其余每行一笔已签名交易
+        workers: 进程数，默认CPU核数
+        chunk_size: 每个任务包含的交易数
+
+    Returns:
+        int: 签名的交易数
+    """
+    transactions = plan['transactions']
+    chunks = ((plan['chain_id'], plan['gas_price'], transactions[i:i + chunk_size])
+              for i in range(0, len(transactions), chunk_size))
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'job_id': plan['job_id'], 'chain_name': plan['chain_name'],
+                            'chain_id': plan['chain_id']}, ensure_ascii=False) + "\n")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_sign_worker,
+                                 initargs=(private_keys,)) as pool:
+            for signed in _bounded_map(pool, _sign_chunk, chunks, workers * 2):
+                for tx in signed:
+                    f.write(json.dumps(tx, ensure_ascii=False) + "\n")
+                count += len(signed)
+    log_info(f"离线签名完成: {plan['job_id']} 共{count}笔 -> {output_path}")
+    return count
+
+
+def read_signed(signed_path: str) -> Tuple[Dict, Iterator[Dict]]:
+    """读取已签名文件，返回 (头信息, 交易迭代器)"""
+    f = open(signed_path, 'r', encoding='utf-8')
+    header = json.loads(f.readline())
+
+    def iterate():
+        with f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    return header, iterate()
+
+
+# ---- 广播阶段（连接池 + JSON-RPC 批量请求） ----
+
+def _known_transactions(provider: EvmHTTPProvider, tx_hashes: List[str]) -> List[bool]:
+    """批量查询节点是否知道这些交易（eth_getTransactionByHash 有结果），查询失败时视为不知道"""
+    if not tx_hashes:
+        return []
+    try:
+        responses = provider.make_batch_request([('eth_getTransactionByHash', [tx_hash]) for tx_hash in tx_hashes])
+    except Exception as e:
+        log_error(f"查询交易是否存在失败: {e}")
+        return [False] * len(tx_hashes)
+    if not isinstance(responses, list):
+        return [False] * len(tx_hashes)
+    return [resp.get('result') is not None for resp in responses]
+
+
+def broadcast_signed(signed_path: str, rpc_url: Optional[str] = None, concurrency: int = 8, batch_size: int = 50,
+                     journal: Optional[TxJournal] = None, wallet_util: Optional[WalletUtil] = None) -> List[Dict]:
+    """
+    广播已签名交易，每个HTTP请求携带一批 eth_sendRawTransaction
+
+    Args:
+        signed_path: sign_plan 输出的文件
+        rpc_url: RPC节点，默认取 chain.json 中该链的节点
+        concurrency: 并发HTTP请求数（即连接池大小）
+        batch_size: 每个JSON-RPC批量请求包含的交易数
+        journal: 转账日志，传入后记录 signed / broadcast 状态，可与 BatchRunner 续跑衔接
+        wallet_util: 用于读取链配置
+
+    Returns:
+        List[Dict]: 每笔交易的广播结果 {'item_id', 'tx_hash', 'success', 'error'}
+
+    同一发送方的交易可能分散在并发的批次中乱序到达，节点会把高nonce交易暂存在队列中等待前序交易
+    """
+    header, transactions = read_signed(signed_path)
+    if rpc_url is None:
+        rpc_url = (wallet_util or WalletUtil())._get_chain_info(header['chain_name'])['rpc']
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    provider = EvmHTTPProvider(header['chain_name'], rpc_url, session=session)
+    job_id = header['job_id']
+    entries = journal.job_entries(job_id) if journal is not None else {}
+
+    def send_batch(batch: List[Dict]) -> List[Dict]:
+        finished = []
+        if journal is not None:
+            # 已确认或已失败的条目不再广播；已由另一笔交易发送的条目（如 BatchRunner 用其它nonce发出）也不广播，
+            # 否则同一条目会转账两次；其余先把签名结果落盘再广播
+            pending = []
+            for tx in batch:
+                entry = entries.get(tx['item_id'], {})
+                if entry.get('state') == STATE_CONFIRMED:
+                    finished.append({'item_id': tx['item_id'], 'tx_hash': entry.get('tx_hash') or tx['tx_hash'],
+                                     'success': True, 'error': None})
+                elif entry.get('state') in FINAL_STATES:
+                    finished.append({'item_id': tx['item_id'], 'tx_hash': entry.get('tx_hash') or tx['tx_hash'],
+                                     'success': False, 'error': entry.get('error') or "转账日志中该条目已失败"})
+                elif entry.get('tx_hash') and entry['tx_hash'] != tx['tx_hash']:
+                    finished.append({'item_id': tx['item_id'], 'tx_hash': entry['tx_hash'], 'success': False,
+                                     'error': f"转账日志中该条目已由另一笔交易 {entry['tx_hash']} 发送，未广播文件中的交易"})
+                else:
+                    pending.append(tx)
+            batch = pending
+            for tx in batch:
+                if entries.get(tx['item_id'], {}).get('state', STATE_PLANNED) == STATE_PLANNED:
+                    journal.record(job_id, tx['item_id'], STATE_SIGNED, raw_tx=tx['raw_tx'], tx_hash=tx['tx_hash'],
+                                   chain_name=header['chain_name'], coin_name=tx['coin_name'],
+                                   from_address=tx['from_address'], to_address=tx['to_address'], amount=tx['amount'])
+            journal.flush()
+        if not batch:
+            return finished
+        try:
+            responses = provider.make_batch_request([('eth_sendRawTransaction', [tx['raw_tx']]) for tx in batch])
+        except Exception as e:
+            return finished + [{'item_id': tx['item_id'], 'tx_hash': tx['tx_hash'], 'success': False, 'error': str(e)}
+                               for tx in batch]
+        if not isinstance(responses, list):
+            error = str(responses.get('error'))
+            return finished + [{'item_id': tx['item_id'], 'tx_hash': tx['tx_hash'], 'success': False, 'error': error}
+                               for tx in batch]
+        results = []
+        throttled = set()
+        for tx, resp in zip(batch, responses):
+            error = resp.get('error')
+            message = str(error.get('message', error)) if isinstance(error, dict) else (str(error) if error else None)
+            success = error is None or any(s in message.lower() for s in _ALREADY_SENT_ERRORS)
+            results.append({'item_id': tx['item_id'], 'tx_hash': tx['tx_hash'], 'success': success,
+                            'error': None if success else message})
+            if not success and is_throttle_error(error):
+                throttled.add(tx['item_id'])
+        # nonce too low：只有节点查得到这笔交易（已上链或在内存池中）才算已发送
+        nonce_low = [r for r in results if not r['success'] and _NONCE_TOO_LOW in r['error'].lower()]
+        for r, known in zip(nonce_low, _known_transactions(provider, [r['tx_hash'] for r in nonce_low])):
+            if known:
+                r['success'], r['error'] = True, None
+            else:
+                r['error'] += "（节点上查不到这笔交易，该nonce已被其它交易使用）"
+        if journal is not None:
+            for r in results:
+                if r['success']:
+                    journal.record(job_id, r['item_id'], STATE_BROADCAST)
+                elif r['item_id'] not in throttled:
+                    # 节点明确拒绝，这笔交易不会上链：清除签名结果，避免续跑时重播
+                    journal.discard_signed(job_id, r['item_id'], f"交易被节点拒绝: {r['error']}")
+        return finished + results
+
+    def batches():
+        batch = []
+        for tx in transactions:
+            batch.append(tx)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for batch_results in _bounded_map(pool, send_batch, batches(), concurrency * 2):
+            results.extend(batch_results)
+    if journal is not None:
+        journal.flush()
+    failed = [r for r in results if not r['success']]
+    log_info(f"广播完成: {job_id} 共{len(results)}笔, 失败{len(failed)}笔")
+    for r in failed[:10]:
+        log_error(f"广播失败 item_id={r['item_id']}: {r['error']}")
+    return results
@@ -0,0 +1,393 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import List, Dict, Optional, Tuple
+from web3 import Web3
+from solders.pubkey import Pubkey
+from solders.account_decoder import UiAccountEncoding
+from solders.rpc.config import RpcAccountInfoConfig
+from solders.rpc.requests import GetBalance, GetMinimumBalanceForRentExemption, GetMultipleAccounts
+from solders.rpc.responses import GetBalanceResp, GetMinimumBalanceForRentExemptionResp, GetMultipleAccountsResp
+from spl.token.instructions import get_associated_token_address
+from .walletUtil import (WalletUtil, resolve_signer, build_evm_transfer, build_solana_transfer, log_info, log_error,
+                         NATIVE_TRANSFER_GAS, ERC20_TRANSFER_GAS, SOLANA_SIGNATURE_FEE)
+from .rpcClient import EvmHTTPProvider, make_solana_client
+from .rpcCache import RPC_CACHE, account_cache_key, remember_accounts, account_exists
+from .recipientValidator import SOLANA_CHAIN_NAME, is_valid_solana_address
+from .priorityFee import (recent_fees, fee_price, priority_fee_lamports, unit_limit, unsigned_transaction,
+                          RESERVE_UNITS_PER_TRANSFER)
+
+# gas价格在批量执行期间可能上涨，按当前价格的倍数预留手续费
+DEFAULT_FEE_MARGIN = Decimal("1.2")
+# ERC20 balanceOf(address) 选择器
+_BALANCE_OF_SELECTOR = "0x70a08231"
+# SPL Token 账户大小（字节）和 amount 字段偏移
+_TOKEN_ACCOUNT_SIZE = 165
+_TOKEN_AMOUNT_OFFSET = 64
+# getMultipleAccounts 单次最多查询的账户数
+_SOLANA_MAX_ACCOUNTS = 100
+# 模拟转账时每个EVM批量请求最多包含的调用数
+_SIMULATE_BATCH_SIZE = 100
+# Solana 同时进行的模拟数
+SIMULATE_WORKERS = 16
+# 构建待模拟的交易不需要网络
+_OFFLINE_WEB3 = Web3()
+
+
+class PreflightError(Exception):
+    """预检未通过（余额不足或查询失败），report 为 preflight_check 的结果"""
+
+    def __init__(self, report: Dict):
+        failed = [r for r in report['rows'] if not r['ok']]
+        super().__init__("批量转账预检未通过: " + "; ".join(_describe(r) for r in failed))
+        self.report = report
+
+
+def preflight_check(items: List[Dict], private_key: str, wallet_util: WalletUtil = None,
+                    fee_margin: Decimal = DEFAULT_FEE_MARGIN) -> Dict:
+    """
+    批量转账预检：按 (链, 发送方, 代币) 汇总转账金额，批量查询余额和手续费，检查余额是否足够
+
+    每条链只发一次JSON-RPC批量请求，各链并行查询，耗时与条目数量基本无关。
+
+    Args:
+        items: 转账条目（chain_name/coin_name/to_address/amount）
+        private_key: 发送方私钥（或 VaultKey）
+        wallet_util: 用于读取链和代币配置
+        fee_margin: 手续费预留倍数
+
+    Returns:
+        Dict: {'ok': bool, 'rows': [{'chain_name', 'sender', 'coin_name', 'count', 'amount', 'fee',
+              'required', 'balance', 'ok', 'error'}]}，金额均为带小数的字符串
+    """
+    wallet_util = wallet_util or WalletUtil()
+    chains: Dict[str, List[Dict]] = {}
+    for item in items:
+        chains.setdefault(item['chain_name'], []).append(item)
+    if not chains:
+        return {'ok': True, 'rows': []}
+    with ThreadPoolExecutor(max_workers=min(8, len(chains))) as pool:
+        futures = [pool.submit(_check_chain, wallet_util, chain_name, chain_items, private_key, fee_margin)
+                   for chain_name, chain_items in chains.items()]
+        rows = [row for future in futures for row in future.result()]
+    report = {'ok': all(row['ok'] for row in rows), 'rows': rows}
+    for row in rows:
+        (log_info if row['ok'] else log_error)(f"预检 {_describe(row)}")
+    return report
+
+
+def simulate_items(items: List[Dict], private_key, wallet_util: WalletUtil = None) -> List[Dict]:
+    """
+    模拟转账（dry-run）：不签名、不广播，逐条预测手续费和失败原因，可在真正发送前剔除会失败的条目
+
+    EVM 用 eth_estimateGas（ERC20 另用 eth_call 检查 transfer 返回值），每个JSON-RPC批量请求最多
+    _SIMULATE_BATCH_SIZE 个调用；Solana 用 simulateTransaction 并发模拟。各链并行。
+
+    Args:
+        items: 转账条目（item_id/chain_name/coin_name/to_address/amount，可选 priority）
+        private_key: 发送方私钥（或 VaultKey）
+        wallet_util: 用于读取链和代币配置
+
+    Returns:
+        List[Dict]: 与 items 顺序一致 [{'item_id', 'chain_name', 'ok', 'gas', 'fee', 'fee_coin', 'error'}]，
+                    gas 在EVM上为预计gas、在Solana上为消耗的计算单元，fee 为带小数的原生币字符串
+    """
+    wallet_util = wallet_util or WalletUtil()
+    chains: Dict[str, List[int]] = {}
+    for index, item in enumerate(items):
+        chains.setdefault(item['chain_name'], []).append(index)
+    if not chains:
+        return []
+    results: List[Optional[Dict]] = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=min(8, len(chains))) as pool:
+        futures = {chain_name: pool.submit(_simulate_chain, wallet_util, chain_name, [items[i] for i in indexes],
+                                           private_key)
+                   for chain_name, indexes in chains.items()}
+        for chain_name, indexes in chains.items():
+            for index, row in zip(indexes, futures[chain_name].result()):
+                results[index] = row
+    failed = [row for row in results if not row['ok']]
+    (log_error if failed else log_info)(f"模拟{len(results)}笔转账，{len(failed)}笔会失败")
+    return results
+
+
+def _simulate_chain(wallet_util: WalletUtil, chain_name: str, items: List[Dict], private_key) -> List[Dict]:
+    native_name, native_decimals = None, 0
+    try:
+        chain_info = wallet_util._get_chain_info(chain_name)
+        native_name, native_decimals = _native_token(wallet_util, chain_info)
+        try:
+            signer = resolve_signer(private_key, chain_name)
+        except Exception as e:
+            raise ValueError(f"私钥格式错误: {str(e)}")
+        if chain_name == SOLANA_CHAIN_NAME:
+            outcomes = _simulate_solana(wallet_util, chain_info, items, signer.pubkey())
+        else:
+            outcomes = _simulate_evm(wallet_util, chain_info, items, signer.address)
+    except Exception as e:
+        outcomes = [(None, None, str(e))] * len(items)
+    return [{'item_id': item.get('item_id'), 'chain_name': chain_name, 'ok': error is None, 'gas': gas,
+             'fee': None if fee is None else _format(fee, native_decimals), 'fee_coin': native_name, 'error': error}
+            for item, (gas, fee, error) in zip(items, outcomes)]
+
+
+def _simulate_evm(wallet_util: WalletUtil, chain_info: Dict, items: List[Dict],
+                  sender: str) -> List[Tuple[Optional[int], Optional[int], Optional[str]]]:
+    """批量估算gas，返回每条的 (gas, 手续费, 失败原因)"""
+    calls = [('eth_gasPrice', [])]
+    slots = []
+    for item in items:
+        try:
+            _, token_info = wallet_util._validate_chain_and_token(chain_info['chainName'], item['coin_name'])
+            tx = build_evm_transfer(_OFFLINE_WEB3, item['to_address'], token_info, str(item['amount']), 0, 0,
+                                    int(chain_info['chain_id']))
+        except Exception as e:
+            slots.append(str(e))
+            continue
+        call = {'from': sender, 'to': tx['to'], 'value': hex(tx.get('value', 0))}
+        if tx.get('data'):
+            call['data'] = tx['data']
+        slots.append((len(calls), None if token_info['isNative'] else len(calls) + 1))
+        calls.append(('eth_estimateGas', [call]))
+        if not token_info['isNative']:
+            calls.append(('eth_call', [call, 'latest']))
+    provider = EvmHTTPProvider(chain_info['chainName'], chain_info['rpc'])
+    responses = []
+    for start in range(0, len(calls), _SIMULATE_BATCH_SIZE):
+        batch = provider.make_batch_request(calls[start:start + _SIMULATE_BATCH_SIZE])
+        if not isinstance(batch, list):
+            raise Exception(f"批量模拟失败: {batch.get('error')}")
+        responses.extend(batch)
+    if 'error' in responses[0]:
+        raise Exception(f"eth_gasPrice 查询失败: {responses[0]['error']}")
+    gas_price = int(responses[0]['result'], 16)
+    outcomes = []
+    for slot in slots:
+        if isinstance(slot, str):
+            outcomes.append((None, None, slot))
+            continue
+        estimate = responses[slot[0]]
+        if 'error' in estimate:
+            outcomes.append((None, None, _rpc_error(estimate['error'])))
+            continue
+        gas = int(estimate['result'], 16)
+        error = None
+        if slot[1] is not None:
+            returned = responses[slot[1]]
+            if 'error' in returned:
+                error = _rpc_error(returned['error'])
+            elif returned.get('result') not in (None, '0x') and int(returned['result'], 16) == 0:
+                error = "代币合约 transfer 返回 false"
+        outcomes.append((gas, gas * gas_price, error))
+    return outcomes
+
+
+def _simulate_solana(wallet_util: WalletUtil, chain_info: Dict, items: List[Dict],
+                     payer: Pubkey) -> List[Tuple[Optional[int], Optional[int], Optional[str]]]:
+    """并发模拟，返回每条的 (计算单元, 手续费, 失败原因)；手续费含签名费、优先费和创建接收方ATA的租金"""
+    chain_name = chain_info['chainName']
+    client = make_solana_client(chain_info['rpc'], chain_name)
+    blockhash = client.get_latest_blockhash().value.blockhash
+    fees = recent_fees(client, chain_name)
+    rent = []
+
+    def simulate(item: Dict) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+        try:
+            _, token_info = wallet_util._validate_chain_and_token(chain_name, item['coin_name'])
+            to_pub = Pubkey.from_string(item['to_address'])
+            creates_ata = False
+            if not token_info.get('isNative', False):
+                to_ata = get_associated_token_address(to_pub, Pubkey.from_string(token_info['contractAddress']))
+                creates_ata = not account_exists(client, chain_name, to_ata)
+                if creates_ata and not rent:
+                    rent.append(client.get_minimum_balance_for_rent_exemption(_TOKEN_ACCOUNT_SIZE).value)
+            instructions = build_solana_transfer(payer, to_pub, token_info, str(item['amount']), creates_ata)
+            simulation = client.simulate_transaction(unsigned_transaction(instructions, payer, blockhash)).value
+            if simulation.err is not None:
+                return simulation.units_consumed, None, _simulation_error(simulation)
+            price = fee_price(fees, item.get('priority') or wallet_util.solana_priority)
+        except Exception as e:
+            return None, None, str(e)
+        fee = (SOLANA_SIGNATURE_FEE + priority_fee_lamports(unit_limit(simulation.units_consumed), price)
+               + (rent[0] if creates_ata else 0))
+        return simulation.units_consumed, fee, None
+
+    with ThreadPoolExecutor(max_workers=min(SIMULATE_WORKERS, len(items))) as pool:
+        return list(pool.map(simulate, items))
+
+
+def _rpc_error(error) -> str:
+    """JSON-RPC错误的可读描述（revert 原因通常在 message 中）"""
+    if isinstance(error, dict):
+        return str(error.get('message') or error)
+    return str(error)
+
+
+def _simulation_error(simulation) -> str:
+    """Solana模拟错误，附上最后一条程序日志（通常是具体原因）"""
+    logs = [line for line in simulation.logs or [] if 'Error' in line or 'failed' in line]
+    return f"{simulation.err}（{logs[-1]}）" if logs else str(simulation.err)
+
+
+def _check_chain(wallet_util: WalletUtil, chain_name: str, items: List[Dict], private_key: str,
+                 fee_margin: Decimal) -> List[Dict]:
+    try:
+        chain_info = wallet_util._get_chain_info(chain_name)
+        totals = {}
+        for item in items:
+            _, token_info = wallet_util._validate_chain_and_token(chain_name, item['coin_name'])
+            total = totals.setdefault(item['coin_name'], {'token_info': token_info, 'count': 0, 'amount': 0,
+                                                          'recipients': set()})
+            total['count'] += 1
+            total['amount'] += int(Decimal(str(item['amount'])) * 10 ** token_info['decimals'])
+            total['recipients'].add(item['to_address'])
+        native_name, native_decimals = _native_token(wallet_util, chain_info)
+        is_solana = chain_name == SOLANA_CHAIN_NAME
+        try:
+            signer = resolve_signer(private_key, chain_name)
+            sender = str(signer.pubkey()) if is_solana else signer.address
+        except Exception as e:
+            raise ValueError(f"私钥格式错误: {str(e)}")
+        if is_solana:
+            priorities = [item.get('priority') or wallet_util.solana_priority for item in items]
+            balances, fee = _solana_balances(chain_info, sender, totals, native_name, priorities)
+        else:
+            balances, fee = _evm_balances(chain_info, sender, totals, native_name, fee_margin)
+    except Exception as e:
+        return [{'chain_name': chain_name, 'sender': None, 'coin_name': None, 'count': len(items), 'amount': None,
+                 'fee': None, 'required': None, 'balance': None, 'ok': False, 'error': str(e)}]
+
+    # 原生币一行包含手续费，即使批量中没有原生币转账也要检查
+    native = totals.pop(native_name, None) or {'count': 0, 'amount': 0}
+    rows = [_row(chain_name, sender, native_name, native['count'], native['amount'], fee,
+                 balances[native_name], native_decimals)]
+    for coin_name, total in totals.items():
+        rows.append(_row(chain_name, sender, coin_name, total['count'], total['amount'], 0,
+                         balances[coin_name], total['token_info']['decimals']))
+    return rows
+
+
+def _native_token(wallet_util: WalletUtil, chain_info: Dict) -> Tuple[str, int]:
+    """返回 (原生币名称, 精度)"""
+    for token in wallet_util._load_contract_config().get('tokens', []):
+        if token['chainName'] == chain_info['chainName'] and token.get('isNative'):
+            return token['coinName'], token['decimals']
+    return chain_info['currency'], 9 if chain_info['chainName'] == SOLANA_CHAIN_NAME else 18
+
+
+def _evm_balances(chain_info: Dict, sender: str, totals: Dict, native_name: str,
+                  fee_margin: Decimal) -> Tuple[Dict, int]:
+    """一次批量请求查询gas价格、原生币余额和各ERC20余额，返回 (余额, 手续费)，单位均为最小单位"""
+    erc20 = [name for name, total in totals.items() if not total['token_info']['isNative']]
+    balance_of = _BALANCE_OF_SELECTOR + sender[2:].lower().rjust(64, "0")
+    calls = [('eth_gasPrice', []), ('eth_getBalance', [sender, 'latest'])]
+    calls += [('eth_call', [{'to': totals[name]['token_info']['contractAddress'], 'data': balance_of}, 'latest'])
+              for name in erc20]
+    provider = EvmHTTPProvider(chain_info['chainName'], chain_info['rpc'])
+    responses = provider.make_batch_request(calls)
+    if not isinstance(responses, list):
+        raise Exception(f"批量查询余额失败: {responses.get('error')}")
+    results = []
+    for (method, _), resp in zip(calls, responses):
+        if 'error' in resp:
+            raise Exception(f"{method} 查询失败: {resp['error']}")
+        results.append(int(resp['result'], 16) if resp['result'] not in (None, '0x') else 0)
+    gas_price, native_balance = results[0], results[1]
+    gas = sum(total['count'] * (NATIVE_TRANSFER_GAS if total['token_info']['isNative'] else ERC20_TRANSFER_GAS)
+              for total in totals.values())
+    fee = int(gas_price * gas * fee_margin)
+    balances = {name: balance for name, balance in zip(erc20, results[2:])}
+    balances[native_name] = native_balance
+    return balances, fee
+
+
+def _solana_balances(chain_info: Dict, sender: str, totals: Dict, native_name: str,
+                     priorities: List[str]) -> Tuple[Dict, int]:
+    """
+    一次批量请求查询SOL余额、发送方Token账户余额和接收方ATA是否存在，返回 (余额, 手续费)
+
+    接收方ATA不存在时转账会由发送方创建并支付租金，计入手续费；已缓存的ATA状态不再查询。
+    每笔转账按其优先费档位和当前优先费预留 RESERVE_UNITS_PER_TRANSFER 个计算单元的优先费
+    """
+    owner = Pubkey.from_string(sender)
+    spl = [name for name, total in totals.items() if not total['token_info']['isNative']]
+    mints = {name: Pubkey.from_string(totals[name]['token_info']['contractAddress']) for name in spl}
+    config = RpcAccountInfoConfig(encoding=UiAccountEncoding.Base64)
+    reqs = [GetBalance(owner), GetMinimumBalanceForRentExemption(_TOKEN_ACCOUNT_SIZE)]
+    parsers = [GetBalanceResp, GetMinimumBalanceForRentExemptionResp]
+    if spl:
+        reqs.append(GetMultipleAccounts([get_associated_token_address(owner, mints[name]) for name in spl], config))
+        parsers.append(GetMultipleAccountsResp)
+    recipient_atas = []
+    missing = 0
+    for name in spl:
+        for to in sorted(totals[name]['recipients']):
+            if not is_valid_solana_address(to):
+                continue
+            ata = get_associated_token_address(Pubkey.from_string(to), mints[name])
+            # 缓存中已知是否存在的ATA不再查询
+            exists = RPC_CACHE.get("account_exists", account_cache_key(chain_info['chainName'], str(ata)))
+            if exists is None:
+                recipient_atas.append(ata)
+            elif not exists:
+                missing += 1
+    for start in range(0, len(recipient_atas), _SOLANA_MAX_ACCOUNTS):
+        reqs.append(GetMultipleAccounts(recipient_atas[start:start + _SOLANA_MAX_ACCOUNTS], config))
+        parsers.append(GetMultipleAccountsResp)
+
+    client = make_solana_client(chain_info['rpc'], chain_info['chainName'])
+    responses = client._provider.make_batch_request(tuple(reqs), tuple(parsers))
+    for resp in responses:
+        if not hasattr(resp, 'value'):
+            raise Exception(f"批量查询余额失败: {resp}")
+    lamports, rent = responses[0].value, responses[1].value
+    balances = {}
+    if spl:
+        for name, account in zip(spl, responses[2].value):
+            balances[name] = token_account_amount(account)
+        accounts = [account for resp in responses[3:] for account in resp.value]
+        # 查询结果写入缓存，随后的转账不必逐笔查询接收方ATA
+        remember_accounts(chain_info['chainName'],
+                          {str(ata): account is not None for ata, account in zip(recipient_atas, accounts)})
+        missing += sum(1 for account in accounts if account is None)
+    count = sum(total['count'] for total in totals.values())
+    balances[native_name] = lamports
+    fees = recent_fees(client, chain_info['chainName'])
+    priority_fee = sum(priority_fee_lamports(RESERVE_UNITS_PER_TRANSFER, fee_price(fees, priority))
+                       for priority in priorities)
+    return balances, count * SOLANA_SIGNATURE_FEE + missing * rent + priority_fee
+
+
+def token_account_amount(account) -> int:
+    """从 SPL Token 账户数据中读取余额，账户不存在时为0"""
+    if account is None or len(account.data) < _TOKEN_AMOUNT_OFFSET + 8:
+        return 0
+    return int.from_bytes(bytes(account.data[_TOKEN_AMOUNT_OFFSET:_TOKEN_AMOUNT_OFFSET + 8]), "little")
+
+
+def _row(chain_name: str, sender: str, coin_name: str, count: int, amount: int, fee: int, balance: int,
+         decimals: int) -> Dict:
+    required = amount + fee
+    return {
+        'chain_name': chain_name,
+        'sender': sender,
+        'coin_name': coin_name,
+        'count': count,
+        'amount': _format(amount, decimals),
+        'fee': _format(fee, decimals),
+        'required': _format(required, decimals),
+        'balance': _format(balance, decimals),
+        'ok': balance >= required,
+        'error': None if balance >= required else f"余额不足，还差 {_format(required - balance, decimals)}",
+    }
+
+
+def _format(value: int, decimals: int) -> str:
+    return f"{Decimal(value).scaleb(-decimals).normalize():f}"
+
+
+def _describe(row: Dict) -> str:
+    if row['coin_name'] is None:
+        return f"{row['chain_name']}: {row['error']}"
+    text = (f"{row['chain_name']} {row['sender']} {row['coin_name']}: {row['count']}笔 "
+            f"需要 {row['required']}（含手续费 {row['fee']}），余额 {row['balance']}")
+    return text if row['ok'] else f"{text}，{row['error']}"
@@ -0,0 +1,220 @@
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+from solders.hash import Hash
+from solders.message import Message
+from solders.pubkey import Pubkey
+from solders.transaction import Transaction
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+from solana.rpc.core import RPCException
+from .rpcCache import RPC_CACHE
+
+logger = logging.getLogger("MyWalletTool")
+
+PRIORITY_ECONOMY = "economy"
+PRIORITY_FAST = "fast"
+PRIORITY_URGENT = "urgent"
+# 优先费档位：取最近150个slot优先费的百分位，不低于 min_price（微lamports/计算单元）
+PRIORITY_PRESETS = {
+    PRIORITY_ECONOMY: {"percentile": 25, "min_price": 1_000},
+    PRIORITY_FAST: {"percentile": 75, "min_price": 10_000},
+    PRIORITY_URGENT: {"percentile": 95, "min_price": 100_000},
+}
+DEFAULT_PRIORITY = PRIORITY_FAST
+# 优先费单价上限（微lamports/计算单元），防止网络拥堵时个别高价交易把单价拉得过高
+MAX_COMPUTE_UNIT_PRICE = 5_000_000
+# 模拟消耗的计算单元乘以该倍数作为上限
+COMPUTE_UNIT_MARGIN = 1.2
+# 两条计算预算指令本身消耗的计算单元
+COMPUTE_BUDGET_UNITS = 300
+MAX_COMPUTE_UNIT_LIMIT = 1_400_000
+# 模拟失败时每条指令预留的计算单元（与节点默认值相同）
+DEFAULT_UNITS_PER_INSTRUCTION = 200_000
+# 预检时每笔转账预留优先费的计算单元（创建ATA加SPL转账约3万）
+RESERVE_UNITS_PER_TRANSFER = 40_000
+
+
+class GetRecentPrioritizationFees:
+    """getRecentPrioritizationFees 请求体（solders 没有对应的请求类型），不指定账户时返回全网最近的优先费"""
+
+    def __init__(self, accounts: Optional[List[str]] = None):
+        self.accounts = accounts or []
+
+    def to_json(self) -> str:
+        return json.dumps({"jsonrpc": "2.0", "id": 0, "method": "getRecentPrioritizationFees",
+                           "params": [self.accounts]})
+
+
+class RecentPrioritizationFeesResp:
+    """getRecentPrioritizationFees 响应，value 为各slot的优先费（微lamports/计算单元）"""
+
+    def __init__(self, value: List[int]):
+        self.value = value
+
+    @classmethod
+    def from_json(cls, raw: str) -> "RecentPrioritizationFeesResp":
+        data = json.loads(raw)
+        if data.get("error"):
+            raise RPCException(data["error"])
+        return cls([item["prioritizationFee"] for item in data.get("result") or []])
+
+
+def fee_price(fees: List[int], priority: str = DEFAULT_PRIORITY, max_price: int = MAX_COMPUTE_UNIT_PRICE) -> int:
+    """
+    按档位从最近的优先费中取单价
+
+    Args:
+        fees: 最近各slot的优先费
+        priority: 档位 economy / fast / urgent
+        max_price: 单价上限
+
+    Returns:
+        int: 优先费单价（微lamports/计算单元）
+    """
+    preset = _preset(priority)
+    price = 0
+    if fees:
+        ordered = sorted(fees)
+        price = ordered[min(len(ordered) - 1, len(ordered) * preset["percentile"] // 100)]
+    return min(max(price, preset["min_price"]), max_price)
+
+
+def instruction_shape(instructions: List) -> str:
+    """指令形状：程序、账户数和指令类型（数据第一个字节），形状相同的交易消耗的计算单元基本相同"""
+    return ";".join(f"{ix.program_id}:{len(ix.accounts)}:{bytes(ix.data[:1]).hex()}" for ix in instructions)
+
+
+def unit_limit(units_consumed: int) -> int:
+    """由模拟消耗的计算单元得到计算单元上限"""
+    return min(MAX_COMPUTE_UNIT_LIMIT, int(units_consumed * COMPUTE_UNIT_MARGIN) + COMPUTE_BUDGET_UNITS)
+
+
+def with_compute_budget(instructions: List, limit: int, price: int) -> List:
+    """在指令列表前加上计算单元上限和优先费单价指令"""
+    return [set_compute_unit_limit(limit), set_compute_unit_price(price), *instructions]
+
+
+def unsigned_transaction(instructions: List, payer: Pubkey, blockhash: Hash) -> Transaction:
+    """构建用于模拟的未签名交易（模拟时不验证签名）"""
+    return Transaction.new_unsigned(Message.new_with_blockhash(instructions, payer, blockhash))
+
+
+def priority_fee_lamports(limit: int, price: int) -> int:
+    """按计算单元上限计算的优先费（lamports，向上取整）"""
+    return (limit * price + 999_999) // 1_000_000
+
+
+def recent_fees(client, chain_name: str) -> List[int]:
+    """
+    查询最近各slot的优先费（按链短时间缓存），查询失败时返回空列表，按档位最低单价计算
+
+    Args:
+        client: Solana客户端
+        chain_name: 链名称
+    """
+    key = _fees_key(chain_name)
+    fees = RPC_CACHE.get("priority_fees", key)
+    if fees is None:
+        try:
+            fees = client._provider.make_request(GetRecentPrioritizationFees(), RecentPrioritizationFeesResp).value
+            RPC_CACHE.set("priority_fees", key, fees)
+        except Exception as e:
+            logger.error(f"查询{chain_name}最近优先费失败，使用档位最低单价: {e}")
+            fees = []
+    return fees
+
+
+async def async_recent_fees(client, chain_name: str) -> List[int]:
+    """recent_fees 的异步版本（AsyncClient）"""
+    key = _fees_key(chain_name)
+    fees = RPC_CACHE.get("priority_fees", key)
+    if fees is None:
+        try:
+            fees = (await client._provider.make_request(GetRecentPrioritizationFees(),
+                                                        RecentPrioritizationFeesResp)).value
+            RPC_CACHE.set("priority_fees", key, fees)
+        except Exception as e:
+            logger.error(f"查询{chain_name}最近优先费失败，使用档位最低单价: {e}")
+            fees = []
+    return fees
+
+
+def compute_budget(client, chain_name: str, instructions: List, payer: Pubkey, blockhash: Hash,
+                   priority: str = DEFAULT_PRIORITY) -> Tuple[int, int]:
+    """
+    计算交易的计算单元上限和优先费单价
+
+    最近的优先费按链短时间缓存，一批转账只查询一次；计算单元按指令形状缓存模拟结果，
+    同一种转账（如SOL转账、SPL转账、创建ATA+SPL转账）只模拟一次。查询或模拟失败时使用档位最低单价
+    和节点默认的计算单元，不影响转账。
+
+    Args:
+        client: Solana客户端
+        chain_name: 链名称
+        instructions: 转账指令（不含计算预算指令）
+        payer: 手续费支付方
+        blockhash: 模拟使用的blockhash
+        priority: 档位 economy / fast / urgent
+
+    Returns:
+        Tuple[int, int]: (计算单元上限, 优先费单价 微lamports/计算单元)
+    """
+    _preset(priority)
+    fees = recent_fees(client, chain_name)
+    units_key = _units_key(chain_name, instructions)
+    units = RPC_CACHE.get("compute_units", units_key)
+    if units is None:
+        try:
+            simulation = client.simulate_transaction(unsigned_transaction(instructions, payer, blockhash)).value
+            units = _simulated_units(chain_name, units_key, simulation)
+        except Exception as e:
+            logger.error(f"模拟{chain_name}交易失败，使用默认计算单元: {e}")
+    return _budget(fees, units, instructions, priority)
+
+
+async def async_compute_budget(client, chain_name: str, instructions: List, payer: Pubkey, blockhash: Hash,
+                               priority: str = DEFAULT_PRIORITY) -> Tuple[int, int]:
+    """compute_budget 的异步版本（AsyncClient），与同步版本共用缓存"""
+    _preset(priority)
+    fees = await async_recent_fees(client, chain_name)
+    units_key = _units_key(chain_name, instructions)
+    units = RPC_CACHE.get("compute_units", units_key)
+    if units is None:
+        try:
+            simulation = (await client.simulate_transaction(unsigned_transaction(instructions, payer, blockhash))).value
+            units = _simulated_units(chain_name, units_key, simulation)
+        except Exception as e:
+            logger.error(f"模拟{chain_name}交易失败，使用默认计算单元: {e}")
+    return _budget(fees, units, instructions, priority)
+
+
+def _preset(priority: str) -> Dict:
+    preset = PRIORITY_PRESETS.get(priority)
+    if preset is None:
+        raise ValueError(f"未知的优先费档位: {priority}（可选 {', '.join(PRIORITY_PRESETS)}）")
+    return preset
+
+
+def _fees_key(chain_name: str) -> str:
+    return f"priority_fees|{chain_name}"
+
+
+def _units_key(chain_name: str, instructions: List) -> str:
+    return f"compute_units|{chain_name}|{instruction_shape(instructions)}"
+
+
+def _simulated_units(chain_name: str, units_key: str, simulation) -> Optional[int]:
+    """模拟成功时缓存并返回消耗的计算单元；模拟报错（如余额不足）时不缓存"""
+    if simulation.err is not None or not simulation.units_consumed:
+        logger.error(f"模拟{chain_name}交易未成功，使用默认计算单元: {simulation.err}")
+        return None
+    RPC_CACHE.set("compute_units", units_key, simulation.units_consumed)
+    return simulation.units_consumed
+
+
+def _budget(fees: List[int], units: Optional[int], instructions: List, priority: str) -> Tuple[int, int]:
+    if units is None:
+        limit = min(MAX_COMPUTE_UNIT_LIMIT, DEFAULT_UNITS_PER_INSTRUCTION * len(instructions))
+    else:
+        limit = unit_limit(units)
+    return limit, fee_price(fees, priority)
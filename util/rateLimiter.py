@@ -0,0 +1,215 @@
+import time
+import random
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+# 读请求遇到限流/网络抖动时的最大重试次数和退避基准（秒）
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10.0
+
+# 节点返回的限流错误特征（HTTP 429 / JSON-RPC -32005 及常见文案）
+_THROTTLE_CODES = (429, -32005)
+_THROTTLE_MESSAGES = ("-32005", "too many requests", "rate limit", "request limit", "limit exceeded")
+# eth_getLogs 查询的区块范围或结果数超出节点限制（部分节点同样返回 -32005 / limit exceeded）：
+# 不是限流，重试没有意义，调用方缩小查询范围即可
+_RANGE_LIMIT_MESSAGES = ("returned more than", "query exceeds", "too many results", "max results", "response size",
+                         "block range", "range is too large", "range too large", "range limit", "logs matched")
+
+
+class AdaptiveRateLimiter:
+    """
+    自适应令牌桶限速器（每个RPC节点一个）
+
+    未配置速率时不限速，只统计最近1秒的请求数；第一次遇到限流时以当时的实际速率为基准开始限速。
+    此后每次限流速率乘性下降并记住触发限流的速率，随成功请求按时间线性回升，超过上次限流速率后
+    回升速度降为1/10，使吞吐稳定在节点的实际限额附近，而不是在突发和失败之间来回震荡。
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None, min_rate: float = 0.5,
+                 max_rate: Optional[float] = None, decrease: float = 0.7, increase: float = 1.0):
+        """
+        初始化限速器
+
+        Args:
+            rate: 初始速率（次/秒），None 表示在遇到限流前不限速
+            burst: 令牌桶容量，默认等于1秒的请求量
+            min_rate: 速率下限
+            max_rate: 速率上限，None 表示不设上限
+            decrease: 遇到限流时速率乘以该系数
+            increase: 无限流时每秒速率回升量（次/秒）
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.decrease = decrease
+        self.increase = increase
+        self.throttled_rate: Optional[float] = None
+        self.throttles = 0
+        self._tokens = self._capacity()
+        self._updated = time.monotonic()
+        self._last_success = self._updated
+        self._last_throttle = 0.0
+        self._recent: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _capacity(self) -> float:
+        if self.burst is not None:
+            return self.burst
+        return max(1.0, self.rate) if self.rate is not None else 1.0
+
+    def acquire(self) -> float:
+        """
+        取一个令牌，不足时阻塞等待
+
+        Returns:
+            float: 等待的秒数
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def reserve(self) -> float:
+        """
+        预占一个令牌但不等待，由调用方等待返回的秒数（异步调用方用 asyncio.sleep 等待，不阻塞事件循环）
+
+        Returns:
+            float: 需要等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._recent.append(now)
+            while self._recent[0] < now - 1.0:
+                self._recent.popleft()
+            if self.rate is None:
+                return 0.0
+            self._refill(now)
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def on_success(self) -> None:
+        """请求未被限流：按距上次成功的时间回升速率（空闲期间不回升，最多按1秒计）"""
+        with self._lock:
+            now = time.monotonic()
+            step = self.increase * min(1.0, now - self._last_success)
+            self._last_success = now
+            if self.rate is None:
+                return
+            if self.throttled_rate is not None and self.rate >= self.throttled_rate:
+                step /= 10
+            self.rate += step
+            if self.max_rate is not None:
+                self.rate = min(self.max_rate, self.rate)
+
+    def on_throttle(self) -> None:
+        """请求被限流：速率乘性下降，清空令牌（并发请求同时被限流时1秒内只下降一次）"""
+        with self._lock:
+            now = time.monotonic()
+            self.throttles += 1
+            if now - self._last_throttle < 1.0:
+                return
+            self._last_throttle = now
+            if self.rate is None:
+                # 以最近1秒的实际请求数作为节点限额的估计
+                self.rate = float(max(1, len(self._recent)))
+                self._updated = now
+            self._refill(now)
+            self.throttled_rate = self.rate
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self._capacity(), self._tokens + elapsed * self.rate)
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(endpoint: str, rate: Optional[float] = None) -> AdaptiveRateLimiter:
+    """
+    获取节点的限速器（同一节点在进程内共享）
+
+    Args:
+        endpoint: 节点地址
+        rate: 初始速率（chain.json 中的 rateLimit），仅在首次创建时生效；None 表示遇到限流前不限速
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(endpoint)
+        if limiter is None:
+            limiter = _limiters[endpoint] = AdaptiveRateLimiter(rate)
+        return limiter
+
+
+def limiter_rates() -> Dict[str, Dict]:
+    """各节点当前速率，供监控展示"""
+    with _limiters_lock:
+        return {endpoint: {'rate': limiter.rate, 'throttles': limiter.throttles}
+                for endpoint, limiter in _limiters.items()}
+
+
+def backoff_delay(attempt: int) -> float:
+    """带抖动的指数退避时间（秒）"""
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+
+def is_throttle_error(error) -> bool:
+    """
+    判断是否为限流错误
+
+    Args:
+        error: 异常，或JSON-RPC响应中的 error 字段
+    """
+    if is_range_limit_error(error):
+        return False
+    if isinstance(error, dict):
+        return error.get('code') in _THROTTLE_CODES or _is_throttle_message(str(error.get('message', '')))
+    while error is not None:
+        response = getattr(error, 'response', None)
+        if getattr(response, 'status_code', None) == 429 or _is_throttle_message(str(error)):
+            return True
+        error = error.__cause__
+    return False
+
+
+def is_range_limit_error(error) -> bool:
+    """
+    判断是否为 eth_getLogs 查询范围/结果数超限
+
+    Args:
+        error: 异常，或JSON-RPC响应中的 error 字段
+    """
+    if isinstance(error, dict):
+        message = str(error.get('message', '')).lower()
+        return any(s in message for s in _RANGE_LIMIT_MESSAGES)
+    while error is not None:
+        message = str(error).lower()
+        if any(s in message for s in _RANGE_LIMIT_MESSAGES):
+            return True
+        error = error.__cause__
+    return False
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """判断是否为可重试的网络错误（连接失败、超时、5xx）"""
+    while error is not None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+        if status is not None and status >= 500:
+            return True
+        if isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in (
+                "ConnectionError", "ConnectTimeout", "ReadTimeout", "Timeout", "ConnectError", "ReadError",
+                "RemoteProtocolError", "PoolTimeout"):
+            return True
+        error = error.__cause__
+    return False
+
+
+def _is_throttle_message(message: str) -> bool:
+    message = message.lower()
+    return any(s in message for s in _THROTTLE_MESSAGES)
@@ -0,0 +1,341 @@
+import os
+import re
+import heapq
+import shutil
+import tempfile
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from eth_utils import keccak
+from solders.pubkey import Pubkey
+
+SOLANA_CHAIN_NAME = "Solana Mainnet"
+
+_EVM_ADDRESS_RE = re.compile(r"^0x[0-9a-fA-F]{40}$")
+_FIELD_SPLIT_RE = re.compile(r"[,;\s]+")
+# 汇总结果中保留的错误条数（完整错误写入错误文件）
+MAX_SUMMARY_ERRORS = 20
+
+
+def to_checksum_address(hex_address: str) -> str:
+    """
+    按 EIP-55 生成校验和地址
+
+    Args:
+        hex_address: 40位十六进制地址（不含0x，小写）
+
+    Returns:
+        str: 0x开头的校验和地址
+    """
+    digest = keccak(text=hex_address).hex()
+    return "0x" + "".join(c.upper() if d in "89abcdef" else c for c, d in zip(hex_address, digest))
+
+
+def is_valid_evm_address(address: str, require_checksum: bool = False) -> bool:
+    """
+    验证EVM地址：0x + 40位十六进制，大小写混合时必须符合 EIP-55 校验和
+
+    Args:
+        address: 地址
+        require_checksum: 为True时全小写/全大写地址也视为无效
+
+    Returns:
+        bool: 地址是否有效
+    """
+    return _normalize_evm(address, require_checksum) is not None
+
+
+def is_valid_solana_address(address: str) -> bool:
+    """
+    验证Solana地址：base58解码后必须恰好32字节（长度32~44个字符）
+
+    Args:
+        address: 地址
+
+    Returns:
+        bool: 地址是否有效
+    """
+    return _decode_solana(address) is not None
+
+
+def _normalize_evm(address: str, require_checksum: bool = False) -> Optional[str]:
+    """返回校验和格式的地址，无效时返回None"""
+    if not _EVM_ADDRESS_RE.match(address):
+        return None
+    hex_part = address[2:]
+    lower = hex_part.lower()
+    checksum_address = to_checksum_address(lower)
+    if hex_part == lower or hex_part == hex_part.upper():
+        # 全小写/全大写地址不带校验信息（EIP-55 兼容写法）
+        return None if require_checksum else checksum_address
+    return checksum_address if address == checksum_address else None
+
+
+def _decode_solana(address: str) -> Optional[bytes]:
+    if not 32 <= len(address) <= 44:
+        return None
+    try:
+        return bytes(Pubkey.from_string(address))
+    except ValueError:
+        return None
+
+
+def parse_amount(text: str, decimals: Optional[int] = None) -> Decimal:
+    """
+    用 Decimal 解析转账金额，避免浮点误差
+
+    Args:
+        text: 金额文本
+        decimals: 代币精度，传入时小数位数不能超过精度
+
+    Returns:
+        Decimal: 金额
+
+    Raises:
+        ValueError: 金额无效
+    """
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"金额格式错误: {text}")
+    if not amount.is_finite() or amount <= 0:
+        raise ValueError(f"金额必须大于0: {text}")
+    if decimals is not None and -amount.normalize().as_tuple().exponent > decimals:
+        raise ValueError(f"金额小数位数超过代币精度({decimals}): {text}")
+    return amount
+
+
+class RecipientValidator:
+    """
+    批量收款地址校验与去重（流式处理，不把整个文件读入内存）
+
+    每行格式为 "地址,金额"（也支持空格/制表符/分号分隔），空行和 # 开头的行忽略，首行表头自动跳过。
+    默认用内存哈希集合去重（每个地址约100字节）；地址量超出内存时使用 dedupe="disk"，改为磁盘外部排序。
+    同一地址出现多次时保留首次出现的行，其余行记为重复。
+    """
+
+    def __init__(self, chain_name: str, decimals: Optional[int] = None, default_amount: Optional[str] = None,
+                 require_checksum: bool = False, dedupe: str = "memory", chunk_size: int = 1000000,
+                 tmp_dir: Optional[str] = None):
+        """
+        初始化校验器
+
+        Args:
+            chain_name: 链名称（Solana Mainnet 按Solana地址校验，其余按EVM地址校验）
+            decimals: 代币精度，用于校验金额小数位数
+            default_amount: 行内没有金额时使用的默认金额
+            require_checksum: EVM地址是否必须带 EIP-55 校验和
+            dedupe: 去重方式 memory / disk
+            chunk_size: 磁盘去重时每个排序分段的行数
+            tmp_dir: 磁盘去重的临时目录
+        """
+        if dedupe not in ("memory", "disk"):
+            raise ValueError(f"不支持的去重方式: {dedupe}")
+        self.is_solana = chain_name == SOLANA_CHAIN_NAME
+        self.decimals = decimals
+        self.default_amount = parse_amount(default_amount, decimals) if default_amount is not None else None
+        self.require_checksum = require_checksum
+        self.dedupe = dedupe
+        self.chunk_size = chunk_size
+        self.tmp_dir = tmp_dir
+
+    def parse_line(self, line: str) -> Optional[Tuple[str, bytes, Decimal]]:
+        """
+        解析并校验一行
+
+        Returns:
+            Optional[Tuple[str, bytes, Decimal]]: (规范化地址, 去重键, 金额)，空行/注释返回None
+
+        Raises:
+            ValueError: 地址或金额无效
+        """
+        line = line.strip()
+        if not line or line.startswith("#"):
+            return None
+        fields = _FIELD_SPLIT_RE.split(line)
+        address = fields[0]
+        if self.is_solana:
+            key = _decode_solana(address)
+            if key is None:
+                raise ValueError(f"Solana地址无效: {address}")
+        else:
+            normalized = _normalize_evm(address, self.require_checksum)
+            if normalized is None:
+                raise ValueError(f"EVM地址无效或校验和错误: {address}")
+            address = normalized
+            key = bytes.fromhex(address[2:].lower())
+        if len(fields) > 2:
+            raise ValueError(f"字段过多: {line}")
+        if len(fields) == 2:
+            amount = parse_amount(fields[1], self.decimals)
+        elif self.default_amount is not None:
+            amount = self.default_amount
+        else:
+            raise ValueError("缺少金额")
+        return address, key, amount
+
+    def validate_file(self, input_path: str, output_path: str, error_path: Optional[str] = None) -> Dict:
+        """
+        校验、规范化并去重收款文件
+
+        Args:
+            input_path: 收款文件
+            output_path: 输出文件，每行 "地址,金额"，顺序与输入一致
+            error_path: 错误文件，每行 "行号,原因"
+
+        Returns:
+            Dict: 汇总 {'lines', 'valid', 'invalid', 'duplicates', 'total_amount', 'errors'}
+        """
+        summary = {'lines': 0, 'valid': 0, 'invalid': 0, 'duplicates': 0, 'total_amount': Decimal(0), 'errors': []}
+        error_file = open(error_path, "w", encoding="utf-8") if error_path else None
+        try:
+            def report(line_no: int, reason: str, duplicate: bool = False):
+                summary['duplicates' if duplicate else 'invalid'] += 1
+                if len(summary['errors']) < MAX_SUMMARY_ERRORS:
+                    summary['errors'].append((line_no, reason))
+                if error_file is not None:
+                    error_file.write(f"{line_no},{reason}\n")
+
+            with open(input_path, "r", encoding="utf-8-sig") as src, open(output_path, "w", encoding="utf-8") as out:
+                if self.dedupe == "memory":
+                    self._validate_in_memory(src, out, summary, report)
+                else:
+                    self._validate_on_disk(src, out, summary, report)
+        finally:
+            if error_file is not None:
+                error_file.close()
+        summary['total_amount'] = str(summary['total_amount'])
+        return summary
+
+    def iter_file(self, input_path: str, on_error: Optional[Callable[[int, str], None]] = None
+                  ) -> Iterator[Tuple[int, str, Decimal]]:
+        """
+        逐行读取、校验并去重收款文件（内存去重），边读边返回，适合导入时分批显示
+
+        Args:
+            input_path: 收款文件
+            on_error: 无效或重复行的回调 (行号, 原因)
+
+        Returns:
+            Iterator[Tuple[int, str, Decimal]]: (行号, 规范化地址, 金额)
+        """
+        summary = {'lines': 0, 'invalid': 0, 'duplicates': 0}
+
+        def report(line_no: int, reason: str, duplicate: bool = False):
+            summary['duplicates' if duplicate else 'invalid'] += 1
+            if on_error is not None:
+                on_error(line_no, reason)
+
+        seen = set()
+        with open(input_path, "r", encoding="utf-8-sig") as src:
+            for line_no, address, key, amount in self._records(src, summary, report):
+                if key in seen:
+                    report(line_no, f"重复地址: {address}", duplicate=True)
+                    continue
+                seen.add(key)
+                yield line_no, address, amount
+
+    def _records(self, src, summary, report) -> Iterator[Tuple[int, str, bytes, Decimal]]:
+        for line_no, line in enumerate(src, 1):
+            summary['lines'] = line_no
+            try:
+                parsed = self.parse_line(line)
+            except ValueError as e:
+                if not (line_no == 1 and _is_header(line)):
+                    report(line_no, str(e))
+                continue
+            if parsed is not None:
+                yield (line_no,) + parsed
+
+    def _validate_in_memory(self, src, out, summary, report) -> None:
+        seen = set()
+        for line_no, address, key, amount in self._records(src, summary, report):
+            if key in seen:
+                report(line_no, f"重复地址: {address}", duplicate=True)
+                continue
+            seen.add(key)
+            out.write(f"{address},{amount:f}\n")
+            summary['valid'] += 1
+            summary['total_amount'] += amount
+
+    def _validate_on_disk(self, src, out, summary, report) -> None:
+        # 第一遍：校验并把有效行写入临时文件，同时对 (去重键, 行号) 做外部排序
+        work_dir = tempfile.mkdtemp(prefix="recipients_", dir=self.tmp_dir)
+        try:
+            valid_path = os.path.join(work_dir, "valid.txt")
+            with open(valid_path, "w", encoding="utf-8") as valid_file:
+                def keyed():
+                    for line_no, address, key, amount in self._records(src, summary, report):
+                        valid_file.write(f"{line_no:012d},{address},{amount:f}\n")
+                        yield f"{key.hex()},{line_no:012d}\n"
+                sorted_keys = _external_sort(keyed(), self.chunk_size, work_dir, "keys")
+                # 同一键的首行保留，其余行号再按行号排序
+                duplicate_lines = _external_sort(_duplicate_line_numbers(sorted_keys), self.chunk_size, work_dir, "dups")
+
+            # 第二遍：按行号顺序合并，跳过重复行
+            next_duplicate = next(duplicate_lines, None)
+            with open(valid_path, "r", encoding="utf-8") as valid_file:
+                for record in valid_file:
+                    line_key, address, amount = record.rstrip("\n").split(",")
+                    if next_duplicate is not None and next_duplicate.rstrip("\n") == line_key:
+                        report(int(line_key), f"重复地址: {address}", duplicate=True)
+                        next_duplicate = next(duplicate_lines, None)
+                        continue
+                    out.write(f"{address},{amount}\n")
+                    summary['valid'] += 1
+                    summary['total_amount'] += Decimal(amount)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _is_header(line: str) -> bool:
+    return _FIELD_SPLIT_RE.split(line.strip())[0].lower() in ("address", "地址", "to", "to_address", "recipient")
+
+
+def _duplicate_line_numbers(sorted_keys: Iterator[str]) -> Iterator[str]:
+    previous = None
+    for record in sorted_keys:
+        key, line_key = record.rstrip("\n").split(",")
+        if key == previous:
+            yield line_key + "\n"
+        previous = key
+
+
+def _external_sort(records: Iterator[str], chunk_size: int, work_dir: str, name: str) -> Iterator[str]:
+    """
+    磁盘外部排序：每 chunk_size 行排序后写入一个分段文件，最后多路归并
+
+    Args:
+        records: 以换行结尾的定长前缀字符串（按字符串顺序排序）
+        chunk_size: 每个分段的行数
+        work_dir: 分段文件目录
+        name: 分段文件名前缀
+
+    Returns:
+        Iterator[str]: 有序的记录
+    """
+    run_paths: List[str] = []
+    chunk: List[str] = []
+
+    def flush_chunk():
+        chunk.sort()
+        path = os.path.join(work_dir, f"{name}_{len(run_paths)}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(chunk)
+        run_paths.append(path)
+        chunk.clear()
+
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            flush_chunk()
+    if chunk or not run_paths:
+        flush_chunk()
+
+    def merged():
+        files = [open(path, "r", encoding="utf-8") for path in run_paths]
+        try:
+            yield from heapq.merge(*files)
+        finally:
+            for f in files:
+                f.close()
+    return merged()
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_RPC_CACHE_PATH = os.path.join("data", "rpc_cache.db")
+DEFAULT_MAX_ENTRIES = 10000
+
+# 各类只读数据的缓存时间（秒）
+CACHE_TTLS = {
+    "eth_chainId": 86400.0,
+    "net_version": 86400.0,
+    # is_connected 每笔转账都会调用，短时间内复用结果
+    "web3_clientVersion": 30.0,
+    "eth_getCode": 3600.0,
+    # ERC20 decimals()/symbol()/name()
+    "erc20_metadata": 86400.0,
+    # Solana 账户（ATA）存在/不存在；不存在的结果很快会因创建而失效，只短时间缓存
+    "account_exists": 3600.0,
+    "account_missing": 60.0,
+    # Solana 最近的优先费变化快，只短时间复用；同一指令形状消耗的计算单元基本不变
+    "priority_fees": 10.0,
+    "compute_units": 86400.0,
+}
+
+# ERC20 元数据函数选择器：decimals() / symbol() / name()
+_ERC20_METADATA_SELECTORS = ("0x313ce567", "0x95d89b41", "0x06fdde03")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rpc_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+_MISS = object()
+
+
+class RpcCache:
+    """
+    只读RPC数据缓存：按数据类型设置过期时间，超出容量时淘汰最久未使用的条目（LRU）
+
+    默认只在内存中缓存；调用 enable_persistence 后同时写入SQLite文件，
+    进程重启时加载未过期的条目，重复执行的批量任务不必再次查询这些数据。
+    缓存值必须能JSON序列化。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 内存中最多保留的条目数
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._stats: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def enable_persistence(self, db_path: str = DEFAULT_RPC_CACHE_PATH) -> int:
+        """
+        启用磁盘持久化并加载未过期的条目
+
+        Args:
+            db_path: SQLite数据库文件路径
+
+        Returns:
+            int: 加载的条目数
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        now = time.time()
+        conn.execute("DELETE FROM rpc_cache WHERE expires_at <= ?", (now,))
+        rows = conn.execute("SELECT key, value, expires_at FROM rpc_cache ORDER BY expires_at DESC LIMIT ?",
+                            (self.max_entries,)).fetchall()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = conn
+            for key, value, expires_at in reversed(rows):
+                if key not in self._entries:
+                    self._entries[key] = (json.loads(value), expires_at)
+            self._evict_locked()
+        return len(rows)
+
+    def get(self, kind: str, key: str, default: Any = None) -> Any:
+        """
+        读取缓存
+
+        Args:
+            kind: 数据类型（CACHE_TTLS 的键，用于统计）
+            key: 缓存键
+            default: 未命中时的返回值
+        """
+        value = self._lookup(kind, key)
+        return default if value is _MISS else value
+
+    def set(self, kind: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        写入缓存
+
+        Args:
+            kind: 数据类型，未指定 ttl 时按 CACHE_TTLS[kind] 过期
+            key: 缓存键
+            value: 可JSON序列化的值
+            ttl: 过期时间（秒）
+        """
+        expires_at = time.time() + (CACHE_TTLS[kind] if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            self._evict_locked()
+            if self._conn is not None:
+                self._conn.execute("INSERT OR REPLACE INTO rpc_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                                   (key, json.dumps(value), expires_at))
+
+    def invalidate(self, key: str) -> None:
+        """删除缓存条目（数据已被本程序修改时调用）"""
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM rpc_cache WHERE key = ?", (key,))
+
+    def get_or_fetch(self, kind: str, key: str, fetch: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        读取缓存，未命中时调用 fetch 查询并写入缓存
+
+        Args:
+            kind: 数据类型
+            key: 缓存键
+            fetch: 查询函数
+            ttl: 过期时间（秒），默认按 CACHE_TTLS[kind]
+        """
+        value = self._lookup(kind, key)
+        if value is _MISS:
+            value = fetch()
+            self.set(kind, key, value, ttl)
+        return value
+
+    def stats(self) -> Dict[Tuple[str, str], int]:
+        """命中统计 {(数据类型, hit/miss): 次数}"""
+        with self._lock:
+            return dict(self._stats)
+
+    def clear(self) -> None:
+        """清空内存和磁盘中的缓存"""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM rpc_cache")
+
+    def close(self) -> None:
+        """关闭磁盘持久化（内存缓存保留）"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _lookup(self, kind: str, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[key]
+                entry = None
+            result = "miss" if entry is None else "hit"
+            self._stats[(kind, result)] = self._stats.get((kind, result), 0) + 1
+            if entry is None:
+                return _MISS
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _evict_locked(self) -> None:
+        # 淘汰的条目只从内存移除，磁盘中的条目到期后在下次加载时清理
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# 进程内共享的缓存
+RPC_CACHE = RpcCache()
+
+
+def evm_cache_kind(method: str, params: List) -> Optional[str]:
+    """
+    判断EVM请求是否可缓存
+
+    Returns:
+        Optional[str]: 可缓存时返回数据类型，否则返回None
+    """
+    if method in ("eth_chainId", "net_version", "web3_clientVersion"):
+        return method
+    if method == "eth_getCode" and len(params) > 1 and params[1] == "latest":
+        return method
+    if method == "eth_call" and params and isinstance(params[0], dict) and params[1:2] in ([], ["latest"]):
+        data = params[0].get("data") or params[0].get("input") or ""
+        if len(data) == 10 and data.lower() in _ERC20_METADATA_SELECTORS:
+            return "erc20_metadata"
+    return None
+
+
+def evm_cache_key(chain_name: str, method: str, params: List) -> str:
+    return f"evm|{chain_name}|{method}|{json.dumps(params, sort_keys=True, default=str)}"
+
+
+def account_cache_key(chain_name: str, address: str) -> str:
+    return f"account|{chain_name}|{address}"
+
+
+def remember_accounts(chain_name: str, accounts: Dict[str, bool]) -> None:
+    """
+    记录已查询到的Solana账户是否存在（如预检时批量查询的接收方ATA）
+
+    Args:
+        chain_name: 链名称
+        accounts: {地址: 是否存在}
+    """
+    for address, exists in accounts.items():
+        RPC_CACHE.set("account_exists" if exists else "account_missing", account_cache_key(chain_name, address), exists)
+
+
+def account_exists(client, chain_name: str, address) -> bool:
+    """
+    查询Solana账户是否存在（带缓存）
+
+    Args:
+        client: Solana客户端
+        chain_name: 链名称
+        address: 账户地址（Pubkey）
+    """
+    key = account_cache_key(chain_name, str(address))
+    exists = RPC_CACHE.get("account_exists", key)
+    if exists is None:
+        exists = client.get_account_info(address).value is not None
+        remember_accounts(chain_name, {str(address): exists})
+    return exists
+
+
+def forget_account(chain_name: str, address) -> None:
+    """账户已被本程序创建（或状态不再可信）时删除缓存"""
+    RPC_CACHE.invalidate(account_cache_key(chain_name, str(address)))
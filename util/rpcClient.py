@@ -0,0 +1,446 @@
+import json
+import time
+import asyncio
+import threading
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+from web3 import Web3, AsyncWeb3, AsyncHTTPProvider
+from solana.rpc.api import Client
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.core import RPCException
+from solana.rpc.providers import http as solana_http
+from solana.rpc.providers import async_http as solana_async_http
+from .rpcMetrics import RPC_METRICS, OUTCOME_OK, OUTCOME_RPC_ERROR, OUTCOME_EXCEPTION, OUTCOME_THROTTLED
+from .rpcCache import RPC_CACHE, evm_cache_kind, evm_cache_key
+from .rateLimiter import (AdaptiveRateLimiter, get_limiter, backoff_delay, is_throttle_error, is_transient_error,
+                          MAX_RETRIES)
+
+# solders 请求类型名与 JSON-RPC 方法名不一致的情况
+_SOLANA_METHOD_ALIASES = {
+    "SendLegacyTransaction": "sendTransaction",
+    "SendVersionedTransaction": "sendTransaction",
+    "SendRawTransaction": "sendTransaction",
+    "SimulateLegacyTransaction": "simulateTransaction",
+    "SimulateVersionedTransaction": "simulateTransaction",
+}
+_solana_method_names: Dict[type, str] = {}
+# 非幂等请求：不因超时/网络错误自动重试，避免重复发送
+NON_IDEMPOTENT_METHODS = frozenset(("eth_sendRawTransaction", "eth_sendTransaction", "sendTransaction",
+                                    "requestAirdrop"))
+# 可合并的读请求：结果与本程序自身的写操作无关，晚到的调用方拿到稍早发出的请求结果也不影响正确性。
+# nonce、余额、回执、账户是否存在等会随本程序发出的交易变化，不合并
+COALESCED_METHODS = frozenset((
+    "eth_gasPrice", "eth_maxPriorityFeePerGas", "eth_feeHistory", "eth_blockNumber", "eth_chainId", "net_version",
+    "web3_clientVersion", "eth_getCode",
+    "getLatestBlockhash", "getRecentPrioritizationFees", "getMinimumBalanceForRentExemption", "getBlockHeight",
+    "getSlot", "getEpochInfo", "getGenesisHash",
+))
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    合并进行中的相同读请求：同一时刻相同的请求只发一次，结果（或异常）分发给所有等待的调用方
+
+    并发转账时各线程几乎同时查询 gas 价格、最新 blockhash 等相同数据，合并后只占用一次限速配额。
+    等待方拿到的是在它之前发出的请求的结果，只适用于 COALESCED_METHODS 中与本程序写操作无关的数据。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Tuple, _Flight] = {}
+
+    def do(self, key: Tuple, func: Callable) -> Tuple[Any, bool]:
+        """
+        执行或等待相同的请求
+
+        Args:
+            key: 请求键（节点、方法、参数）
+            func: 实际发出请求的函数
+
+        Returns:
+            Tuple[Any, bool]: (结果, 是否复用了其他调用方的请求)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+
+class AsyncSingleFlight:
+    """SingleFlight 的 asyncio 版本：同一事件循环中相同的读请求只发一次"""
+
+    def __init__(self):
+        self._flights: Dict[Tuple, asyncio.Future] = {}
+
+    async def do(self, key: Tuple, func: Callable[[], Awaitable]) -> Tuple[Any, bool]:
+        loop = asyncio.get_running_loop()
+        # Future 属于创建它的事件循环，不同事件循环之间不合并
+        key = (id(loop),) + key
+        flight = self._flights.get(key)
+        if flight is not None:
+            # shield：等待方被取消时不影响发起方和其它等待方
+            return await asyncio.shield(flight), True
+        flight = self._flights[key] = loop.create_future()
+        try:
+            result = await func()
+        except BaseException as e:
+            flight.set_exception(e)
+            # 没有等待方时也要取走异常，避免 "Future exception was never retrieved"
+            flight.exception()
+            raise
+        else:
+            flight.set_result(result)
+        finally:
+            del self._flights[key]
+        return result, False
+
+
+# 进程内共享：同一节点的所有 Provider 实例之间合并请求
+IN_FLIGHT = SingleFlight()
+# 异步 Provider 只在引擎的事件循环中使用，共享一个实例
+ASYNC_IN_FLIGHT = AsyncSingleFlight()
+
+
+def _coalesced_call(chain_name: str, method: str, endpoint: str, params_key: str, func: Callable):
+    result, shared = IN_FLIGHT.do((endpoint, method, params_key), func)
+    if shared:
+        RPC_METRICS.record_coalesced(chain_name, method, endpoint)
+        if isinstance(result, dict):
+            # web3 会在响应上做格式化，给每个调用方一份副本
+            result = dict(result)
+    return result
+
+
+async def _async_coalesced_call(chain_name: str, method: str, endpoint: str, params_key: str, func: Callable):
+    result, shared = await ASYNC_IN_FLIGHT.do((endpoint, method, params_key), func)
+    if shared:
+        RPC_METRICS.record_coalesced(chain_name, method, endpoint)
+        if isinstance(result, dict):
+            result = dict(result)
+    return result
+
+
+def _solana_method(body: Any) -> str:
+    """由 solders 请求对象得到 JSON-RPC 方法名（按类型缓存）"""
+    body_type = type(body)
+    name = _solana_method_names.get(body_type)
+    if name is None:
+        type_name = body_type.__name__
+        name = _SOLANA_METHOD_ALIASES.get(type_name) or type_name[:1].lower() + type_name[1:]
+        _solana_method_names[body_type] = name
+    return name
+
+
+def _call(chain_name: str, method: str, endpoint: str, limiter: AdaptiveRateLimiter, func: Callable,
+          idempotent: bool, response_error: Optional[Callable] = None):
+    """
+    经过限速器执行一次RPC调用并记录指标
+
+    读请求遇到限流或网络抖动时按带抖动的指数退避重试；发送交易等非幂等请求只在节点明确返回限流
+    （请求未被处理）时重试，超时/连接中断时无法确定节点是否已收到，直接抛出由调用方处理。
+    """
+    start = time.perf_counter()
+    retries = 0
+    while True:
+        limiter.acquire()
+        try:
+            response = func()
+        except Exception as e:
+            throttled = is_throttle_error(e)
+            if throttled:
+                limiter.on_throttle()
+            if retries < MAX_RETRIES and (throttled or (idempotent and is_transient_error(e))):
+                time.sleep(backoff_delay(retries))
+                retries += 1
+                continue
+            if throttled:
+                outcome = OUTCOME_THROTTLED
+            else:
+                outcome = OUTCOME_RPC_ERROR if isinstance(e, RPCException) else OUTCOME_EXCEPTION
+            RPC_METRICS.record(chain_name, method, endpoint, time.perf_counter() - start, outcome, retries)
+            raise
+        error = response_error(response) if response_error is not None else None
+        if error is not None and is_throttle_error(error):
+            limiter.on_throttle()
+            if retries < MAX_RETRIES:
+                time.sleep(backoff_delay(retries))
+                retries += 1
+                continue
+            RPC_METRICS.record(chain_name, method, endpoint, time.perf_counter() - start, OUTCOME_THROTTLED, retries)
+            return response
+        limiter.on_success()
+        outcome = OUTCOME_RPC_ERROR if error is not None else OUTCOME_OK
+        RPC_METRICS.record(chain_name, method, endpoint, time.perf_counter() - start, outcome, retries)
+        return response
+
+
+async def _acall(chain_name: str, method: str, endpoint: str, limiter: AdaptiveRateLimiter,
+                 func: Callable[[], Awaitable], idempotent: bool, response_error: Optional[Callable] = None):
+    """_call 的异步版本：限速等待和退避都用 asyncio.sleep，不阻塞事件循环"""
+    start = time.perf_counter()
+    retries = 0
+    while True:
+        wait = limiter.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            response = await func()
+        except Exception as e:
+            throttled = is_throttle_error(e)
+            if throttled:
+                limiter.on_throttle()
+            if retries < MAX_RETRIES and (throttled or (idempotent and is_transient_error(e))):
+                await asyncio.sleep(backoff_delay(retries))
+                retries += 1
+                continue
+            if throttled:
+                outcome = OUTCOME_THROTTLED
+            else:
+                outcome = OUTCOME_RPC_ERROR if isinstance(e, RPCException) else OUTCOME_EXCEPTION
+            RPC_METRICS.record(chain_name, method, endpoint, time.perf_counter() - start, outcome, retries)
+            raise
+        error = response_error(response) if response_error is not None else None
+        if error is not None and is_throttle_error(error):
+            limiter.on_throttle()
+            if retries < MAX_RETRIES:
+                await asyncio.sleep(backoff_delay(retries))
+                retries += 1
+                continue
+            RPC_METRICS.record(chain_name, method, endpoint, time.perf_counter() - start, OUTCOME_THROTTLED, retries)
+            return response
+        limiter.on_success()
+        outcome = OUTCOME_RPC_ERROR if error is not None else OUTCOME_OK
+        RPC_METRICS.record(chain_name, method, endpoint, time.perf_counter() - start, outcome, retries)
+        return response
+
+
+def _evm_error(response: Dict):
+    return response.get("error")
+
+
+def _evm_batch_error(response):
+    if not isinstance(response, list):
+        return response.get("error")
+    # 批量请求中部分条目被限流时整批重试（已成功的发送会返回 already known，调用方视为成功）
+    for item in response:
+        if "error" in item and is_throttle_error(item["error"]):
+            return item["error"]
+    return None
+
+
+class EvmHTTPProvider(Web3.HTTPProvider):
+    """
+    经过节点限速器并记录调用指标的 EVM HTTP Provider
+
+    链ID、合约代码、ERC20元数据等只读数据走 RPC_CACHE；gas价格等读请求与进行中的相同请求合并。
+    """
+
+    def __init__(self, chain_name: str, endpoint_uri: str, rate: Optional[float] = None, **kwargs):
+        # 关闭 web3 自带的异常重试（会重发 eth_sendRawTransaction，限流时也绕过限速器），重试只在 _call 中进行
+        super().__init__(endpoint_uri, exception_retry_configuration=None, **kwargs)
+        self.chain_name = chain_name
+        self.limiter = get_limiter(endpoint_uri, rate)
+
+    def make_request(self, method, params):
+        kind = evm_cache_kind(method, params)
+        if kind is not None:
+            key = evm_cache_key(self.chain_name, method, params)
+            cached = RPC_CACHE.get(kind, key)
+            if cached is not None:
+                return cached
+
+        def request():
+            return _call(self.chain_name, method, self.endpoint_uri, self.limiter,
+                         lambda: super(EvmHTTPProvider, self).make_request(method, params),
+                         method not in NON_IDEMPOTENT_METHODS, _evm_error)
+        if method not in COALESCED_METHODS and kind != "erc20_metadata":
+            response = request()
+        else:
+            response = _coalesced_call(self.chain_name, method, self.endpoint_uri,
+                                       json.dumps(params, sort_keys=True, default=str), request)
+        if kind is not None and "error" not in response:
+            RPC_CACHE.set(kind, key, dict(response))
+        return response
+
+    def make_batch_request(self, batch_requests):
+        idempotent = all(method not in NON_IDEMPOTENT_METHODS for method, _ in batch_requests)
+        return _call(self.chain_name, "batch", self.endpoint_uri, self.limiter,
+                     lambda: super(EvmHTTPProvider, self).make_batch_request(batch_requests),
+                     idempotent, _evm_batch_error)
+
+
+class SolanaHTTPProvider(solana_http.HTTPProvider):
+    """经过节点限速器并记录调用指标的 Solana HTTP Provider，最新blockhash等读请求与进行中的相同请求合并"""
+
+    def __init__(self, chain_name: str, endpoint: str, rate: Optional[float] = None, **kwargs):
+        super().__init__(endpoint, **kwargs)
+        self.chain_name = chain_name
+        self.limiter = get_limiter(endpoint, rate)
+
+    def make_request(self, body, parser):
+        method = _solana_method(body)
+
+        def request():
+            return _call(self.chain_name, method, self.endpoint_uri, self.limiter,
+                         lambda: super(SolanaHTTPProvider, self).make_request(body, parser),
+                         method not in NON_IDEMPOTENT_METHODS)
+        if method not in COALESCED_METHODS:
+            return request()
+        # 请求体序列化结果相同（方法、参数、id一致）且解析类型相同时合并
+        return _coalesced_call(self.chain_name, method, self.endpoint_uri, f"{parser.__name__}:{body.to_json()}",
+                               request)
+
+    def make_batch_request(self, reqs, parsers):
+        idempotent = all(_solana_method(body) not in NON_IDEMPOTENT_METHODS for body in reqs)
+        return _call(self.chain_name, "batch", self.endpoint_uri, self.limiter,
+                     lambda: super(SolanaHTTPProvider, self).make_batch_request(reqs, parsers),
+                     idempotent)
+
+
+class AsyncEvmHTTPProvider(AsyncHTTPProvider):
+    """EvmHTTPProvider 的异步版本：共用节点限速器、RPC指标和只读数据缓存"""
+
+    def __init__(self, chain_name: str, endpoint_uri: str, rate: Optional[float] = None, **kwargs):
+        # 关闭 web3 自带的异常重试（会重发 eth_sendRawTransaction，限流时也绕过限速器），重试只在 _acall 中进行
+        super().__init__(endpoint_uri, exception_retry_configuration=None, **kwargs)
+        self.chain_name = chain_name
+        self.limiter = get_limiter(endpoint_uri, rate)
+
+    async def make_request(self, method, params):
+        kind = evm_cache_kind(method, params)
+        if kind is not None:
+            key = evm_cache_key(self.chain_name, method, params)
+            cached = RPC_CACHE.get(kind, key)
+            if cached is not None:
+                return cached
+
+        async def request():
+            return await _acall(self.chain_name, method, self.endpoint_uri, self.limiter,
+                                lambda: super(AsyncEvmHTTPProvider, self).make_request(method, params),
+                                method not in NON_IDEMPOTENT_METHODS, _evm_error)
+        if method not in COALESCED_METHODS and kind != "erc20_metadata":
+            response = await request()
+        else:
+            response = await _async_coalesced_call(self.chain_name, method, self.endpoint_uri,
+                                                   json.dumps(params, sort_keys=True, default=str), request)
+        if kind is not None and "error" not in response:
+            RPC_CACHE.set(kind, key, dict(response))
+        return response
+
+    async def make_batch_request(self, batch_requests):
+        idempotent = all(method not in NON_IDEMPOTENT_METHODS for method, _ in batch_requests)
+        return await _acall(self.chain_name, "batch", self.endpoint_uri, self.limiter,
+                            lambda: super(AsyncEvmHTTPProvider, self).make_batch_request(batch_requests),
+                            idempotent, _evm_batch_error)
+
+
+class AsyncSolanaHTTPProvider(solana_async_http.AsyncHTTPProvider):
+    """SolanaHTTPProvider 的异步版本"""
+
+    def __init__(self, chain_name: str, endpoint: str, rate: Optional[float] = None, **kwargs):
+        super().__init__(endpoint, **kwargs)
+        self.chain_name = chain_name
+        self.limiter = get_limiter(endpoint, rate)
+
+    async def make_request(self, body, parser):
+        method = _solana_method(body)
+
+        async def request():
+            return await _acall(self.chain_name, method, self.endpoint_uri, self.limiter,
+                                lambda: super(AsyncSolanaHTTPProvider, self).make_request(body, parser),
+                                method not in NON_IDEMPOTENT_METHODS)
+        if method not in COALESCED_METHODS:
+            return await request()
+        return await _async_coalesced_call(self.chain_name, method, self.endpoint_uri,
+                                           f"{parser.__name__}:{body.to_json()}", request)
+
+    async def make_batch_request(self, reqs, parsers):
+        idempotent = all(_solana_method(body) not in NON_IDEMPOTENT_METHODS for body in reqs)
+        return await _acall(self.chain_name, "batch", self.endpoint_uri, self.limiter,
+                            lambda: super(AsyncSolanaHTTPProvider, self).make_batch_request(reqs, parsers),
+                            idempotent)
+
+
+def make_web3(chain_info: Dict) -> Web3:
+    """
+    根据链配置创建 Web3 实例，所有调用都经过节点限速器并记录到RPC指标
+
+    Args:
+        chain_info: 链配置（chainName/rpc，可选 rateLimit 指定节点初始速率）
+
+    Returns:
+        Web3: Web3实例
+    """
+    return Web3(EvmHTTPProvider(chain_info['chainName'], chain_info['rpc'], chain_info.get('rateLimit')))
+
+
+def make_solana_client(rpc_url: str, chain_name: str = "Solana Mainnet", rate: Optional[float] = None) -> Client:
+    """
+    创建 Solana 客户端，所有调用都经过节点限速器并记录到RPC指标
+
+    Args:
+        rpc_url: RPC节点地址
+        chain_name: 链名称（指标标签）
+        rate: 节点初始速率（次/秒）
+
+    Returns:
+        Client: Solana客户端
+    """
+    client = Client(rpc_url)
+    client._provider = SolanaHTTPProvider(chain_name, rpc_url, rate)
+    return client
+
+
+def make_async_web3(chain_info: Dict) -> AsyncWeb3:
+    """
+    根据链配置创建 AsyncWeb3 实例（与 make_web3 共用节点限速器和RPC指标），只能在一个事件循环中使用
+
+    Args:
+        chain_info: 链配置（chainName/rpc，可选 rateLimit）
+
+    Returns:
+        AsyncWeb3: AsyncWeb3实例
+    """
+    return AsyncWeb3(AsyncEvmHTTPProvider(chain_info['chainName'], chain_info['rpc'], chain_info.get('rateLimit')))
+
+
+def make_async_solana_client(rpc_url: str, chain_name: str = "Solana Mainnet",
+                             rate: Optional[float] = None) -> AsyncClient:
+    """
+    创建异步 Solana 客户端（与 make_solana_client 共用节点限速器和RPC指标）
+
+    Args:
+        rpc_url: RPC节点地址
+        chain_name: 链名称（指标标签）
+        rate: 节点初始速率（次/秒）
+
+    Returns:
+        AsyncClient: 异步Solana客户端
+    """
+    client = AsyncClient(rpc_url)
+    client._provider = AsyncSolanaHTTPProvider(chain_name, rpc_url, rate)
+    return client
@@ -0,0 +1,251 @@
+import os
+import bisect
+import threading
+from typing import List, Dict, Tuple
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from .rateLimiter import limiter_rates
+from .rpcCache import RPC_CACHE
+
+# 延迟直方图的桶上界（秒），最后一个桶为 +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OUTCOME_OK = "ok"
+OUTCOME_RPC_ERROR = "rpc_error"
+OUTCOME_EXCEPTION = "exception"
+OUTCOME_THROTTLED = "throttled"
+
+
+class _Series:
+    """单个 (chain, method, endpoint, outcome) 组合的累计数据"""
+    __slots__ = ("count", "total", "retries", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.retries = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class RpcMetrics:
+    """
+    进程内RPC指标：按链、方法、节点和结果聚合调用次数、延迟直方图和重试次数
+
+    记录一次调用只做一次字典查找、一次二分和几次加法，开销在微秒级
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str, str, str], _Series] = {}
+        self._coalesced: Dict[Tuple[str, str, str], int] = {}
+
+    def record(self, chain: str, method: str, endpoint: str, latency: float, outcome: str = OUTCOME_OK,
+               retries: int = 0) -> None:
+        """
+        记录一次RPC调用
+
+        Args:
+            chain: 链名称
+            method: RPC方法名
+            endpoint: 节点地址
+            latency: 耗时（秒）
+            outcome: 结果 ok / rpc_error / exception / throttled
+            retries: 本次调用的重试次数
+        """
+        key = (chain, method, endpoint, outcome)
+        index = bisect.bisect_left(LATENCY_BUCKETS, latency)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.count += 1
+            series.total += latency
+            series.retries += retries
+            series.buckets[index] += 1
+
+    def record_coalesced(self, chain: str, method: str, endpoint: str) -> None:
+        """记录一次与进行中的相同请求合并、未发往节点的读请求"""
+        key = (chain, method, endpoint)
+        with self._lock:
+            self._coalesced[key] = self._coalesced.get(key, 0) + 1
+
+    def coalesced(self) -> Dict[Tuple[str, str, str], int]:
+        """各 (链, 方法, 节点) 合并节省的调用次数"""
+        with self._lock:
+            return dict(self._coalesced)
+
+    def reset(self) -> None:
+        """清空全部指标"""
+        with self._lock:
+            self._series.clear()
+            self._coalesced.clear()
+
+    def snapshot(self) -> Dict[Tuple[str, str, str, str], Dict]:
+        """复制当前全部指标，供渲染使用"""
+        with self._lock:
+            return {key: {"count": s.count, "sum": s.total, "retries": s.retries, "buckets": list(s.buckets)}
+                    for key, s in self._series.items()}
+
+    def summary_by_chain(self) -> List[Dict]:
+        """
+        按链汇总：调用次数、错误次数、重试次数、合并节省的调用次数、平均/p50/p99延迟（毫秒）
+
+        Returns:
+            List[Dict]: 按链名排序的汇总行
+        """
+        chains: Dict[str, Dict] = {}
+        for (chain, method, endpoint, outcome), data in self.snapshot().items():
+            row = chains.setdefault(chain, {"chain": chain, "calls": 0, "errors": 0, "retries": 0, "sum": 0.0,
+                                            "buckets": [0] * (len(LATENCY_BUCKETS) + 1), "endpoints": set()})
+            row["calls"] += data["count"]
+            row["retries"] += data["retries"]
+            row["sum"] += data["sum"]
+            row["endpoints"].add(endpoint)
+            if outcome != OUTCOME_OK:
+                row["errors"] += data["count"]
+            for i, n in enumerate(data["buckets"]):
+                row["buckets"][i] += n
+        coalesced: Dict[str, int] = {}
+        for (chain, method, endpoint), n in self.coalesced().items():
+            coalesced[chain] = coalesced.get(chain, 0) + n
+        summary = []
+        for chain in sorted(chains):
+            row = chains[chain]
+            summary.append({
+                "chain": chain,
+                "calls": row["calls"],
+                "errors": row["errors"],
+                "retries": row["retries"],
+                "coalesced": coalesced.get(chain, 0),
+                "endpoints": ", ".join(sorted(row["endpoints"])),
+                "avg_ms": row["sum"] / row["calls"] * 1000 if row["calls"] else 0.0,
+                "p50_ms": _quantile(row["buckets"], 0.5) * 1000,
+                "p99_ms": _quantile(row["buckets"], 0.99) * 1000,
+            })
+        return summary
+
+    def render_prometheus(self) -> str:
+        """渲染为 Prometheus 文本格式"""
+        lines = [
+            "# HELP mywallet_rpc_request_duration_seconds RPC request latency.",
+            "# TYPE mywallet_rpc_request_duration_seconds histogram",
+        ]
+        snapshot = self.snapshot()
+        for key in sorted(snapshot):
+            data = snapshot[key]
+            labels = _labels(key)
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, data["buckets"]):
+                cumulative += n
+                lines.append(f'mywallet_rpc_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'mywallet_rpc_request_duration_seconds_bucket{{{labels},le="+Inf"}} {data["count"]}')
+            lines.append(f'mywallet_rpc_request_duration_seconds_sum{{{labels}}} {data["sum"]:.6f}')
+            lines.append(f'mywallet_rpc_request_duration_seconds_count{{{labels}}} {data["count"]}')
+        lines.append("# HELP mywallet_rpc_retries_total RPC retries.")
+        lines.append("# TYPE mywallet_rpc_retries_total counter")
+        for key in sorted(snapshot):
+            lines.append(f'mywallet_rpc_retries_total{{{_labels(key)}}} {snapshot[key]["retries"]}')
+        lines.append("# HELP mywallet_rpc_coalesced_total Reads served by an identical in-flight request.")
+        lines.append("# TYPE mywallet_rpc_coalesced_total counter")
+        for (chain, method, endpoint), n in sorted(self.coalesced().items()):
+            lines.append(f'mywallet_rpc_coalesced_total{{chain="{_escape(chain)}",method="{_escape(method)}",'
+                         f'endpoint="{_escape(endpoint)}"}} {n}')
+        lines.append("# HELP mywallet_rpc_rate_limit Current adaptive request rate per endpoint (requests/s).")
+        lines.append("# TYPE mywallet_rpc_rate_limit gauge")
+        for endpoint, limiter in sorted(limiter_rates().items()):
+            if limiter["rate"] is None:
+                continue
+            lines.append(f'mywallet_rpc_rate_limit{{endpoint="{_escape(endpoint)}"}} {limiter["rate"]:.3f}')
+        lines.append("# HELP mywallet_rpc_cache_lookups_total Read-only RPC cache lookups.")
+        lines.append("# TYPE mywallet_rpc_cache_lookups_total counter")
+        for (kind, result), n in sorted(RPC_CACHE.stats().items()):
+            lines.append(f'mywallet_rpc_cache_lookups_total{{kind="{_escape(kind)}",result="{result}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """原子写入 Prometheus 文本文件（供 node_exporter textfile collector 读取）"""
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: Tuple[str, str, str, str]) -> str:
+    chain, method, endpoint, outcome = key
+    return (f'chain="{_escape(chain)}",method="{_escape(method)}",'
+            f'endpoint="{_escape(endpoint)}",outcome="{_escape(outcome)}"')
+
+
+def _quantile(buckets: List[int], q: float) -> float:
+    """由直方图估算分位数（桶内线性插值），单位秒"""
+    total = sum(buckets)
+    if total == 0:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+    for i, n in enumerate(buckets):
+        upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+        if n and cumulative + n >= rank:
+            return lower + (upper - lower) * (rank - cumulative) / n
+        cumulative += n
+        lower = upper
+    return LATENCY_BUCKETS[-1]
+
+
+# 全局指标实例，WalletUtil 的所有RPC调用都记录到这里
+RPC_METRICS = RpcMetrics()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1", metrics: RpcMetrics = RPC_METRICS) -> ThreadingHTTPServer:
+    """
+    在后台线程启动 /metrics HTTP 端点
+
+    Args:
+        port: 监听端口
+        host: 监听地址
+        metrics: 指标实例
+
+    Returns:
+        ThreadingHTTPServer: 已启动的服务，调用 shutdown() 停止
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer((host, port), MetricsHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def start_metrics_file_writer(path: str, interval: float = 10.0, metrics: RpcMetrics = RPC_METRICS) -> threading.Event:
+    """
+    在后台线程定期把指标写入文件
+
+    Returns:
+        threading.Event: set() 后停止写入（退出前由调用方再写一次最终结果）
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            metrics.write_prometheus(path)
+
+    threading.Thread(target=loop, daemon=True).start()
+    return stop
+
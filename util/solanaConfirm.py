@@ -0,0 +1,227 @@
+import time
+import asyncio
+import threading
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+from solders.signature import Signature
+from solders.transaction import Transaction
+from solders.rpc.config import RpcSendTransactionConfig
+from solders.rpc.requests import GetBlockHeight, GetSignatureStatuses, SendRawTransaction
+from solders.rpc.responses import GetBlockHeightResp, GetSignatureStatusesResp, SendTransactionResp
+from .rpcClient import make_solana_client
+
+logger = logging.getLogger("MyWalletTool")
+
+# 查询签名状态的间隔（秒）：所有等待中的交易合并成一次批量请求
+STATUS_POLL_INTERVAL = 0.5
+# 未确认的交易每隔多久重新广播一次（秒）
+REBROADCAST_INTERVAL = 2.0
+# 等待确认的最长时间（秒）；正常情况下blockhash约60~90秒过期，先于此超时得到结果
+SOLANA_CONFIRM_TIMEOUT = 120.0
+# getSignatureStatuses 每次最多查询的签名数
+MAX_STATUS_SIGNATURES = 256
+# 达到这些确认级别视为已上链
+LANDED_STATUSES = ("confirmed", "finalized")
+
+OUTCOME_CONFIRMED = "confirmed"
+OUTCOME_FAILED = "failed"
+OUTCOME_EXPIRED = "expired"
+
+# 重新广播时跳过预检，并由本程序而不是节点负责重试
+_REBROADCAST_CONFIG = RpcSendTransactionConfig(skip_preflight=True, max_retries=0)
+
+
+class ConfirmTimeout(Exception):
+    """等待确认超时，交易是否上链未知（不能重新签名，下次续跑时从转账日志重播）"""
+
+
+class _Pending:
+    __slots__ = ("signature", "raw", "last_valid_block_height", "sent_at", "last_sent", "rebroadcasts", "outcome",
+                 "done")
+
+    def __init__(self, txn: Transaction, last_valid_block_height: int, done):
+        self.signature = txn.signatures[0]
+        self.raw = bytes(txn)
+        self.last_valid_block_height = last_valid_block_height
+        self.sent_at = self.last_sent = time.monotonic()
+        self.rebroadcasts = 0
+        self.outcome: Optional[Dict] = None
+        self.done = done
+
+
+class _ConfirmerBase:
+    """发送后确认：同一节点上所有等待中的交易共用一个轮询循环，批量查询状态、批量重新广播"""
+
+    def __init__(self, client, chain_name: str, poll_interval: float = STATUS_POLL_INTERVAL,
+                 rebroadcast_interval: float = REBROADCAST_INTERVAL):
+        self.client = client
+        self.chain_name = chain_name
+        self.poll_interval = poll_interval
+        self.rebroadcast_interval = rebroadcast_interval
+        self._pending: Dict[Signature, _Pending] = {}
+
+    def _status_requests(self, items: List[_Pending]) -> Tuple[Tuple, Tuple]:
+        """当前区块高度和所有签名状态放在一个批量请求中"""
+        reqs = [GetBlockHeight(id=0)]
+        parsers = [GetBlockHeightResp]
+        for start in range(0, len(items), MAX_STATUS_SIGNATURES):
+            chunk = items[start:start + MAX_STATUS_SIGNATURES]
+            reqs.append(GetSignatureStatuses([item.signature for item in chunk], id=len(reqs)))
+            parsers.append(GetSignatureStatusesResp)
+        return tuple(reqs), tuple(parsers)
+
+    def _apply(self, items: List[_Pending], responses: Sequence) -> List[_Pending]:
+        """
+        根据批量查询结果结束已上链、执行失败或已过期的交易，返回需要重新广播的交易
+
+        区块高度和签名状态来自同一批请求：区块高度已超过 lastValidBlockHeight 且仍查不到签名，
+        说明交易再也不会上链，可以安全地重新签名
+        """
+        for resp in responses:
+            if not hasattr(resp, 'value'):
+                raise Exception(f"批量查询签名状态失败: {resp}")
+        height = responses[0].value
+        statuses = [status for resp in responses[1:] for status in resp.value]
+        now = time.monotonic()
+        due = []
+        for item, status in zip(items, statuses):
+            outcome = None
+            if status is not None and status.err is not None:
+                outcome = {'outcome': OUTCOME_FAILED, 'slot': status.slot, 'error': str(status.err)}
+            elif status is not None and str(status.confirmation_status).rsplit('.', 1)[-1].lower() in LANDED_STATUSES:
+                outcome = {'outcome': OUTCOME_CONFIRMED, 'slot': status.slot, 'error': None}
+            elif status is None and height > item.last_valid_block_height:
+                outcome = {'outcome': OUTCOME_EXPIRED, 'slot': None,
+                           'error': f"blockhash已过期（区块高度 {height} > {item.last_valid_block_height}），交易未上链"}
+            if outcome is not None:
+                outcome['land_seconds'] = round(now - item.sent_at, 3)
+                outcome['rebroadcasts'] = item.rebroadcasts
+                item.outcome = outcome
+                self._pending.pop(item.signature, None)
+            elif now - item.last_sent >= self.rebroadcast_interval:
+                due.append(item)
+        return due
+
+    def _rebroadcast_requests(self, due: List[_Pending]) -> Tuple[Tuple, Tuple]:
+        reqs = tuple(SendRawTransaction(item.raw, _REBROADCAST_CONFIG, id=index) for index, item in enumerate(due))
+        now = time.monotonic()
+        for item in due:
+            item.last_sent = now
+            item.rebroadcasts += 1
+        return reqs, (SendTransactionResp,) * len(due)
+
+
+class SolanaConfirmer(_ConfirmerBase):
+    """
+    同步版本：调用方线程阻塞在 confirm 上，后台线程负责轮询
+
+    多个线程同时转账时，所有等待中的签名合并成一次 getSignatureStatuses 批量请求，
+    请求数与并发数无关。没有等待中的交易时后台线程自动退出。
+    """
+
+    def __init__(self, client, chain_name: str, poll_interval: float = STATUS_POLL_INTERVAL,
+                 rebroadcast_interval: float = REBROADCAST_INTERVAL):
+        super().__init__(client, chain_name, poll_interval, rebroadcast_interval)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def confirm(self, txn: Transaction, last_valid_block_height: int,
+                timeout: float = SOLANA_CONFIRM_TIMEOUT) -> Dict:
+        """
+        等待已广播的交易上链，期间按间隔重新广播
+
+        Args:
+            txn: 已签名并已广播的交易
+            last_valid_block_height: 交易blockhash的最后有效区块高度
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            Dict: {'outcome': confirmed/failed/expired, 'slot', 'error', 'land_seconds', 'rebroadcasts'}
+
+        Raises:
+            ConfirmTimeout: 超时仍未得到结果
+        """
+        item = _Pending(txn, last_valid_block_height, threading.Event())
+        with self._lock:
+            self._pending[item.signature] = item
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"solana-confirm-{self.chain_name}",
+                                                daemon=True)
+                self._thread.start()
+        if not item.done.wait(timeout):
+            with self._lock:
+                self._pending.pop(item.signature, None)
+            raise ConfirmTimeout(f"交易 {item.signature} 在 {timeout} 秒内未确认")
+        return item.outcome
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                items = list(self._pending.values())
+                if not items:
+                    self._thread = None
+                    return
+            try:
+                responses = self.client._provider.make_batch_request(*self._status_requests(items))
+                with self._lock:
+                    due = self._apply(items, responses)
+                for item in items:
+                    if item.outcome is not None:
+                        item.done.set()
+                if due:
+                    self.client._provider.make_batch_request(*self._rebroadcast_requests(due))
+            except Exception as e:
+                logger.error(f"{self.chain_name}确认交易轮询失败: {e}")
+
+
+class AsyncSolanaConfirmer(_ConfirmerBase):
+    """异步版本：在一个事件循环中使用（AsyncClient），等待中的转账共用一个轮询任务"""
+
+    def __init__(self, client, chain_name: str, poll_interval: float = STATUS_POLL_INTERVAL,
+                 rebroadcast_interval: float = REBROADCAST_INTERVAL):
+        super().__init__(client, chain_name, poll_interval, rebroadcast_interval)
+        self._task: Optional[asyncio.Task] = None
+
+    async def confirm(self, txn: Transaction, last_valid_block_height: int,
+                      timeout: float = SOLANA_CONFIRM_TIMEOUT) -> Dict:
+        """参数和返回值同 SolanaConfirmer.confirm"""
+        item = _Pending(txn, last_valid_block_height, asyncio.get_running_loop().create_future())
+        self._pending[item.signature] = item
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            return await asyncio.wait_for(asyncio.shield(item.done), timeout)
+        except asyncio.TimeoutError:
+            self._pending.pop(item.signature, None)
+            raise ConfirmTimeout(f"交易 {item.signature} 在 {timeout} 秒内未确认")
+
+    async def _run(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.poll_interval)
+            items = list(self._pending.values())
+            if not items:
+                break
+            try:
+                due = self._apply(items, await self.client._provider.make_batch_request(*self._status_requests(items)))
+                for item in items:
+                    if item.outcome is not None and not item.done.done():
+                        item.done.set_result(item.outcome)
+                if due:
+                    await self.client._provider.make_batch_request(*self._rebroadcast_requests(due))
+            except Exception as e:
+                logger.error(f"{self.chain_name}确认交易轮询失败: {e}")
+
+
+_confirmers: Dict[str, SolanaConfirmer] = {}
+_confirmers_lock = threading.Lock()
+
+
+def get_confirmer(rpc_url: str, chain_name: str, rate: Optional[float] = None) -> SolanaConfirmer:
+    """按节点地址取进程内共享的确认器（同一节点上的所有转账共用一个轮询线程）"""
+    with _confirmers_lock:
+        confirmer = _confirmers.get(rpc_url)
+        if confirmer is None:
+            confirmer = _confirmers[rpc_url] = SolanaConfirmer(make_solana_client(rpc_url, chain_name, rate),
+                                                               chain_name)
+        return confirmer
@@ -0,0 +1,209 @@
+import os
+import io
+import re
+import time
+import pstats
+import cProfile
+import tracemalloc
+import threading
+from typing import List, Optional, Callable, Awaitable
+
+# 环境变量开启性能分析：cpu / mem / cpu,mem（1 等同 cpu）
+PROFILE_ENV = "MYWALLET_PROFILE"
+DEFAULT_PROFILE_DIR = os.path.join("logs", "profile")
+
+# 内存快照中排除分析工具自身的分配
+_MEMORY_FILTERS = (
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+class TaskProfiler:
+    """
+    任务级性能分析器
+
+    用 cProfile 记录CPU耗时，用 tracemalloc 记录内存分配，每个任务输出一个 .prof 和/或 .mem 文件。
+    未开启时调用方不创建该对象，没有任何额外开销。
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_PROFILE_DIR, cpu: bool = True, memory: bool = False):
+        """
+        初始化性能分析器
+
+        Args:
+            output_dir: 分析结果输出目录
+            cpu: 是否记录CPU耗时（cProfile）
+            memory: 是否记录内存快照（tracemalloc）
+        """
+        self.output_dir = output_dir
+        self.cpu = cpu
+        self.memory = memory
+        self._lock = threading.Lock()
+        self._tracing_tasks = 0
+
+    def run(self, task_name: str, func: Callable, *args, workers: Optional["WorkerProfiles"] = None, **kwargs):
+        """
+        在性能分析下执行任务，异常原样抛出
+
+        Args:
+            task_name: 任务名称（用于输出文件名）
+            func: 任务函数
+            workers: 任务在其它线程中执行的部分，其CPU分析结果合并进同一个 .prof 文件
+
+        Returns:
+            任务函数的返回值
+        """
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{_safe_name(task_name)}_{time.strftime('%Y%m%d_%H%M%S')}_{threading.get_ident()}")
+        profile = cProfile.Profile() if self.cpu else None
+        if self.memory:
+            self._start_tracing()
+        if profile is not None:
+            profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+            if self.memory:
+                # 先取内存快照，避免把写 .prof 文件的分配算进去
+                snapshot = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+                self._stop_tracing()
+                snapshot.dump(base + ".mem")
+            if profile is not None:
+                stats = pstats.Stats(profile)
+                for worker_profile in (workers.profiles() if workers is not None else []):
+                    stats.add(worker_profile)
+                stats.dump_stats(base + ".prof")
+
+    def _start_tracing(self):
+        # tracemalloc 是进程级的，多个任务并发时共享同一次跟踪
+        with self._lock:
+            if self._tracing_tasks == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+            self._tracing_tasks += 1
+
+    def _stop_tracing(self):
+        with self._lock:
+            self._tracing_tasks -= 1
+            if self._tracing_tasks == 0:
+                tracemalloc.stop()
+
+
+class WorkerProfiles:
+    """
+    工作线程中的CPU分析结果
+
+    cProfile 只记录开启它的线程，任务交给线程池或异步引擎的事件循环执行时，由工作线程用 call / call_async
+    各自记录，任务结束时 TaskProfiler.run 合并输出。tracemalloc 是进程级的，内存快照本来就包含所有线程。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: List[cProfile.Profile] = []
+
+    def call(self, func: Callable, *args, **kwargs):
+        """在当前线程的性能分析下执行函数"""
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self._add(profile)
+
+    async def call_async(self, awaitable: Awaitable):
+        """在事件循环线程中执行协程；等待期间事件循环处理的其它回调也计入"""
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return await awaitable
+        finally:
+            profile.disable()
+            self._add(profile)
+
+    def profiles(self) -> List[cProfile.Profile]:
+        with self._lock:
+            return list(self._profiles)
+
+    def _add(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name)
+
+
+def profiler_from_env(output_dir: str = DEFAULT_PROFILE_DIR) -> Optional[TaskProfiler]:
+    """
+    根据环境变量 MYWALLET_PROFILE 创建性能分析器，未设置时返回None
+
+    Returns:
+        Optional[TaskProfiler]: 性能分析器
+    """
+    return profiler_from_spec(os.environ.get(PROFILE_ENV, ""), output_dir)
+
+
+def profiler_from_spec(spec: str, output_dir: str = DEFAULT_PROFILE_DIR) -> Optional[TaskProfiler]:
+    """
+    根据 "cpu" / "mem" / "cpu,mem" 创建性能分析器，空字符串返回None
+    """
+    modes = {m.strip().lower() for m in (spec or "").split(",") if m.strip()}
+    if not modes or modes <= {"0", "off", "false"}:
+        return None
+    cpu = bool(modes & {"cpu", "1", "on", "true"})
+    memory = bool(modes & {"mem", "memory"})
+    return TaskProfiler(output_dir, cpu=cpu, memory=memory)
+
+
+def summarize(paths: List[str], top: int = 20) -> str:
+    """
+    汇总性能分析结果：.prof 按累计耗时列出前N个函数，.mem 按分配大小列出前N行代码
+
+    Args:
+        paths: .prof / .mem 文件路径（多个 .prof 会合并统计）
+        top: 列出的条数
+
+    Returns:
+        str: 文本报告
+    """
+    prof_paths = [p for p in paths if p.endswith(".prof")]
+    mem_paths = [p for p in paths if p.endswith(".mem")]
+    out = io.StringIO()
+    if prof_paths:
+        stats = pstats.Stats(*prof_paths, stream=out)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(top)
+    for path in mem_paths:
+        snapshot = tracemalloc.Snapshot.load(path)
+        out.write(f"内存分配 Top {top}: {path}\n")
+        for stat in snapshot.statistics("lineno")[:top]:
+            out.write(f"  {stat}\n")
+    return out.getvalue()
+
+
+def list_profiles(output_dir: str = DEFAULT_PROFILE_DIR, last: Optional[int] = None) -> List[str]:
+    """
+    列出输出目录中的分析文件（按修改时间排序）
+
+    Args:
+        output_dir: 分析结果输出目录
+        last: 只返回最新N个任务的文件（同一任务的 .prof 和 .mem 算一个）
+    """
+    if not os.path.isdir(output_dir):
+        return []
+    paths = [os.path.join(output_dir, n) for n in os.listdir(output_dir) if n.endswith((".prof", ".mem"))]
+    paths.sort(key=os.path.getmtime)
+    if last is not None:
+        tasks = []
+        for path in reversed(paths):
+            task = os.path.splitext(path)[0]
+            if task not in tasks:
+                tasks.append(task)
+        keep = set(tasks[:last])
+        paths = [p for p in paths if os.path.splitext(p)[0] in keep]
+    return paths
@@ -0,0 +1,403 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Any, List, Dict, Optional, Iterable, Tuple
+
+# 转账状态流转：planned -> signed -> broadcast -> confirmed / failed
+STATE_PLANNED = "planned"
+STATE_SIGNED = "signed"
+STATE_BROADCAST = "broadcast"
+STATE_CONFIRMED = "confirmed"
+STATE_FAILED = "failed"
+
+# 终态：断点续跑时直接返回记录结果，不再查询链上状态
+FINAL_STATES = (STATE_CONFIRMED, STATE_FAILED)
+
+DEFAULT_JOURNAL_PATH = os.path.join("data", "tx_journal.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfers (
+    job_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    chain_name TEXT,
+    coin_name TEXT,
+    from_address TEXT,
+    to_address TEXT,
+    amount TEXT,
+    state TEXT NOT NULL,
+    tx_hash TEXT,
+    raw_tx TEXT,
+    block_number INTEGER,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, item_id)
+);
+CREATE TABLE IF NOT EXISTS transfer_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    tx_hash TEXT,
+    detail TEXT,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transfer_events_item ON transfer_events (job_id, item_id);
+CREATE INDEX IF NOT EXISTS idx_transfers_updated ON transfers (updated_at);
+CREATE INDEX IF NOT EXISTS idx_transfers_created ON transfers (created_at);
+CREATE INDEX IF NOT EXISTS idx_transfers_chain ON transfers (chain_name, updated_at);
+CREATE INDEX IF NOT EXISTS idx_transfers_coin ON transfers (coin_name, updated_at);
+CREATE INDEX IF NOT EXISTS idx_transfers_state ON transfers (state, updated_at);
+CREATE INDEX IF NOT EXISTS idx_transfers_to ON transfers (to_address COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_transfers_from ON transfers (from_address COLLATE NOCASE);
+"""
+
+# 按金额排序用的数值列（虚拟生成列，不占存储，写入时无需维护）；建表后检查并补上，兼容已有的数据库
+_AMOUNT_VALUE_COLUMN = "amount_value REAL GENERATED ALWAYS AS (CAST(amount AS REAL)) VIRTUAL"
+_AMOUNT_INDEX = "CREATE INDEX IF NOT EXISTS idx_transfers_amount ON transfers (amount_value)"
+
+# 状态更新：只覆盖本次提供的字段，已有的tx_hash/raw_tx等保持不变
+_UPSERT_SQL = """
+INSERT INTO transfers (job_id, item_id, chain_name, coin_name, from_address, to_address, amount,
+                       state, tx_hash, raw_tx, block_number, error, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (job_id, item_id) DO UPDATE SET
+    chain_name = COALESCE(excluded.chain_name, transfers.chain_name),
+    coin_name = COALESCE(excluded.coin_name, transfers.coin_name),
+    from_address = COALESCE(excluded.from_address, transfers.from_address),
+    to_address = COALESCE(excluded.to_address, transfers.to_address),
+    amount = COALESCE(excluded.amount, transfers.amount),
+    state = excluded.state,
+    tx_hash = COALESCE(excluded.tx_hash, transfers.tx_hash),
+    raw_tx = COALESCE(excluded.raw_tx, transfers.raw_tx),
+    block_number = COALESCE(excluded.block_number, transfers.block_number),
+    error = excluded.error,
+    updated_at = excluded.updated_at
+"""
+
+_EVENT_SQL = "INSERT INTO transfer_events (job_id, item_id, state, tx_hash, detail, ts) VALUES (?, ?, ?, ?, ?, ?)"
+
+_PLAN_SQL = """
+INSERT OR IGNORE INTO transfers (job_id, item_id, chain_name, coin_name, from_address, to_address, amount,
+                                 state, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_COLUMNS = ("job_id", "item_id", "chain_name", "coin_name", "from_address", "to_address", "amount",
+            "state", "tx_hash", "raw_tx", "block_number", "error", "created_at", "updated_at")
+
+
+class TxJournal:
+    """
+    转账日志（SQLite WAL模式）
+
+    记录每笔转账的状态流转、签名后的原始交易和交易哈希，进程崩溃后批量任务可据此断点续跑。
+    写入先进入内存缓冲，按条数或时间间隔批量提交；广播前的 signed 状态使用 durable=True
+    立即落盘（同时提交缓冲中其它线程的记录），保证重启后不会重复发送。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_JOURNAL_PATH, flush_size: int = 500, flush_interval: float = 1.0,
+                 shared: bool = False):
+        """
+        初始化转账日志
+
+        Args:
+            db_path: SQLite数据库文件路径
+            flush_size: 缓冲记录达到该条数时自动提交
+            flush_interval: 距上次提交超过该秒数时自动提交
+            shared: 多台机器通过共享存储同时使用（多机工作进程）：改用回滚日志，WAL不支持网络文件系统
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.db_path = db_path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._buffer: List[Tuple] = []
+        self._events: List[Tuple] = []
+        self._last_flush = time.time()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30 if shared else 5)
+        if shared:
+            self._conn.execute("PRAGMA journal_mode=DELETE")
+        else:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # WAL模式下NORMAL可保证进程崩溃不丢已提交数据
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_xinfo(transfers)")}
+        if "amount_value" not in columns:
+            try:
+                self._conn.execute(f"ALTER TABLE transfers ADD COLUMN {_AMOUNT_VALUE_COLUMN}")
+            except sqlite3.OperationalError as e:
+                # 多个进程同时打开同一个数据库时，其它进程可能已经加上了
+                if "duplicate column" not in str(e):
+                    raise
+        self._conn.execute(_AMOUNT_INDEX)
+        self._conn.commit()
+
+    def plan(self, job_id: str, items: Iterable[Dict]) -> int:
+        """
+        批量登记计划中的转账（已存在的条目保持原状态）
+
+        Args:
+            job_id: 批量任务ID
+            items: 转账条目，需包含 item_id/to_address/chain_name/coin_name/amount
+
+        Returns:
+            int: 登记的条目数
+        """
+        now = time.time()
+        rows = [(job_id, str(item["item_id"]), item.get("chain_name"), item.get("coin_name"),
+                 item.get("from_address"), item.get("to_address"), str(item.get("amount")),
+                 STATE_PLANNED, now, now) for item in items]
+        with self._lock:
+            self._flush_locked()
+            self._conn.executemany(_PLAN_SQL, rows)
+            self._conn.commit()
+        return len(rows)
+
+    def record(self, job_id: str, item_id: str, state: str, durable: bool = False, **fields) -> None:
+        """
+        记录一次状态流转
+
+        Args:
+            job_id: 批量任务ID
+            item_id: 条目ID
+            state: 新状态
+            durable: 是否立即落盘（广播前必须为True）
+            **fields: chain_name/coin_name/from_address/to_address/amount/tx_hash/raw_tx/block_number/error
+        """
+        now = time.time()
+        amount = fields.get("amount")
+        row = (job_id, str(item_id), fields.get("chain_name"), fields.get("coin_name"),
+               fields.get("from_address"), fields.get("to_address"),
+               None if amount is None else str(amount), state, fields.get("tx_hash"),
+               fields.get("raw_tx"), fields.get("block_number"), fields.get("error"), now, now)
+        event = (job_id, str(item_id), state, fields.get("tx_hash"), fields.get("error"), now)
+        with self._lock:
+            self._buffer.append(row)
+            self._events.append(event)
+            if durable or len(self._buffer) >= self.flush_size or now - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def discard_signed(self, job_id: str, item_id: str, error: str) -> None:
+        """
+        已签名的交易被节点明确拒绝（没有进入内存池）：记为失败并清除签名结果
+
+        record 不会覆盖已有的 tx_hash/raw_tx；这笔交易的nonce已经归还给后面的条目，
+        保留原始交易会在续跑时重播一笔永远不会上链的交易。
+        """
+        now = time.time()
+        with self._lock:
+            self._flush_locked()
+            with self._conn:
+                self._conn.execute("UPDATE transfers SET state = ?, tx_hash = NULL, raw_tx = NULL, error = ?, "
+                                   "updated_at = ? WHERE job_id = ? AND item_id = ?",
+                                   (STATE_FAILED, error, now, job_id, str(item_id)))
+                self._conn.execute(_EVENT_SQL, (job_id, str(item_id), STATE_FAILED, None, error, now))
+
+    def flush(self) -> None:
+        """提交缓冲中的全部记录"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        with self._conn:
+            self._conn.executemany(_UPSERT_SQL, self._buffer)
+            self._conn.executemany(_EVENT_SQL, self._events)
+        self._buffer.clear()
+        self._events.clear()
+        self._last_flush = time.time()
+
+    def get(self, job_id: str, item_id: str) -> Optional[Dict]:
+        """
+        查询单个条目的当前状态
+
+        Returns:
+            Optional[Dict]: 条目记录，不存在时返回None
+        """
+        with self._lock:
+            self._flush_locked()
+            cur = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM transfers WHERE job_id = ? AND item_id = ?",
+                                     (job_id, str(item_id)))
+            row = cur.fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def job_entries(self, job_id: str) -> Dict[str, Dict]:
+        """
+        一次性读取批量任务的全部条目
+
+        Returns:
+            Dict[str, Dict]: item_id -> 条目记录
+        """
+        with self._lock:
+            self._flush_locked()
+            cur = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM transfers WHERE job_id = ?", (job_id,))
+            rows = cur.fetchall()
+        return {row[1]: dict(zip(_COLUMNS, row)) for row in rows}
+
+    def events(self, job_id: str, item_id: str) -> List[Dict]:
+        """查询条目的状态流转历史"""
+        with self._lock:
+            self._flush_locked()
+            cur = self._conn.execute(
+                "SELECT state, tx_hash, detail, ts FROM transfer_events WHERE job_id = ? AND item_id = ? ORDER BY id",
+                (job_id, str(item_id)))
+            rows = cur.fetchall()
+        return [{"state": r[0], "tx_hash": r[1], "detail": r[2], "ts": r[3]} for r in rows]
+
+    def close(self) -> None:
+        """提交剩余记录并关闭数据库"""
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+
+def entry_to_result(entry: Dict) -> Dict:
+    """
+    将日志中的终态条目转换为 transfer_token 风格的结果字典
+
+    Args:
+        entry: 日志条目
+
+    Returns:
+        Dict: 转账结果
+    """
+    if entry["state"] == STATE_CONFIRMED:
+        result = {
+            "success": True,
+            "tx_hash": entry["tx_hash"],
+            "from_address": entry["from_address"],
+            "to_address": entry["to_address"],
+            "amount": entry["amount"],
+            "chain_name": entry["chain_name"],
+            "coin_name": entry["coin_name"],
+        }
+        if entry.get("block_number") is not None:
+            result["block_number"] = entry["block_number"]
+    else:
+        result = {"success": False, "error": entry.get("error") or "交易执行失败", "tx_hash": entry.get("tx_hash")}
+    result["resumed"] = True
+    return result
+
+
+
+# 历史查询可排序的列（列名 -> ORDER BY 表达式，最后再按rowid排序）
+# 与 _SCHEMA 中对应索引的列一致（索引末尾隐含rowid），排序直接按索引顺序读取，不需要临时B树
+HISTORY_SORT_KEYS = {
+    "updated_at": ("updated_at",),
+    "created_at": ("created_at",),
+    "chain_name": ("chain_name", "updated_at"),
+    "coin_name": ("coin_name", "updated_at"),
+    "state": ("state", "updated_at"),
+    "to_address": ("to_address COLLATE NOCASE",),
+    "amount": ("amount_value",),
+}
+# 不会为NULL的排序列，键集分页不需要处理NULL
+_NOT_NULL_SORT_KEYS = ("updated_at", "created_at", "state")
+HISTORY_COLUMNS = ("updated_at", "job_id", "chain_name", "coin_name", "from_address", "to_address", "amount",
+                   "state", "tx_hash", "error")
+
+
+def _keyset(exprs: Tuple[str, ...], op: str) -> str:
+    """(列, ...) op (?, ...)；COLLATE 写在参数一侧，SQLite 才会在带排序规则的索引上做范围查询"""
+    columns, values = [], []
+    for expr in exprs:
+        column, _, collation = expr.partition(" COLLATE ")
+        columns.append(column)
+        values.append(f"? COLLATE {collation}" if collation else "?")
+    return f"({', '.join(columns)}) {op} ({', '.join(values)})"
+
+
+class TransferHistory:
+    """
+    转账历史查询（只读连接，与写入日志的进程/线程互不阻塞）
+
+    按链、代币、状态、地址过滤。不过滤时按任一列排序、按链/代币/状态过滤后按更新时间排序都直接按索引顺序读取；
+    过滤后再按其它列排序时由SQLite对过滤结果排序。分页使用键集分页（记住上一页最后一行的排序值和rowid），
+    按索引读取时翻到十万行之后的页面也不需要扫描前面的行。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_JOURNAL_PATH):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _where(filters: Dict[str, Any]) -> Tuple[List[str], List]:
+        clauses, params = [], []
+        for column in ("chain_name", "coin_name", "state"):
+            if filters.get(column):
+                clauses.append(f"{column} = ?")
+                params.append(filters[column])
+        if filters.get("address"):
+            clauses.append("(to_address = ? COLLATE NOCASE OR from_address = ? COLLATE NOCASE)")
+            params += [filters["address"], filters["address"]]
+        return clauses, params
+
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        """符合条件的记录数"""
+        clauses, params = self._where(filters or {})
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM transfers{where}", params).fetchone()[0]
+
+    def page(self, filters: Optional[Dict[str, Any]] = None, sort_key: str = "updated_at", descending: bool = True,
+             after: Optional[Tuple] = None, limit: int = 500) -> Tuple[List[Tuple], Optional[Tuple]]:
+        """
+        读取一页记录
+
+        Args:
+            filters: 过滤条件 chain_name / coin_name / state / address
+            sort_key: 排序列（HISTORY_SORT_KEYS 的键）
+            descending: 是否倒序
+            after: 上一页返回的游标，None 表示第一页
+            limit: 每页行数
+
+        Returns:
+            Tuple[List[Tuple], Optional[Tuple]]: (按 HISTORY_COLUMNS 排列的行, 下一页游标)
+        """
+        exprs = HISTORY_SORT_KEYS[sort_key] + ("rowid",)
+        clauses, params = self._where(filters or {})
+        # 键集分页：(排序值, ..., rowid) 严格位于游标之后。排序值为NULL的行在SQLite中最小，
+        # 用 OR 合并会让SQLite放弃按索引顺序读取，所以NULL的行单独查一段，每段都是索引上的范围查询
+        op = "<" if descending else ">"
+        first = exprs[0].partition(" COLLATE ")[0]
+        if after is None:
+            segments = [([], [])]
+        elif after[0] is None:
+            segments = [([f"{first} IS NULL", _keyset(exprs[1:], op)], list(after[1:]))]
+            if not descending:
+                segments.append(([f"{first} IS NOT NULL"], []))
+        else:
+            segments = [([_keyset(exprs, op)], list(after))]
+            if descending and sort_key not in _NOT_NULL_SORT_KEYS:
+                segments.append(([f"{first} IS NULL"], []))
+        order = "DESC" if descending else "ASC"
+        rows = []
+        with self._lock:
+            for keyset, keyset_params in segments:
+                if len(rows) >= limit:
+                    break
+                where = " AND ".join(clauses + keyset)
+                sql = (f"SELECT {', '.join(HISTORY_COLUMNS + exprs)} FROM transfers{' WHERE ' + where if where else ''} "
+                       f"ORDER BY {', '.join(f'{expr} {order}' for expr in exprs)} LIMIT ?")
+                rows += self._conn.execute(sql, params + keyset_params + [limit - len(rows)]).fetchall()
+        cursor = tuple(rows[-1][len(HISTORY_COLUMNS):]) if len(rows) == limit else None
+        return [row[:len(HISTORY_COLUMNS)] for row in rows], cursor
+
+    def distinct(self, column: str) -> List[str]:
+        """某列的全部取值（用于过滤下拉框），走索引"""
+        if column not in ("chain_name", "coin_name", "state"):
+            raise ValueError(f"不支持的列: {column}")
+        with self._lock:
+            return [r[0] for r in self._conn.execute(
+                f"SELECT DISTINCT {column} FROM transfers WHERE {column} IS NOT NULL ORDER BY {column}")]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
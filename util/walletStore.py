@@ -0,0 +1,320 @@
+import os
+import mmap
+import array
+import struct
+import bisect
+import secrets
+from typing import Callable, Dict, Iterator, Optional
+from eth_keys import keys
+from eth_utils import to_checksum_address
+from mnemonic import Mnemonic
+
+# 每个钱包的定长字段（字节）：EVM地址、私钥、助记词熵（12个词 = 128位）
+ADDRESS_SIZE = 20
+PRIVATE_KEY_SIZE = 32
+ENTROPY_SIZE = 16
+# 文件头: 魔数、版本、保留字段、钱包数；之后依次是地址列、私钥列、熵列、按地址排序的序号索引
+_MAGIC = b"MWWS"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHQ")
+# 导出时每次写入的行数
+_EXPORT_CHUNK = 10000
+
+_MNEMO = Mnemonic("english")
+
+
+class WalletRecord:
+    """钱包存储中一条记录的视图：不复制数据，字段按需从列中解码"""
+
+    __slots__ = ("_store", "index")
+
+    def __init__(self, store: "WalletStore", index: int):
+        self._store = store
+        self.index = index
+
+    @property
+    def address_bytes(self) -> bytes:
+        return self._store.address_at(self.index)
+
+    @property
+    def address(self) -> str:
+        """EIP-55 校验和地址"""
+        return to_checksum_address(self.address_bytes)
+
+    @property
+    def private_key(self) -> str:
+        return "0x" + self._store.private_key_at(self.index).hex()
+
+    @property
+    def mnemonic(self) -> str:
+        return _MNEMO.to_mnemonic(self._store.entropy_at(self.index))
+
+    def to_dict(self, include_private_key: bool = False) -> Dict:
+        """转为与 WalletUtil.generate_wallet_info 相同格式的字典"""
+        result = {"mnemonic": self.mnemonic, "evm_address": self.address}
+        if include_private_key:
+            result["private_key"] = self.private_key
+        return result
+
+    def __repr__(self) -> str:
+        return f"WalletRecord({self.index}, {self.address})"
+
+
+class WalletStore:
+    """
+    列式钱包存储：地址、私钥、助记词熵分别保存在定长字节数组中
+
+    每个钱包只占 20+32+16 字节，加上4字节的地址索引共72字节；同样的数据保存为字典
+    （助记词和地址字符串）每个钱包要数百字节，上百万个钱包时内存相差一个数量级。
+    save 写入的文件可以用 open 以内存映射方式只读打开，不把整个文件读入内存，
+    按地址查找使用保存在文件中的排序索引（二分查找），打开后不需要重建。
+    """
+
+    def __init__(self):
+        self._addresses = bytearray()
+        self._keys = bytearray()
+        self._entropy = bytearray()
+        self._count = 0
+        # 按地址排序的钱包序号，追加后失效，查找时按需重建
+        self._order: Optional[array.array] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._file = None
+
+    @classmethod
+    def open(cls, path: str) -> "WalletStore":
+        """
+        以内存映射方式只读打开 save 写入的文件
+
+        Args:
+            path: 存储文件路径
+
+        Returns:
+            WalletStore: 只读的钱包存储，用完调用 close
+        """
+        f = open(path, 'rb')
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            f.close()
+            raise ValueError(f"钱包存储文件为空: {path}")
+        if len(mapped) < _HEADER.size:
+            mapped.close()
+            f.close()
+            raise ValueError(f"不是钱包存储文件或版本不支持: {path}")
+        magic, version, _, count = _HEADER.unpack_from(mapped, 0)
+        if magic != _MAGIC or version != _VERSION:
+            mapped.close()
+            f.close()
+            raise ValueError(f"不是钱包存储文件或版本不支持: {path}")
+        expected = _HEADER.size + count * (ADDRESS_SIZE + PRIVATE_KEY_SIZE + ENTROPY_SIZE + 4)
+        if len(mapped) != expected:
+            mapped.close()
+            f.close()
+            raise ValueError(f"钱包存储文件长度不正确（{len(mapped)} != {expected}），文件可能已损坏: {path}")
+        store = cls()
+        view = memoryview(mapped)
+        offset = _HEADER.size
+        store._addresses = view[offset:offset + count * ADDRESS_SIZE]
+        offset += count * ADDRESS_SIZE
+        store._keys = view[offset:offset + count * PRIVATE_KEY_SIZE]
+        offset += count * PRIVATE_KEY_SIZE
+        store._entropy = view[offset:offset + count * ENTROPY_SIZE]
+        offset += count * ENTROPY_SIZE
+        store._order = view[offset:].cast('I')
+        store._count = count
+        store._mmap = mapped
+        store._file = f
+        return store
+
+    @property
+    def read_only(self) -> bool:
+        return self._mmap is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> WalletRecord:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"钱包序号超出范围: {index}")
+        return WalletRecord(self, index)
+
+    def __iter__(self) -> Iterator[WalletRecord]:
+        for index in range(self._count):
+            yield WalletRecord(self, index)
+
+    def __contains__(self, address) -> bool:
+        return self.find(address) is not None
+
+    def address_at(self, index: int) -> bytes:
+        return bytes(self._addresses[index * ADDRESS_SIZE:(index + 1) * ADDRESS_SIZE])
+
+    def private_key_at(self, index: int) -> bytes:
+        return bytes(self._keys[index * PRIVATE_KEY_SIZE:(index + 1) * PRIVATE_KEY_SIZE])
+
+    def entropy_at(self, index: int) -> bytes:
+        return bytes(self._entropy[index * ENTROPY_SIZE:(index + 1) * ENTROPY_SIZE])
+
+    def append(self, address: bytes, private_key: bytes, entropy: bytes) -> int:
+        """
+        追加一个钱包
+
+        Args:
+            address: 20字节地址
+            private_key: 32字节私钥
+            entropy: 16字节助记词熵
+
+        Returns:
+            int: 钱包序号
+        """
+        if self.read_only:
+            raise ValueError("内存映射打开的钱包存储是只读的")
+        if len(address) != ADDRESS_SIZE or len(private_key) != PRIVATE_KEY_SIZE or len(entropy) != ENTROPY_SIZE:
+            raise ValueError(f"字段长度不正确: 地址{len(address)}字节, 私钥{len(private_key)}字节, 熵{len(entropy)}字节")
+        self._addresses += address
+        self._keys += private_key
+        self._entropy += entropy
+        self._order = None
+        self._count += 1
+        return self._count - 1
+
+    def copy(self) -> "WalletStore":
+        """复制为可追加的内存存储（整列复制，内存映射打开的文件需要追加时使用）"""
+        store = WalletStore()
+        store._addresses = bytearray(self._addresses)
+        store._keys = bytearray(self._keys)
+        store._entropy = bytearray(self._entropy)
+        store._count = self._count
+        if self._order is not None:
+            store._order = array.array('I', self._order)
+        return store
+
+    def find(self, address) -> Optional[WalletRecord]:
+        """
+        按地址查找钱包（不区分大小写）
+
+        Args:
+            address: 0x开头的地址字符串或20字节地址
+
+        Returns:
+            Optional[WalletRecord]: 找到时返回记录视图，否则返回None
+        """
+        target = address if isinstance(address, (bytes, bytearray)) else _address_bytes(address)
+        if target is None:
+            return None
+        order = self._index()
+        position = bisect.bisect_left(order, target, key=self.address_at)
+        if position < len(order) and self.address_at(order[position]) == target:
+            return WalletRecord(self, order[position])
+        return None
+
+    def save(self, path: str) -> None:
+        """写入文件（先写临时文件再替换，写入中断不会损坏已有文件）"""
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        order = self._index()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, 0, self._count))
+            f.write(self._addresses)
+            f.write(self._keys)
+            f.write(self._entropy)
+            f.write(order if isinstance(order, memoryview) else order.tobytes())
+        os.replace(tmp_path, path)
+
+    def export_csv(self, path: str, include_private_key: bool = False) -> int:
+        """
+        导出为CSV（evm_address,mnemonic[,private_key]），按块拼接后写入
+
+        Args:
+            path: 输出文件路径
+            include_private_key: 是否导出私钥
+
+        Returns:
+            int: 导出的钱包数
+        """
+        to_mnemonic = _MNEMO.to_mnemonic
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write("evm_address,mnemonic,private_key\n" if include_private_key else "evm_address,mnemonic\n")
+            for start in range(0, self._count, _EXPORT_CHUNK):
+                lines = []
+                for index in range(start, min(start + _EXPORT_CHUNK, self._count)):
+                    line = f"{to_checksum_address(self.address_at(index))},{to_mnemonic(self.entropy_at(index))}"
+                    if include_private_key:
+                        line += ",0x" + self.private_key_at(index).hex()
+                    lines.append(line + "\n")
+                f.writelines(lines)
+        return self._count
+
+    def memory_bytes(self) -> int:
+        """列和索引占用的字节数（内存映射打开时为映射的文件大小）"""
+        if self._mmap is not None:
+            return len(self._mmap)
+        order = self._order.itemsize * len(self._order) if self._order is not None else 0
+        return len(self._addresses) + len(self._keys) + len(self._entropy) + order
+
+    def close(self) -> None:
+        """关闭内存映射（只读打开时）"""
+        if self._mmap is None:
+            return
+        # 先释放指向映射的视图，否则 mmap 无法关闭
+        for view in (self._addresses, self._keys, self._entropy, self._order):
+            view.release()
+        self._addresses = self._keys = self._entropy = bytearray()
+        self._order = None
+        self._count = 0
+        self._mmap.close()
+        self._mmap = None
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> "WalletStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _index(self):
+        if self._order is None:
+            self._order = array.array('I', sorted(range(self._count), key=self.address_at))
+        return self._order
+
+
+def _address_bytes(address: str) -> Optional[bytes]:
+    address = address.strip()
+    if address[:2].lower() == "0x":
+        address = address[2:]
+    if len(address) != ADDRESS_SIZE * 2:
+        return None
+    try:
+        return bytes.fromhex(address)
+    except ValueError:
+        return None
+
+
+def generate_wallets(count: int, store: Optional[WalletStore] = None,
+                     progress: Optional[Callable[[int, int], None]] = None) -> WalletStore:
+    """
+    批量生成钱包写入列式存储（与 WalletUtil.generate_wallet_info 相同：助记词和私钥分别随机生成）
+
+    Args:
+        count: 生成数量
+        store: 追加到已有存储，缺省时新建
+        progress: 进度回调 (已生成数, 总数)，每生成 _EXPORT_CHUNK 个调用一次
+
+    Returns:
+        WalletStore: 钱包存储
+    """
+    if count < 0:
+        raise ValueError(f"生成数量不能为负数: {count}")
+    store = store if store is not None else WalletStore()
+    for done in range(1, count + 1):
+        private_key = secrets.token_bytes(PRIVATE_KEY_SIZE)
+        address = keys.PrivateKey(private_key).public_key.to_canonical_address()
+        store.append(address, private_key, secrets.token_bytes(ENTROPY_SIZE))
+        if progress is not None and (done % _EXPORT_CHUNK == 0 or done == count):
+            progress(done, count)
+    return store
+
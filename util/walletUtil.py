@@ -1,22 +1,40 @@
 import os
+import time
 import secrets
 import json
 from typing import List, Tuple, Dict, Optional
 from eth_account import Account
+from eth_account.signers.local import LocalAccount
 from mnemonic import Mnemonic
 import base58
 import hashlib
 from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound
 import requests
 from solana.rpc.api import Client
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
+from solders.rpc.requests import IsBlockhashValid
+from solders.rpc.responses import IsBlockhashValidResp
 from solders.transaction import Transaction
 from solders.system_program import TransferParams, transfer
 from spl.token.constants import TOKEN_PROGRAM_ID
 from spl.token.instructions import transfer_checked, get_associated_token_address, create_associated_token_account, TransferCheckedParams
 import logging
 from datetime import datetime
+from decimal import Decimal
+from .recipientValidator import SOLANA_CHAIN_NAME, is_valid_evm_address, is_valid_solana_address
+from .rpcClient import make_web3, make_solana_client
+from .rateLimiter import is_transient_error
+from .rpcCache import account_exists, forget_account
+from .nonceManager import NonceManager
+from .keyVault import VaultKey, KIND_EVM, KIND_SOLANA
+from .addressScreen import AddressScreen, LEVEL_BLOCK, describe_hit
+from .priorityFee import DEFAULT_PRIORITY, compute_budget, with_compute_budget
+from .configCache import load_json_config
+from .solanaConfirm import get_confirmer, OUTCOME_CONFIRMED, OUTCOME_EXPIRED
+from .walletStore import WalletStore, generate_wallets
+from .txJournal import TxJournal, entry_to_result, FINAL_STATES, STATE_SIGNED, STATE_BROADCAST, STATE_CONFIRMED, STATE_FAILED
 
 # 日志格式设置 - 只输出到控制台，不生成文件
 logger = logging.getLogger("MyWalletTool")
@@ -35,6 +53,167 @@ logger.addHandler(console_handler)
 # 防止日志传播到根logger
 logger.propagate = False
 
+# Solana主网公共RPC（chain.json 未配置时使用）
+SOLANA_MAINNET_RPC = "https://api.mainnet-beta.solana.com"
+
+# 转账gas上限
+NATIVE_TRANSFER_GAS = 21000
+ERC20_TRANSFER_GAS = 100000
+# Solana每个签名的基础手续费（lamports）
+SOLANA_SIGNATURE_FEE = 5000
+# 等待EVM交易确认的超时（秒）；有nonce管理器时每次超时后检查是否需要提价重发，最多重发 MAX_FEE_BUMPS 次
+EVM_RECEIPT_TIMEOUT = 120
+MAX_FEE_BUMPS = 3
+
+# ERC20转账ABI
+ERC20_TRANSFER_ABI = [
+    {
+        "constant": False,
+        "inputs": [
+            {"name": "_to", "type": "address"},
+            {"name": "_value", "type": "uint256"}
+        ],
+        "name": "transfer",
+        "outputs": [{"name": "", "type": "bool"}],
+        "type": "function"
+    }
+]
+
+
+def parse_solana_keypair(private_key: str) -> Keypair:
+    """
+    解析Solana私钥
+    
+    Args:
+        private_key: base58字符串、32字节种子的十六进制或数组格式（[1,2,...]）
+        
+    Returns:
+        Keypair: 密钥对
+    """
+    if private_key.startswith('['):
+        # 兼容助记词导出的数组格式
+        return Keypair.from_bytes(bytes(json.loads(private_key)))
+    if len(private_key) == 64:
+        return Keypair.from_seed(bytes.fromhex(private_key))
+    # base58字符串
+    return Keypair.from_base58_string(private_key)
+
+
+def resolve_signer(private_key, chain_name: str):
+    """
+    把私钥字符串、已解析的签名对象或密钥库引用（VaultKey）统一转换为签名对象
+
+    Args:
+        private_key: 私钥字符串 / LocalAccount / Keypair / VaultKey
+        chain_name: 链名称，决定返回 Keypair（Solana）还是 LocalAccount（EVM）
+
+    Returns:
+        LocalAccount 或 Keypair
+    """
+    is_solana = chain_name == SOLANA_CHAIN_NAME
+    if isinstance(private_key, VaultKey):
+        return private_key.signer(KIND_SOLANA if is_solana else KIND_EVM)
+    if is_solana:
+        return private_key if isinstance(private_key, Keypair) else parse_solana_keypair(private_key)
+    return private_key if isinstance(private_key, LocalAccount) else Account.from_key(private_key)
+
+
+def build_evm_transfer(w3: Web3, to_address: str, token_info: Dict, amount: str, nonce: int, gas_price: int, chain_id: int) -> Dict:
+    """
+    构建EVM转账交易（原生币或ERC20），不访问网络
+    
+    Args:
+        w3: Web3实例（可以没有provider）
+        to_address: 接收地址
+        token_info: 代币配置
+        amount: 转账数量
+        nonce: 交易nonce
+        gas_price: gas价格（wei）
+        chain_id: 链ID
+        
+    Returns:
+        Dict: 待签名交易
+    """
+    if token_info['isNative']:
+        # 原生代币转账
+        return {
+            'nonce': nonce,
+            'to': to_address,
+            'value': w3.to_wei(amount, 'ether'),
+            'gas': NATIVE_TRANSFER_GAS,  # 标准转账gas
+            'gasPrice': gas_price,
+            'chainId': chain_id
+        }
+    # ERC20代币转账
+    contract = w3.eth.contract(address=Web3.to_checksum_address(token_info['contractAddress']), abi=ERC20_TRANSFER_ABI)
+    # 计算转账数量（考虑小数位）
+    token_amount = int(Decimal(str(amount)) * (10 ** token_info['decimals']))
+    return contract.functions.transfer(Web3.to_checksum_address(to_address), token_amount).build_transaction({
+        'nonce': nonce,
+        'gas': ERC20_TRANSFER_GAS,  # ERC20转账预估gas
+        'gasPrice': gas_price,
+        'chainId': chain_id
+    })
+
+def build_solana_transfer(from_pub: Pubkey, to_pub: Pubkey, token_info: Dict, amount: str,
+                          create_to_ata: bool = False) -> List:
+    """
+    构建Solana转账指令（SOL或SPL Token），不访问网络
+
+    Args:
+        from_pub: 发送方
+        to_pub: 接收方
+        token_info: 代币配置
+        amount: 转账数量
+        create_to_ata: 是否先创建接收方的关联代币账户（ATA）
+
+    Returns:
+        List: 指令列表
+    """
+    if token_info.get('isNative', False):
+        # SOL转账
+        lamports = int(Decimal(str(amount)) * 10**token_info['decimals'])
+        return [transfer(TransferParams(from_pubkey=from_pub, to_pubkey=to_pub, lamports=lamports))]
+    # SPL Token转账（如USDT、USDC）
+    mint = Pubkey.from_string(token_info['contractAddress'])
+    decimals = token_info['decimals']
+    instructions = []
+    if create_to_ata:
+        instructions.append(create_associated_token_account(from_pub, to_pub, mint))
+    token_amount = int(Decimal(str(amount)) * 10**decimals)
+    instructions.append(transfer_checked(
+        TransferCheckedParams(
+            program_id=TOKEN_PROGRAM_ID,
+            source=get_associated_token_address(from_pub, mint),
+            mint=mint,
+            dest=get_associated_token_address(to_pub, mint),
+            owner=from_pub,
+            amount=token_amount,
+            decimals=decimals
+        )
+    ))
+    return instructions
+
+# 发送返回这些错误说明节点已经有这笔交易
+_ALREADY_KNOWN_ERRORS = ("already known", "known transaction", "already imported", "already been processed")
+# Solana blockhash 在其所在区块之后的这么多个区块内有效
+SOLANA_BLOCKHASH_VALID_BLOCKS = 150
+
+
+def is_definite_rejection(error: BaseException) -> bool:
+    """
+    发送交易的异常是否说明节点明确拒绝了交易（没有进入内存池）
+
+    连接中断、超时等网络异常时无法确定节点是否已收到交易；already known 说明节点已有这笔交易。
+    """
+    if isinstance(error, requests.exceptions.RequestException) or is_transient_error(error):
+        return False
+    if type(error).__module__.split('.')[0] in ('aiohttp', 'httpx'):
+        return False
+    message = str(error).lower()
+    return not any(s in message for s in _ALREADY_KNOWN_ERRORS)
+
+
 def log_info(msg):
     logger.info(msg)
 
@@ -44,9 +223,22 @@ def log_error(msg):
 class WalletUtil:
     """Web3钱包工具类"""
     
-    def __init__(self):
-        """初始化钱包工具类"""
+    def __init__(self, journal: Optional[TxJournal] = None, nonce_manager: Optional[NonceManager] = None,
+                 screener: Optional[AddressScreen] = None, solana_priority: str = DEFAULT_PRIORITY):
+        """
+        初始化钱包工具类
+        
+        Args:
+            journal: 转账日志，传入后转账的每次状态流转都会被记录，可用于断点续跑
+            nonce_manager: EVM nonce管理器，传入后同一地址的并发转账原子分配nonce，卡单时自动提价重发
+            screener: 收款地址风险筛查索引，传入后命中拒绝名单的地址不转账，命中警告名单的地址记录警告
+            solana_priority: Solana转账默认的优先费档位 economy / fast / urgent
+        """
         self.mnemo = Mnemonic("english")
+        self.journal = journal
+        self.nonce_manager = nonce_manager
+        self.screener = screener
+        self.solana_priority = solana_priority
         # 启用本地生成私钥（不推荐用于生产环境）
         Account.enable_unaudited_hdwallet_features()
     
@@ -102,18 +294,51 @@ class WalletUtil:
             evm_address = account.address
             log_info(f"生成钱包(回退方法) | 助记词: {mnemonic} | EVM地址: {evm_address}")
             return {"mnemonic": mnemonic, "evm_address": evm_address}
+
+    def generate_wallets(self, count: int, store: Optional[WalletStore] = None) -> WalletStore:
+        """
+        批量生成钱包，写入列式存储（每个钱包72字节，不逐个记录日志）
+
+        Args:
+            count: 生成数量
+            store: 追加到已有存储，缺省时新建
+
+        Returns:
+            WalletStore: 钱包存储，可 save 到文件或 export_csv 导出
+        """
+        log_info(f"开始批量生成钱包: {count}个")
+        start = time.perf_counter()
+        store = generate_wallets(count, store)
+        log_info(f"完成批量生成钱包: {count}个, 耗时{time.perf_counter() - start:.2f}秒, 存储共{len(store)}个")
+        return store
     
     def _load_chain_config(self) -> Dict:
-        """加载链配置"""
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'chain.json')
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """加载链配置（进程内共享解析结果，文件修改后重新解析）"""
+        return load_json_config(os.path.join(os.path.dirname(__file__), '..', 'config', 'chain.json'))
     
     def _load_contract_config(self) -> Dict:
-        """加载合约配置"""
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'contract.json')
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """加载合约配置（进程内共享解析结果，文件修改后重新解析）"""
+        return load_json_config(os.path.join(os.path.dirname(__file__), '..', 'config', 'contract.json'))
+    
+    def _get_chain_info(self, chain_name: str) -> Dict:
+        """
+        获取链配置
+        
+        Args:
+            chain_name: 链名称
+            
+        Returns:
+            Dict: 链配置
+            
+        Raises:
+            ValueError: 如果链配置不存在
+        """
+        chain_config = self._load_chain_config()
+        for chain_type in ['evm_chains', 'solana_chains', 'testnet_chains']:
+            for chain in chain_config.get(chain_type, []):
+                if chain['chainName'] == chain_name:
+                    return chain
+        raise ValueError(f"链 '{chain_name}' 在配置文件中不存在")
     
     def _validate_chain_and_token(self, chain_name: str, coin_name: str) -> Tuple[Dict, Dict]:
         """
@@ -129,22 +354,9 @@ class WalletUtil:
         Raises:
             ValueError: 如果链或代币配置不存在
         """
-        chain_config = self._load_chain_config()
+        chain_info = self._get_chain_info(chain_name)
         contract_config = self._load_contract_config()
         
-        # 查找链配置
-        chain_info = None
-        for chain_type in ['evm_chains', 'solana_chains', 'testnet_chains']:
-            for chain in chain_config.get(chain_type, []):
-                if chain['chainName'] == chain_name:
-                    chain_info = chain
-                    break
-            if chain_info:
-                break
-        
-        if not chain_info:
-            raise ValueError(f"链 '{chain_name}' 在配置文件中不存在")
-        
         # 查找代币配置
         token_info = None
         for token in contract_config.get('tokens', []):
@@ -169,37 +381,52 @@ class WalletUtil:
             bool: 地址是否有效
         """
         if chain_name == "Solana Mainnet":
-            # Solana地址验证
-            try:
-                if len(address) != 44:
-                    return False
-                base58.b58decode(address)
-                return True
-            except:
-                return False
-        else:
-            # EVM地址验证
-            try:
-                if not address.startswith('0x') or len(address) != 42:
-                    return False
-                int(address, 16)
-                return True
-            except:
-                return False
+            # Solana地址验证：base58解码后必须是32字节（43或44个字符都可能）
+            return is_valid_solana_address(address)
+        # EVM地址验证：大小写混合时校验 EIP-55 校验和
+        return is_valid_evm_address(address)
     
-    def transfer_token(self, private_key: str, to_address: str, chain_name: str, coin_name: str, amount: str) -> Dict:
+    def transfer_token(self, private_key: str, to_address: str, chain_name: str, coin_name: str, amount: str,
+                       job_id: Optional[str] = None, item_id: Optional[str] = None,
+                       priority: Optional[str] = None, simulate: bool = False) -> Dict:
+        journal_key = (job_id, str(item_id)) if self.journal is not None and job_id is not None else None
         try:
             log_info(f"开始{chain_name}转账——请求参数:{{'private_key': '***', 'to_address': '{to_address}', 'chain_name': '{chain_name}', 'coin_name': '{coin_name}', 'amount': '{amount}'}}")
+            # 已完成的条目直接返回日志中的结果，不再查询链上状态
+            entry = self._journal_entry(journal_key)
+            if entry and entry['state'] in FINAL_STATES:
+                result = entry_to_result(entry)
+                log_info(f"转账已在日志中完成，跳过——响应结果:{json.dumps(result, ensure_ascii=False)}")
+                return result
+            # 收款地址风险筛查（拒绝时不写入转账日志，名单更新后重新运行任务会再次筛查）
+            hit = self.screener.check(to_address) if self.screener is not None else None
+            if hit is not None:
+                if hit['level'] == LEVEL_BLOCK:
+                    error_result = {"success": False, "error": describe_hit(hit), "tx_hash": None}
+                    log_error(f"{chain_name}转账被拒绝——{json.dumps(error_result, ensure_ascii=False)}")
+                    return error_result
+                log_error(f"{chain_name}转账警告——{describe_hit(hit)}")
+            if simulate:
+                # 只模拟不广播，返回预计gas（Solana为计算单元）、手续费和失败原因；preflight 依赖本模块，在此处导入
+                from .preflight import simulate_items
+                row = simulate_items([{'item_id': item_id, 'to_address': to_address, 'chain_name': chain_name,
+                                       'coin_name': coin_name, 'amount': amount, 'priority': priority}],
+                                     private_key, self)[0]
+                result = {"success": row['ok'], "simulated": True, "tx_hash": None, "gas": row['gas'],
+                          "fee": row['fee'], "fee_coin": row['fee_coin'], "error": row['error']}
+                log_info(f"完成{chain_name}模拟转账——响应结果:{json.dumps(result, ensure_ascii=False)}")
+                return result
             if chain_name == "Solana Mainnet":
-                token_info = self._get_token_info(chain_name, coin_name)
+                chain_info, token_info = self._validate_chain_and_token(chain_name, coin_name)
                 log_info(f"开始solana钱包转账——请求参数:{{'private_key': '***', 'to_address': '{to_address}', 'token_info': {token_info}, 'amount': '{amount}'}}")
-                result = self._transfer_solana(private_key, to_address, token_info, amount)
+                result = self._transfer_solana(private_key, to_address, token_info, amount, journal_key=journal_key,
+                                               rpc_url=chain_info['rpc'], priority=priority or self.solana_priority)
                 log_info(f"完成solana钱包转账——响应结果:{json.dumps(result, ensure_ascii=False)}")
                 return result
             else:
                 chain_info, token_info = self._validate_chain_and_token(chain_name, coin_name)
                 log_info(f"开始evm钱包转账——请求参数:{{'private_key': '***', 'to_address': '{to_address}', 'chain_info': {chain_info}, 'token_info': {token_info}, 'amount': '{amount}', 'coin_name': '{coin_name}'}}")
-                result = self._transfer_evm(private_key, to_address, chain_info, token_info, amount, coin_name)
+                result = self._transfer_evm(private_key, to_address, chain_info, token_info, amount, coin_name, journal_key=journal_key)
                 # 处理tx_hash为HexBytes的情况
                 if result.get('tx_hash') is not None:
                     result['tx_hash'] = str(result['tx_hash'])
@@ -210,22 +437,42 @@ class WalletUtil:
             log_error(f"{chain_name}钱包转账异常——{json.dumps(error_result, ensure_ascii=False)}")
             return error_result
     
+    def _journal_entry(self, journal_key: Optional[Tuple[str, str]]) -> Optional[Dict]:
+        """读取转账日志中的条目，未启用日志时返回None"""
+        if journal_key is None:
+            return None
+        return self.journal.get(*journal_key)
+    
+    def _journal_record(self, journal_key: Optional[Tuple[str, str]], state: str, durable: bool = False, **fields) -> None:
+        """记录转账状态流转，未启用日志时忽略"""
+        if journal_key is None:
+            return
+        self.journal.record(journal_key[0], journal_key[1], state, durable=durable, **fields)
+    
+    def _journal_discard_signed(self, journal_key: Optional[Tuple[str, str]], error: Exception) -> None:
+        """已签名的交易被节点明确拒绝时记为失败并清除签名结果，未启用日志时忽略"""
+        if journal_key is None:
+            return
+        self.journal.discard_signed(journal_key[0], journal_key[1], f"交易被节点拒绝: {error}")
+    
     def _transfer_evm(self, 
                      private_key: str, 
                      to_address: str, 
                      chain_info: Dict, 
                      token_info: Dict, 
                      amount: str,
-                     coin_name: str) -> Dict:
+                     coin_name: str,
+                     journal_key: Optional[Tuple[str, str]] = None) -> Dict:
         """
         EVM链转账
         
         Args:
-            private_key: 私钥
+            private_key: 私钥，也可以是 LocalAccount / VaultKey
             to_address: 接收地址
             chain_info: 链配置
             token_info: 代币配置
             amount: 转账数量
+            journal_key: 转账日志键 (job_id, item_id)，已签名未完成的条目会重播原交易而不是重新签名
             
         Returns:
             Dict: 转账结果
@@ -241,115 +488,191 @@ class WalletUtil:
         log_info(f"开始evm钱包转账——请求参数:{json.dumps(params, ensure_ascii=False)}")
         try:
             # 连接到Web3
-            w3 = Web3(Web3.HTTPProvider(chain_info['rpc']))
+            w3 = make_web3(chain_info)
             if not w3.is_connected():
                 raise Exception(f"无法连接到 {chain_info['chainName']} RPC节点")
             
-            # 创建账户
-            account = Account.from_key(private_key)
+            # 创建账户（密钥库中的签名对象直接复用）
+            account = resolve_signer(private_key, chain_info['chainName'])
             from_address = account.address
+            journal_fields = {'chain_name': chain_info['chainName'], 'coin_name': coin_name,
+                              'from_address': from_address, 'to_address': to_address, 'amount': amount}
+            
+            # 断点续跑：已签名的交易直接重播，避免同一笔转账被重复签名发送
+            entry = self._journal_entry(journal_key)
+            if entry and entry.get('raw_tx'):
+                log_info(f"从转账日志恢复已签名交易: {entry['tx_hash']}")
+                try:
+                    w3.eth.send_raw_transaction(entry['raw_tx'])
+                except Exception as e:
+                    # already known / nonce too low 说明原交易已在内存池或已上链
+                    log_info(f"重播已签名交易返回: {e}")
+                tx_hash = Web3.to_bytes(hexstr=entry['tx_hash'])
+                tracked = self.nonce_manager.find(chain_info['chainName'], entry['tx_hash']) if self.nonce_manager else None
+                return self._wait_evm_receipt(w3, tx_hash, journal_key, journal_fields, account,
+                                              tracked['nonce'] if tracked else None)
             
             # 验证发送方地址格式
             if not self._validate_address(from_address, chain_info['chainName']):
                 raise ValueError(f"发送方地址格式无效: {from_address}")
             
-            # 获取nonce
-            nonce = w3.eth.get_transaction_count(from_address)
-            
-            # 获取gas价格
-            gas_price = w3.eth.gas_price
-            
-            if token_info['isNative']:
-                # 原生代币转账
-                value = w3.to_wei(amount, 'ether')
-                
-                # 构建交易
-                transaction = {
-                    'nonce': nonce,
-                    'to': to_address,
-                    'value': value,
-                    'gas': 21000,  # 标准转账gas
-                    'gasPrice': gas_price,
-                    'chainId': int(chain_info['chain_id'])
-                }
-                
+            # 获取nonce（有nonce管理器时原子分配，并发转账不会重复使用同一nonce）
+            if self.nonce_manager is not None:
+                job_id, item_id = journal_key or (None, None)
+                nonce = self.nonce_manager.allocate(chain_info['chainName'], from_address, w3, job_id, item_id)
             else:
-                # ERC20代币转账
-                contract_address = token_info['contractAddress']
-                decimals = token_info['decimals']
+                nonce = w3.eth.get_transaction_count(from_address)
+            
+            signed = False
+            try:
+                # 获取gas价格
+                gas_price = w3.eth.gas_price
                 
-                # ERC20转账ABI
-                abi = [
-                    {
-                        "constant": False,
-                        "inputs": [
-                            {"name": "_to", "type": "address"},
-                            {"name": "_value", "type": "uint256"}
-                        ],
-                        "name": "transfer",
-                        "outputs": [{"name": "", "type": "bool"}],
-                        "type": "function"
-                    }
-                ]
+                transaction = build_evm_transfer(w3, to_address, token_info, amount, nonce, gas_price, int(chain_info['chain_id']))
                 
-                # 创建合约实例
-                contract = w3.eth.contract(address=contract_address, abi=abi)
+                # 签名交易
+                signed_txn = account.sign_transaction(transaction)
                 
-                # 计算转账数量（考虑小数位）
-                token_amount = int(float(amount) * (10 ** decimals))
+                # 广播前先落盘签名结果，崩溃重启后可重播同一笔交易
+                self._journal_record(journal_key, STATE_SIGNED, durable=True, raw_tx=Web3.to_hex(signed_txn.raw_transaction),
+                                     tx_hash=Web3.to_hex(signed_txn.hash), **journal_fields)
+                signed = True
+                if self.nonce_manager is not None:
+                    self.nonce_manager.track(chain_info['chainName'], from_address, nonce, Web3.to_hex(signed_txn.hash), transaction)
                 
-                # 构建交易
-                transaction = contract.functions.transfer(to_address, token_amount).build_transaction({
-                    'nonce': nonce,
-                    'gas': 100000,  # ERC20转账预估gas
-                    'gasPrice': gas_price,
-                    'chainId': int(chain_info['chain_id'])
-                })
-            
-            # 签名交易
-            signed_txn = w3.eth.account.sign_transaction(transaction, private_key)
-            
-            # 发送交易
-            tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            
-            # 等待交易确认
-            tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+                # 发送交易
+                tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            except Exception as e:
+                self._release_nonce(w3, chain_info['chainName'], from_address, nonce, e)
+                # 节点明确拒绝时nonce已归还，不能保留这笔交易；网络异常时节点可能已收到，保留以便续跑时重播
+                if signed and is_definite_rejection(e):
+                    self._journal_discard_signed(journal_key, e)
+                raise
+            self._journal_record(journal_key, STATE_BROADCAST)
             
-            if tx_receipt["status"] == 1:
-                result = {
-                    "success": True,
-                    "tx_hash": tx_hash.hex(),
-                    "from_address": from_address,
-                    "to_address": to_address,
-                    "amount": amount,
-                    "chain_name": chain_info['chainName'],
-                    "coin_name": coin_name,
-                    "block_number": tx_receipt["blockNumber"]
-                }
-                log_info(f"完成evm钱包转账——响应结果:{json.dumps(result, ensure_ascii=False)}")
-                return result
-            else:
-                error_json = {"success": False, "error": "交易执行失败", "tx_hash": tx_hash.hex()}
-                log_error(f"evm钱包转账失败——{json.dumps(error_json, ensure_ascii=False)}")
-                return error_json
+            return self._wait_evm_receipt(w3, tx_hash, journal_key, journal_fields, account, nonce)
                 
         except Exception as e:
             error_json = {"success": False, "error": f"EVM转账失败: {str(e)}", "tx_hash": None}
             log_error(f"evm钱包转账异常——{json.dumps(error_json, ensure_ascii=False)}")
             return error_json
     
+    def _release_nonce(self, w3: Web3, chain_name: str, from_address: str, nonce: int, error: Exception) -> None:
+        """
+        广播前失败或被节点拒绝时归还nonce；网络异常时无法确定节点是否已收到交易，保留nonce等待下次对齐
+        """
+        if self.nonce_manager is None or not is_definite_rejection(error):
+            return
+        if "nonce too low" in str(error).lower():
+            # nonce已被其它交易使用，立即与链上对齐
+            self.nonce_manager.resync(chain_name, from_address, w3)
+        else:
+            self.nonce_manager.release(chain_name, from_address, nonce)
+    
+    def _wait_evm_receipt(self, w3: Web3, tx_hash: bytes, journal_key: Optional[Tuple[str, str]], journal_fields: Dict,
+                          account=None, nonce: Optional[int] = None) -> Dict:
+        """
+        等待EVM交易确认并记录终态
+        
+        Args:
+            w3: Web3实例
+            tx_hash: 交易哈希
+            journal_key: 转账日志键
+            journal_fields: 日志中记录的转账信息
+            account: 发送方账户，与nonce一起传入且有nonce管理器时，超时未确认会提价重发
+            nonce: 交易nonce
+            
+        Returns:
+            Dict: 转账结果
+        """
+        chain_name = journal_fields['chain_name']
+        replaceable = self.nonce_manager is not None and account is not None and nonce is not None
+        hashes = [tx_hash]
+        if replaceable:
+            tracked = self.nonce_manager.find(chain_name, Web3.to_hex(tx_hash))
+            if tracked:
+                hashes = [Web3.to_bytes(hexstr=h) for h in tracked['hashes']]
+        # 等待交易确认（原交易和替换交易任一上链即可）
+        for attempt in range(MAX_FEE_BUMPS + 1 if replaceable else 1):
+            try:
+                tx_hash, tx_receipt = self._wait_any_receipt(w3, hashes, EVM_RECEIPT_TIMEOUT)
+                break
+            except TimeExhausted:
+                if not replaceable or attempt == MAX_FEE_BUMPS:
+                    raise
+                self._bump_stuck_tx(w3, chain_name, account, nonce, hashes, journal_key)
+        if replaceable:
+            self.nonce_manager.settle(chain_name, account.address, nonce)
+        
+        if tx_receipt["status"] == 1:
+            result = {
+                "success": True,
+                "tx_hash": Web3.to_hex(tx_hash),
+                "from_address": journal_fields['from_address'],
+                "to_address": journal_fields['to_address'],
+                "amount": journal_fields['amount'],
+                "chain_name": journal_fields['chain_name'],
+                "coin_name": journal_fields['coin_name'],
+                "block_number": tx_receipt["blockNumber"]
+            }
+            self._journal_record(journal_key, STATE_CONFIRMED, block_number=tx_receipt["blockNumber"])
+            log_info(f"完成evm钱包转账——响应结果:{json.dumps(result, ensure_ascii=False)}")
+            return result
+        else:
+            error_json = {"success": False, "error": "交易执行失败", "tx_hash": Web3.to_hex(tx_hash)}
+            self._journal_record(journal_key, STATE_FAILED, block_number=tx_receipt["blockNumber"], error="交易执行失败")
+            log_error(f"evm钱包转账失败——{json.dumps(error_json, ensure_ascii=False)}")
+            return error_json
+    
+    def _wait_any_receipt(self, w3: Web3, hashes: List[bytes], timeout: float) -> Tuple[bytes, Dict]:
+        """等待任一交易哈希的回执，返回 (上链的哈希, 回执)"""
+        if len(hashes) == 1:
+            return hashes[0], w3.eth.wait_for_transaction_receipt(hashes[0], timeout=timeout)
+        deadline = time.time() + timeout
+        while True:
+            for tx_hash in hashes:
+                try:
+                    return tx_hash, w3.eth.get_transaction_receipt(tx_hash)
+                except TransactionNotFound:
+                    pass
+            if time.time() >= deadline:
+                raise TimeExhausted(f"交易 {[Web3.to_hex(h) for h in hashes]} 在 {timeout} 秒内未确认")
+            time.sleep(1)
+    
+    def _bump_stuck_tx(self, w3: Web3, chain_name: str, account, nonce: int, hashes: List[bytes],
+                       journal_key: Optional[Tuple[str, str]]) -> None:
+        """交易超时未确认且gas价格低于市价时，用同一nonce提价重发"""
+        try:
+            replacement = self.nonce_manager.replace(w3, chain_name, account, nonce)
+        except Exception as e:
+            log_error(f"提价重发失败 nonce={nonce}: {e}")
+            return
+        if replacement is None:
+            log_info(f"交易 nonce={nonce} 未确认，gas价格不低于市价，继续等待")
+            return
+        log_info(f"交易 nonce={nonce} 长时间未确认，提价至 {replacement['gas_price']} 重发: {replacement['tx_hash']}")
+        hashes.append(Web3.to_bytes(hexstr=replacement['tx_hash']))
+        self._journal_record(journal_key, STATE_BROADCAST, durable=True, tx_hash=replacement['tx_hash'],
+                             raw_tx=replacement['raw_tx'])
+    
     def _transfer_solana(self, 
                         private_key: str, 
                         to_address: str, 
                         token_info: Dict, 
-                        amount: str) -> Dict:
+                        amount: str,
+                        journal_key: Optional[Tuple[str, str]] = None,
+                        rpc_url: str = SOLANA_MAINNET_RPC,
+                        priority: str = DEFAULT_PRIORITY) -> Dict:
         """
         Solana链转账
         Args:
-            private_key: base58编码的私钥（或32字节原始）
+            private_key: base58编码的私钥（或32字节原始），也可以是 Keypair / VaultKey
             to_address: 接收地址
             token_info: 代币配置
             amount: 转账数量
+            journal_key: 转账日志键 (job_id, item_id)，已签名未完成的条目会先重播原交易
+            rpc_url: Solana RPC节点地址，默认取主网公共节点
+            priority: 优先费档位 economy / fast / urgent
         Returns:
             Dict: 转账结果
         """
@@ -361,107 +684,143 @@ class WalletUtil:
         }
         log_info(f"开始solana钱包转账——请求参数:{json.dumps(params, ensure_ascii=False)}")
         try:
-            # 1. 连接Solana主网
-            client = Client("https://api.mainnet-beta.solana.com")
+            # 1. 连接Solana节点
+            client = make_solana_client(rpc_url)
             # 2. 解析私钥
             try:
-                if private_key.startswith('['):
-                    # 兼容助记词导出的数组格式
-                    privkey_bytes = bytes(eval(private_key))
-                elif len(private_key) == 64:
-                    privkey_bytes = bytes.fromhex(private_key)
-                    keypair = Keypair.from_bytes(privkey_bytes)
-                else:
-                    # base58字符串
-                    keypair = Keypair.from_base58_string(private_key)
+                keypair = resolve_signer(private_key, SOLANA_CHAIN_NAME)
             except Exception as e:
                 return {"success": False, "error": f"私钥格式错误: {str(e)}", "tx_hash": None}
             from_pub = keypair.pubkey()
             to_pub = Pubkey.from_string(to_address)
-            # 3. 判断原生币还是SPL Token
-            if token_info.get('isNative', False):
-                # SOL转账
-                lamports = int(float(amount) * 10**token_info['decimals'])
-                txn = Transaction.new_signed_with_payer(
-                    [transfer(TransferParams(
-                        from_pubkey=from_pub,
-                        to_pubkey=to_pub,
-                        lamports=lamports
-                    ))],
-                    from_pub,
-                    [keypair],
-                    client.get_latest_blockhash().value.blockhash
-                )
+            result = {
+                "success": True,
+                "tx_hash": None,
+                "from_address": str(from_pub),
+                "to_address": str(to_pub),
+                "amount": amount,
+                "chain_name": "Solana Mainnet",
+                "coin_name": token_info['coinName']
+            }
+            journal_fields = {'chain_name': "Solana Mainnet", 'coin_name': token_info['coinName'],
+                              'from_address': str(from_pub), 'to_address': str(to_pub), 'amount': amount}
+            
+            # 断点续跑：已签名的交易先重播并查询签名状态，已上链则不再重新签名
+            entry = self._journal_entry(journal_key)
+            if entry and entry.get('raw_tx'):
+                resumed = self._resume_solana(client, rpc_url, entry, result, journal_key)
+                if resumed is not None:
+                    return resumed
+            
+            # 3. SPL Token检查接收方ATA是否存在（带缓存），不存在则在同一笔交易中创建
+            to_ata = None
+            creates_ata = False
+            if not token_info.get('isNative', False):
+                to_ata = get_associated_token_address(to_pub, Pubkey.from_string(token_info['contractAddress']))
+                creates_ata = not account_exists(client, SOLANA_CHAIN_NAME, to_ata)
+            instructions = build_solana_transfer(from_pub, to_pub, token_info, amount, creates_ata)
+            latest = client.get_latest_blockhash().value
+            blockhash = latest.blockhash
+            # 4. 按档位加上计算单元上限和优先费（优先费和模拟结果都有缓存）
+            limit, price = compute_budget(client, SOLANA_CHAIN_NAME, instructions, from_pub, blockhash, priority)
+            log_info(f"solana计算预算——档位:{priority} 计算单元上限:{limit} 优先费单价:{price}微lamports")
+            txn = Transaction.new_signed_with_payer(
+                with_compute_budget(instructions, limit, price),
+                from_pub,
+                [keypair],
+                blockhash
+            )
+            # 广播前先落盘签名结果
+            self._journal_record(journal_key, STATE_SIGNED, durable=True, raw_tx=bytes(txn).hex(),
+                                 tx_hash=str(txn.signatures[0]), **journal_fields)
+            resp = None
+            try:
                 resp = client.send_transaction(txn)
-                if hasattr(resp, 'value') and resp.value and not getattr(resp, 'error', None):
-                    tx_sig = resp.value
-                    result = {
-                        "success": True,
-                        "tx_hash": str(tx_sig),
-                        "from_address": str(from_pub),
-                        "to_address": str(to_pub),
-                        "amount": amount,
-                        "chain_name": "Solana Mainnet",
-                        "coin_name": token_info['coinName']
-                    }
-                    log_info(f"完成solana钱包转账——响应结果:{json.dumps(result, ensure_ascii=False)}")
-                    return result
-                else:
-                    error_json = {"success": False, "error": str(resp), "tx_hash": None}
-                    log_error(f"solana钱包转账失败——{json.dumps(error_json, ensure_ascii=False)}")
-                    return error_json
+            except Exception as e:
+                # 预检失败等节点明确拒绝的情况，这笔交易不会上链：清除签名结果，避免续跑时重播
+                if is_definite_rejection(e):
+                    self._journal_discard_signed(journal_key, e)
+                raise
+            finally:
+                # 本笔交易创建了接收方ATA，或发送失败、ATA状态不再可信时，下次转账重新查询
+                if to_ata is not None and (creates_ata or not getattr(resp, 'value', None)):
+                    forget_account(SOLANA_CHAIN_NAME, to_ata)
+            if hasattr(resp, 'value') and resp.value and not getattr(resp, 'error', None):
+                tx_sig = resp.value
+                result["tx_hash"] = str(tx_sig)
+                self._journal_record(journal_key, STATE_BROADCAST)
+                # 5. 等待上链，未确认时按间隔重新广播同一笔交易，直到blockhash过期
+                outcome = get_confirmer(rpc_url, SOLANA_CHAIN_NAME).confirm(txn, latest.last_valid_block_height)
+                return self._finish_solana(result, outcome, journal_key)
             else:
-                # SPL Token转账（如USDT、USDC）
-                mint = Pubkey.from_string(token_info['contractAddress'])
-                decimals = token_info['decimals']
-                # 获取发送方和接收方的ATA
-                from_ata = get_associated_token_address(from_pub, mint)
-                to_ata = get_associated_token_address(to_pub, mint)
-                # 检查接收方ATA是否存在，不存在则创建
-                resp_info = client.get_account_info(to_ata)
-                instructions = []
-                if resp_info.value is None:
-                    instructions.append(create_associated_token_account(from_pub, to_pub, mint))
-                token_amount = int(float(amount) * 10**decimals)
-                instructions.append(transfer_checked(
-                    TransferCheckedParams(
-                        program_id=TOKEN_PROGRAM_ID,
-                        source=from_ata,
-                        mint=mint,
-                        dest=to_ata,
-                        owner=from_pub,
-                        amount=token_amount,
-                        decimals=decimals
-                    )
-                ))
-                txn = Transaction.new_signed_with_payer(
-                    instructions,
-                    from_pub,
-                    [keypair],
-                    client.get_latest_blockhash().value.blockhash
-                )
-                resp = client.send_transaction(txn)
-                if hasattr(resp, 'value') and resp.value and not getattr(resp, 'error', None):
-                    tx_sig = resp.value
-                    result = {
-                        "success": True,
-                        "tx_hash": str(tx_sig),
-                        "from_address": str(from_pub),
-                        "to_address": str(to_pub),
-                        "amount": amount,
-                        "chain_name": "Solana Mainnet",
-                        "coin_name": token_info['coinName']
-                    }
-                    log_info(f"完成solana钱包转账——响应结果:{json.dumps(result, ensure_ascii=False)}")
-                    return result
-                else:
-                    error_json = {"success": False, "error": str(resp), "tx_hash": None}
-                    log_error(f"solana钱包转账失败——{json.dumps(error_json, ensure_ascii=False)}")
-                    return error_json
+                error_json = {"success": False, "error": str(resp), "tx_hash": None}
+                self._journal_discard_signed(journal_key, resp)
+                log_error(f"solana钱包转账失败——{json.dumps(error_json, ensure_ascii=False)}")
+                return error_json
         except Exception as e:
             error_json = {"success": False, "error": f"Solana转账失败: {str(e)}", "tx_hash": None}
             log_error(f"solana钱包转账异常——{json.dumps(error_json, ensure_ascii=False)}")
             return error_json
+    
+    def _finish_solana(self, result: Dict, outcome: Dict, journal_key: Optional[Tuple[str, str]]) -> Dict:
+        """
+        按确认结果记录终态
+
+        Args:
+            result: 广播成功时的转账结果
+            outcome: SolanaConfirmer.confirm 的返回值
+            journal_key: 转账日志键
+
+        Returns:
+            Dict: 转账结果，已上链时带 slot、confirm_seconds（从广播到确认的秒数）和 rebroadcasts（重新广播次数）
+        """
+        if outcome['outcome'] == OUTCOME_CONFIRMED:
+            result = {**result, "slot": outcome['slot'], "confirm_seconds": outcome['land_seconds'],
+                      "rebroadcasts": outcome['rebroadcasts']}
+            self._journal_record(journal_key, STATE_CONFIRMED, block_number=outcome['slot'])
+            log_info(f"完成solana钱包转账——响应结果:{json.dumps(result, ensure_ascii=False)}")
+            return result
+        # 执行失败，或blockhash已过期仍未上链（可以安全地重新签名）
+        error_json = {"success": False, "error": f"交易未成功: {outcome['error']}", "tx_hash": result['tx_hash']}
+        self._journal_record(journal_key, STATE_FAILED, block_number=outcome['slot'], error=outcome['error'])
+        log_error(f"solana钱包转账失败——{json.dumps(error_json, ensure_ascii=False)}")
+        return error_json
+
+    def _resume_solana(self, client: Client, rpc_url: str, entry: Dict, result: Dict,
+                       journal_key: Optional[Tuple[str, str]]) -> Optional[Dict]:
+        """
+        重播日志中已签名的Solana交易并等待确认
+        
+        Args:
+            client: Solana客户端
+            rpc_url: RPC节点（确认器按节点共享）
+            entry: 日志条目
+            result: 转账结果模板
+            journal_key: 转账日志键
+            
+        Returns:
+            Optional[Dict]: 原交易的转账结果（达到 confirmed/finalized 才算成功）；
+            blockhash已过期且未上链时返回None，此时可安全重新签名
+        """
+        log_info(f"从转账日志恢复已签名交易: {entry['tx_hash']}")
+        txn = Transaction.from_bytes(bytes.fromhex(entry['raw_tx']))
+        try:
+            client.send_raw_transaction(bytes(txn))
+        except Exception as e:
+            log_info(f"重播已签名交易返回: {e}")
+        status = client.get_signature_statuses([txn.signatures[0]], search_transaction_history=True).value[0]
+        if status is None:
+            valid = client._provider.make_request(IsBlockhashValid(txn.message.recent_blockhash), IsBlockhashValidResp)
+            if not valid.value:
+                return None
+        # 仍可能上链或已处理未确认：交给确认器轮询。原blockhash的最后有效高度未记录，取当前高度加有效区块数
+        # 作为上限，只会晚于实际过期时间判定过期，不会在交易仍可能上链时重新签名
+        self._journal_record(journal_key, STATE_BROADCAST)
+        height = client.get_block_height().value
+        outcome = get_confirmer(rpc_url, SOLANA_CHAIN_NAME).confirm(txn, height + SOLANA_BLOCKHASH_VALID_BLOCKS)
+        if outcome['outcome'] == OUTCOME_EXPIRED:
+            return None
+        return self._finish_solana({**result, "tx_hash": entry['tx_hash']}, outcome, journal_key)
 
     def _get_token_info(self, chain_name: str, coin_name: str) -> Dict:
         """
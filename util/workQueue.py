@@ -0,0 +1,472 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from .walletUtil import WalletUtil, resolve_signer, log_info, log_error
+from .recipientValidator import SOLANA_CHAIN_NAME
+from .keyVault import KIND_EVM, KIND_SOLANA
+from .txJournal import TxJournal
+from .batchRunner import BatchRunner
+
+DEFAULT_QUEUE_PATH = os.path.join("data", "work_queue.db")
+# 租约时长（秒）：工作进程每 1/3 租约时长续约一次，超过租约未续约的分片会被其它工作进程接手
+DEFAULT_LEASE_SECONDS = 60.0
+# 同一分片最多被领取的次数，超过后标记为失败（避免一个总让工作进程崩溃的分片无限重试）
+MAX_ATTEMPTS = 3
+# Solana没有nonce，同一发送方的条目可以拆成多个分片并行
+DEFAULT_SOLANA_SHARD_SIZE = 500
+
+SHARD_QUEUED = "queued"
+SHARD_LEASED = "leased"
+SHARD_DONE = "done"
+SHARD_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    shard_id TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    chain_name TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    lock_key TEXT,
+    key_label TEXT,
+    items TEXT NOT NULL,
+    item_count INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    succeeded INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_shards_state ON shards (state, created_at);
+CREATE INDEX IF NOT EXISTS idx_shards_lock ON shards (lock_key, state);
+CREATE INDEX IF NOT EXISTS idx_shards_job ON shards (job_id);
+CREATE TABLE IF NOT EXISTS shard_results (
+    shard_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    tx_hash TEXT,
+    error TEXT,
+    worker TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (shard_id, item_id)
+);
+"""
+
+# 可领取的分片：排队中，或租约已过期；EVM分片所属的发送方（链+地址）不能同时被其它工作进程持有，
+# 保证同一发送方的nonce始终只在一个工作进程中分配
+_LEASABLE_SQL = """
+SELECT shard_id, attempts FROM shards AS s
+WHERE (state = ? OR (state = ? AND lease_expires < ?))
+  AND (lock_key IS NULL OR NOT EXISTS (
+      SELECT 1 FROM shards AS o
+      WHERE o.lock_key = s.lock_key AND o.state = ? AND o.lease_expires >= ? AND o.shard_id != s.shard_id))
+ORDER BY created_at, shard_id
+LIMIT 1
+"""
+
+_SHARD_COLUMNS = ("shard_id", "job_id", "chain_name", "sender", "lock_key", "key_label", "items", "item_count",
+                  "state", "worker", "lease_expires", "attempts", "succeeded", "failed", "error",
+                  "created_at", "updated_at")
+
+
+def default_worker_id() -> str:
+    """主机名+进程号，多台机器、同一台机器的多个进程都不重复"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def shard_job(job: Dict, senders: Dict[str, str], solana_shard_size: int = DEFAULT_SOLANA_SHARD_SIZE) -> List[Dict]:
+    """
+    按发送方把批量任务拆成分片
+
+    EVM条目按 (链, 发送方地址) 分组，每组一个分片，同一发送方的nonce只在一个工作进程中分配；
+    Solana条目没有nonce，按 solana_shard_size 条拆成多个分片。任务上的 priority 写入每个条目。
+
+    Args:
+        job: load_job 加载的任务
+        senders: 发送方地址 {链类型(evm/solana): 地址}
+        solana_shard_size: Solana每个分片的条目数
+
+    Returns:
+        List[Dict]: 分片 {shard_id, job_id, chain_name, sender, lock_key, key_label, items}
+    """
+    groups: Dict[str, List[Dict]] = {}
+    for item in job.get('items', []):
+        if job.get('priority') and not item.get('priority'):
+            item = {**item, 'priority': job['priority']}
+        groups.setdefault(item['chain_name'], []).append(item)
+    shards = []
+    for chain_name, items in groups.items():
+        is_solana = chain_name == SOLANA_CHAIN_NAME
+        sender = senders.get(KIND_SOLANA if is_solana else KIND_EVM)
+        if not sender:
+            raise ValueError(f"任务 {job['job_id']} 缺少 {chain_name} 的发送方地址")
+        size = solana_shard_size if is_solana else len(items)
+        for number, start in enumerate(range(0, len(items), size)):
+            shards.append({
+                "shard_id": f"{job['job_id']}|{chain_name}|{sender}|{number}",
+                "job_id": job['job_id'],
+                "chain_name": chain_name,
+                "sender": sender,
+                "lock_key": None if is_solana else f"{chain_name}|{sender.lower()}",
+                "key_label": job.get('key_label'),
+                "items": items[start:start + size],
+            })
+    return shards
+
+
+def job_senders(job: Dict, private_key=None, labels: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, str]:
+    """
+    确定任务的发送方地址：任务引用了密钥库标签时取库中记录的地址（不需要解锁），否则由私钥推出
+
+    Args:
+        job: 批量任务
+        private_key: 发送方私钥（没有 key_label 时需要）
+        labels: KeyVault.labels() 的结果
+
+    Returns:
+        Dict[str, str]: {链类型: 地址}，只包含任务中用到的链类型
+    """
+    kinds = {KIND_SOLANA if item['chain_name'] == SOLANA_CHAIN_NAME else KIND_EVM for item in job.get('items', [])}
+    label = job.get('key_label')
+    if label:
+        recorded = (labels or {}).get(label)
+        if recorded is None:
+            raise ValueError(f"密钥库中没有标签: {label}")
+        return {kind: recorded[kind] for kind in kinds if kind in recorded}
+    if private_key is None:
+        raise ValueError(f"任务 {job['job_id']} 没有 key_label，需要私钥确定发送方地址")
+    return {kind: _signer_address(resolve_signer(private_key, SOLANA_CHAIN_NAME if kind == KIND_SOLANA else None))
+            for kind in kinds}
+
+
+def _signer_address(signer) -> str:
+    return str(signer.pubkey()) if hasattr(signer, 'pubkey') else signer.address
+
+
+class WorkQueue:
+    """
+    多机批量转账的共享分片队列（SQLite）
+
+    协调方提交分片，各机器上的工作进程领取分片（带租约）、定期续约、上报结果；
+    工作进程崩溃后租约过期，分片由其它工作进程接手，接手方从共享的转账日志续跑，不会重复发送。
+    数据库放在各机器都能访问的共享存储上；使用回滚日志而不是WAL（WAL不支持跨机器的网络文件系统），
+    各机器时钟需要同步（租约按时间戳判断过期）。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_QUEUE_PATH, max_attempts: int = MAX_ATTEMPTS):
+        """
+        打开分片队列
+
+        Args:
+            db_path: SQLite数据库文件路径
+            max_attempts: 同一分片最多被领取的次数
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.executescript(_SCHEMA)
+
+    def submit(self, shards: List[Dict]) -> int:
+        """
+        提交分片（shard_id 已存在的分片保持原状态，重复提交同一任务不会重复执行）
+
+        Returns:
+            int: 新加入的分片数
+        """
+        now = time.time()
+        with self._transaction():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO shards (shard_id, job_id, chain_name, sender, lock_key, key_label, items, "
+                "item_count, state, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(shard['shard_id'], shard['job_id'], shard['chain_name'], shard['sender'], shard['lock_key'],
+                  shard['key_label'], json.dumps(shard['items'], ensure_ascii=False), len(shard['items']),
+                  SHARD_QUEUED, now, now) for shard in shards])
+            return self._conn.total_changes - before
+
+    def lease(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict]:
+        """
+        领取一个分片
+
+        Args:
+            worker_id: 工作进程ID
+            lease_seconds: 租约时长
+
+        Returns:
+            Optional[Dict]: 分片（items 已解析），没有可领取的分片时返回None
+        """
+        with self._transaction():
+            while True:
+                now = time.time()
+                row = self._conn.execute(_LEASABLE_SQL, (SHARD_QUEUED, SHARD_LEASED, now, SHARD_LEASED, now)).fetchone()
+                if row is None:
+                    return None
+                shard_id, attempts = row
+                if attempts >= self.max_attempts:
+                    self._conn.execute("UPDATE shards SET state = ?, worker = NULL, error = ?, updated_at = ? "
+                                       "WHERE shard_id = ?",
+                                       (SHARD_FAILED, f"已被领取{attempts}次仍未完成，不再重试", now, shard_id))
+                    log_error(f"分片 {shard_id} 已被领取{attempts}次仍未完成，标记为失败")
+                    continue
+                self._conn.execute("UPDATE shards SET state = ?, worker = ?, lease_expires = ?, "
+                                   "attempts = attempts + 1, updated_at = ? WHERE shard_id = ?",
+                                   (SHARD_LEASED, worker_id, now + lease_seconds, now, shard_id))
+                return self._shard(shard_id)
+
+    def heartbeat(self, shard_id: str, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """
+        续约
+
+        Returns:
+            bool: 是否仍持有租约（租约已过期并被其它工作进程接手时返回False）
+        """
+        now = time.time()
+        with self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE shards SET lease_expires = ?, updated_at = ? WHERE shard_id = ? AND worker = ? AND state = ?",
+                (now + lease_seconds, now, shard_id, worker_id, SHARD_LEASED))
+            return cursor.rowcount == 1
+
+    def complete(self, shard_id: str, worker_id: str, results: List[Dict]) -> bool:
+        """
+        上报分片结果
+
+        Args:
+            shard_id: 分片ID
+            worker_id: 工作进程ID
+            results: 每个条目的结果 {item_id, success, tx_hash, error}
+
+        Returns:
+            bool: 是否被接受（租约已被其它工作进程接手时不接受，结果以接手方为准）
+        """
+        now = time.time()
+        succeeded = sum(1 for result in results if result.get('success'))
+        with self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE shards SET state = ?, succeeded = ?, failed = ?, error = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE shard_id = ? AND worker = ? AND state = ?",
+                (SHARD_DONE, succeeded, len(results) - succeeded, now, shard_id, worker_id, SHARD_LEASED))
+            if cursor.rowcount != 1:
+                return False
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO shard_results (shard_id, item_id, success, tx_hash, error, worker, "
+                "finished_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(shard_id, str(result['item_id']), int(bool(result.get('success'))), result.get('tx_hash'),
+                  result.get('error'), worker_id, now) for result in results])
+            return True
+
+    def release(self, shard_id: str, worker_id: str, error: str) -> None:
+        """工作进程执行分片出错时交还分片，由其它工作进程（或自己）重新领取"""
+        with self._transaction():
+            self._conn.execute("UPDATE shards SET state = ?, worker = NULL, lease_expires = NULL, error = ?, "
+                               "updated_at = ? WHERE shard_id = ? AND worker = ? AND state = ?",
+                               (SHARD_QUEUED, error, time.time(), shard_id, worker_id, SHARD_LEASED))
+
+    def unfinished(self) -> int:
+        """排队中和执行中的分片数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM shards WHERE state IN (?, ?)",
+                                      (SHARD_QUEUED, SHARD_LEASED)).fetchone()[0]
+
+    def status(self, job_id: Optional[str] = None) -> Dict:
+        """
+        分片和条目统计
+
+        Returns:
+            Dict: {'shards': {状态: 分片数}, 'items': 条目数, 'succeeded', 'failed', 'workers': {工作进程: 执行中分片数}}
+        """
+        where, params = ("WHERE job_id = ?", (job_id,)) if job_id else ("", ())
+        with self._lock:
+            rows = self._conn.execute(f"SELECT state, COUNT(*), SUM(item_count), SUM(succeeded), SUM(failed) "
+                                      f"FROM shards {where} GROUP BY state", params).fetchall()
+            workers = self._conn.execute(f"SELECT worker, COUNT(*) FROM shards {where} "
+                                         f"{'AND' if where else 'WHERE'} state = ? GROUP BY worker",
+                                         params + (SHARD_LEASED,)).fetchall()
+        return {
+            "shards": {state: count for state, count, _, _, _ in rows},
+            "items": sum(items or 0 for _, _, items, _, _ in rows),
+            "succeeded": sum(succeeded or 0 for _, _, _, succeeded, _ in rows),
+            "failed": sum(failed or 0 for _, _, _, _, failed in rows),
+            "workers": dict(workers),
+        }
+
+    def results(self, job_id: str) -> List[Dict]:
+        """任务中已上报的条目结果"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.item_id, r.success, r.tx_hash, r.error, r.worker FROM shard_results AS r "
+                "JOIN shards AS s ON s.shard_id = r.shard_id WHERE s.job_id = ? ORDER BY r.finished_at",
+                (job_id,)).fetchall()
+        return [{"item_id": item_id, "success": bool(success), "tx_hash": tx_hash, "error": error, "worker": worker}
+                for item_id, success, tx_hash, error, worker in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _shard(self, shard_id: str) -> Dict:
+        row = self._conn.execute(f"SELECT {', '.join(_SHARD_COLUMNS)} FROM shards WHERE shard_id = ?",
+                                 (shard_id,)).fetchone()
+        shard = dict(zip(_SHARD_COLUMNS, row))
+        shard['items'] = json.loads(shard['items'])
+        return shard
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._lock, self._conn)
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE 事务：领取分片的查询和更新之间不会被其它进程插入写入"""
+
+    def __init__(self, lock: threading.Lock, conn: sqlite3.Connection):
+        self._lock = lock
+        self._conn = conn
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self._lock.release()
+            raise
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        finally:
+            self._lock.release()
+
+
+class ShardWorker:
+    """
+    工作进程：循环领取分片，用 BatchRunner 执行，后台线程续约，完成后上报结果
+
+    续约失败（租约已被接手）时立即停止提交新条目，已经在发送的条目完成后退出该分片，不上报结果。
+    转账日志必须是各工作进程共享的同一个数据库，接手的工作进程据此跳过已完成的条目、重播已签名的交易。
+    """
+
+    def __init__(self, queue: WorkQueue, journal: TxJournal, key_for: Callable[[Dict], Any],
+                 wallet_util: Optional[WalletUtil] = None, worker_id: Optional[str] = None,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS, concurrency: int = 1, poll_interval: float = 2.0):
+        """
+        初始化工作进程
+
+        Args:
+            queue: 分片队列
+            journal: 共享的转账日志
+            key_for: 由分片取发送方私钥（或 VaultKey）的函数，分片中只有 key_label，不含私钥
+            wallet_util: 钱包工具实例，缺省时使用该日志新建；concurrency 大于1时需要带nonce管理器
+            worker_id: 工作进程ID，缺省为 主机名-进程号
+            lease_seconds: 租约时长
+            concurrency: 每个分片内同时进行的转账数
+            poll_interval: 没有可领取的分片时的等待间隔（秒）
+        """
+        self.queue = queue
+        self.journal = journal
+        self.key_for = key_for
+        self.wallet_util = wallet_util or WalletUtil(journal=journal)
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._runner: Optional[BatchRunner] = None
+
+    def stop(self) -> None:
+        """执行完当前分片中进行中的转账后退出"""
+        self._stop.set()
+        if self._runner is not None:
+            self._runner.stop()
+
+    def run(self, exit_when_idle: bool = True) -> Dict:
+        """
+        循环领取并执行分片
+
+        Args:
+            exit_when_idle: 队列中没有排队或执行中的分片时退出；为False时一直等待新的分片，直到 stop
+
+        Returns:
+            Dict: {'shards': 完成的分片数, 'succeeded': 成功条目数, 'failed': 未成功条目数}
+        """
+        summary = {"shards": 0, "succeeded": 0, "failed": 0}
+        log_info(f"工作进程 {self.worker_id} 开始领取分片: {self.queue.db_path}")
+        while not self._stop.is_set():
+            shard = self.queue.lease(self.worker_id, self.lease_seconds)
+            if shard is None:
+                # 其它工作进程持有的分片可能因租约过期被重新分配，全部结束后才退出
+                if exit_when_idle and self.queue.unfinished() == 0:
+                    break
+                self._stop.wait(self.poll_interval)
+                continue
+            results = self._run_shard(shard)
+            if results is not None:
+                summary["shards"] += 1
+                succeeded = sum(1 for result in results if result.get('success'))
+                summary["succeeded"] += succeeded
+                summary["failed"] += len(results) - succeeded
+        log_info(f"工作进程 {self.worker_id} 退出: 完成分片{summary['shards']}个, "
+                 f"成功{summary['succeeded']}笔, 未成功{summary['failed']}笔")
+        return summary
+
+    def _run_shard(self, shard: Dict) -> Optional[List[Dict]]:
+        """执行一个分片，返回上报的结果；出错或租约丢失时返回None"""
+        shard_id = shard['shard_id']
+        log_info(f"工作进程 {self.worker_id} 领取分片 {shard_id}（{shard['item_count']}笔，第{shard['attempts']}次）")
+        lost = threading.Event()
+        finished = threading.Event()
+        runner = self._runner = BatchRunner(self.journal, self.wallet_util, concurrency=self.concurrency)
+        if self._stop.is_set():
+            runner.stop()
+
+        def keep_alive():
+            while not finished.wait(self.lease_seconds / 3):
+                try:
+                    alive = self.queue.heartbeat(shard_id, self.worker_id, self.lease_seconds)
+                except Exception as e:
+                    # 暂时连不上共享存储时继续执行，租约到期前恢复即可
+                    log_error(f"分片 {shard_id} 续约失败: {e}")
+                    continue
+                if not alive:
+                    log_error(f"分片 {shard_id} 的租约已被其它工作进程接手，停止提交新条目")
+                    lost.set()
+                    runner.stop()
+                    return
+
+        heartbeat = threading.Thread(target=keep_alive, name=f"lease-{shard_id}", daemon=True)
+        heartbeat.start()
+        try:
+            private_key = self.key_for(shard)
+            signer = _signer_address(resolve_signer(private_key, shard['chain_name']))
+            if signer.lower() != shard['sender'].lower():
+                raise ValueError(f"私钥对应的地址 {signer} 与分片发送方 {shard['sender']} 不一致")
+            results = runner.run(shard['job_id'], shard['items'], private_key)
+        except Exception as e:
+            log_error(f"分片 {shard_id} 执行失败，交还队列: {e}")
+            self.queue.release(shard_id, self.worker_id, str(e))
+            return None
+        finally:
+            finished.set()
+            heartbeat.join()
+            self._runner = None
+        if lost.is_set() or any(result.get('stopped') for result in results):
+            if not lost.is_set():
+                self.queue.release(shard_id, self.worker_id, "工作进程已停止")
+            return None
+        reported = [{"item_id": item['item_id'], **result} for item, result in zip(shard['items'], results)]
+        if not self.queue.complete(shard_id, self.worker_id, reported):
+            log_error(f"分片 {shard_id} 的租约已被其它工作进程接手，本次结果不上报")
+            return None
+        return reported
@@ -0,0 +1,617 @@
+import sys
+import os
+import json
+import time
+import argparse
+import getpass
+from util.txJournal import TxJournal, DEFAULT_JOURNAL_PATH, STATE_BROADCAST
+from util.batchRunner import BatchRunner, load_job
+from util.asyncEngine import AsyncEngineHost, AsyncTransferEngine
+from util.preflight import preflight_check, simulate_items, PreflightError
+from util.offlineSigner import build_plan, fetch_plan_params, sign_plan, broadcast_signed
+from util.walletUtil import WalletUtil, parse_solana_keypair
+from util.walletStore import WalletStore
+from util.addressScreen import AddressScreen, DEFAULT_SCREEN_DB_PATH, LEVEL_BLOCK, LEVEL_WARN, describe_hit
+from util.keyVault import KeyVault, VaultKey, DEFAULT_VAULT_PATH, VAULT_PASSPHRASE_ENV, KIND_EVM, KIND_SOLANA
+from util.nonceManager import NonceManager, DEFAULT_NONCE_DB_PATH
+from util.depositWatcher import DepositWatcher, DEFAULT_DEPOSIT_DB_PATH, DEFAULT_CONFIRMATIONS
+from util.workQueue import WorkQueue, ShardWorker, shard_job, job_senders, DEFAULT_QUEUE_PATH, DEFAULT_LEASE_SECONDS, DEFAULT_SOLANA_SHARD_SIZE
+from util.rpcClient import make_web3
+from util.priorityFee import PRIORITY_PRESETS, DEFAULT_PRIORITY
+from eth_account import Account
+from util.recipientValidator import RecipientValidator
+from util.rpcMetrics import RPC_METRICS, start_metrics_server, start_metrics_file_writer
+from util.rpcCache import RPC_CACHE, DEFAULT_RPC_CACHE_PATH
+from util.taskProfiler import profiler_from_env, profiler_from_spec, summarize, list_profiles, DEFAULT_PROFILE_DIR
+
+
+def read_private_key(env_name):
+    """从环境变量读取私钥，未设置时交互输入，避免私钥出现在命令行或任务文件中"""
+    private_key = os.environ.get(env_name)
+    if not private_key:
+        private_key = getpass.getpass("请输入发送方私钥: ").strip()
+    return private_key
+
+
+def open_vault(path, create=False):
+    """解锁密钥库，口令从环境变量读取，未设置时交互输入"""
+    vault = KeyVault(path)
+    passphrase = os.environ.get(VAULT_PASSPHRASE_ENV) or getpass.getpass("请输入密钥库口令: ")
+    if create and not vault.exists:
+        if not os.environ.get(VAULT_PASSPHRASE_ENV) and getpass.getpass("请再次输入口令: ") != passphrase:
+            raise ValueError("两次输入的口令不一致")
+        vault.create(passphrase)
+    else:
+        vault.unlock(passphrase)
+    return vault
+
+
+def read_signing_key(args, job=None):
+    """
+    读取发送方私钥：指定了密钥库标签（--key-label 或任务文件中的 key_label）时返回 VaultKey，
+    否则按 --key-env 读取私钥
+    """
+    label = getattr(args, 'key_label', None) or (job or {}).get('key_label')
+    if label:
+        return VaultKey(open_vault(args.vault), label)
+    return read_private_key(args.key_env)
+
+
+def open_screener(args):
+    """风险筛查索引存在时打开，不存在时不筛查"""
+    return AddressScreen(args.screen_db) if os.path.exists(args.screen_db) else None
+
+
+def cmd_batch(args):
+    """执行（或续跑）批量转账任务"""
+    job = load_job(args.job)
+    journal = TxJournal(args.journal)
+    nonce_manager = NonceManager(args.nonce_db)
+    screener = open_screener(args)
+    engine = None
+    try:
+        profiler = profiler_from_spec(args.profile) if args.profile else profiler_from_env()
+        wallet_util = WalletUtil(journal=journal, nonce_manager=nonce_manager, screener=screener,
+                                 solana_priority=args.priority or job.get('priority') or DEFAULT_PRIORITY)
+        if args.engine == "async":
+            engine = AsyncEngineHost(AsyncTransferEngine(wallet_util))
+        runner = BatchRunner(journal, wallet_util, profiler=profiler, preflight=not args.skip_preflight,
+                             concurrency=args.concurrency, engine=engine, simulate=args.simulate,
+                             disperse=args.disperse)
+        private_key = read_signing_key(args, job)
+        try:
+            results = runner.run(job['job_id'], job.get('items', []), private_key)
+        except PreflightError as e:
+            print(json.dumps(e.report, ensure_ascii=False, indent=2))
+            return 2
+        for item, result in zip(job.get('items', []), results):
+            print(json.dumps({"item_id": item['item_id'], **result}, ensure_ascii=False))
+    finally:
+        if engine is not None:
+            engine.stop()
+        journal.close()
+        nonce_manager.close()
+        if screener is not None:
+            screener.close()
+    return 0 if all(r.get('success') for r in results) else 1
+
+
+def cmd_preflight(args):
+    """只做预检：汇总金额并检查余额和手续费，不发出交易"""
+    job = load_job(args.job)
+    report = preflight_check(job.get('items', []), read_signing_key(args, job))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report['ok'] else 2
+
+
+def cmd_simulate(args):
+    """逐条模拟（dry-run）：预测gas/计算单元、手续费和失败原因，不签名、不发出交易"""
+    job = load_job(args.job)
+    wallet_util = WalletUtil(solana_priority=args.priority or job.get('priority') or DEFAULT_PRIORITY)
+    rows = simulate_items(job.get('items', []), read_signing_key(args, job), wallet_util)
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False))
+    failed = sum(1 for row in rows if not row['ok'])
+    print(f"共{len(rows)}笔，模拟失败{failed}笔", file=sys.stderr)
+    return 0 if failed == 0 else 2
+
+
+def cmd_nonces(args):
+    """查看/对齐nonce记录，提价重发卡住的交易"""
+    nonce_manager = NonceManager(args.nonce_db)
+    try:
+        chain_info = WalletUtil()._get_chain_info(args.chain)
+        w3 = make_web3(chain_info)
+        account = Account.from_key(read_private_key(args.key_env)) if args.replace_stuck else None
+        address = account.address if account is not None else args.address
+        if args.resync:
+            if not address:
+                print("对齐nonce需要 --address")
+                return 1
+            print(f"{address} 下一个nonce: {nonce_manager.resync(args.chain, address, w3)}")
+        if account is not None:
+            journal = TxJournal(args.journal)
+            try:
+                for replacement in nonce_manager.replace_stuck(w3, args.chain, account, min_age=args.min_age):
+                    if replacement['job_id'] is not None:
+                        journal.record(replacement['job_id'], replacement['item_id'], STATE_BROADCAST, durable=True,
+                                       tx_hash=replacement['tx_hash'], raw_tx=replacement['raw_tx'])
+                    print(json.dumps({k: replacement[k] for k in ('nonce', 'tx_hash', 'gas_price', 'job_id', 'item_id')},
+                                     ensure_ascii=False))
+            finally:
+                journal.close()
+        for tx in nonce_manager.pending(args.chain, address):
+            print(json.dumps({k: tx[k] for k in ('address', 'nonce', 'tx_hash', 'gas_price', 'job_id', 'item_id')},
+                             ensure_ascii=False))
+    finally:
+        nonce_manager.close()
+    return 0
+
+
+def cmd_status(args):
+    """查看批量任务在转账日志中的状态"""
+    journal = TxJournal(args.journal)
+    try:
+        entries = journal.job_entries(args.job_id)
+    finally:
+        journal.close()
+    counts = {}
+    for entry in entries.values():
+        counts[entry['state']] = counts.get(entry['state'], 0) + 1
+    print(json.dumps({"job_id": args.job_id, "total": len(entries), "states": counts}, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_queue(args):
+    """多机模式的协调方：把批量任务按发送方拆成分片提交到共享队列 / 查看进度"""
+    queue = WorkQueue(args.queue)
+    try:
+        if args.action == "submit":
+            private_key = None
+            for path in args.jobs:
+                job = load_job(path)
+                if args.key_label:
+                    job['key_label'] = args.key_label
+                if job.get('key_label'):
+                    senders = job_senders(job, labels=KeyVault(args.vault).labels())
+                else:
+                    private_key = private_key or read_private_key(args.key_env)
+                    senders = job_senders(job, private_key)
+                shards = shard_job(job, senders, args.solana_shard_size)
+                print(f"{path}: 任务 {job['job_id']} 拆成 {len(shards)} 个分片，新提交 {queue.submit(shards)} 个")
+            return 0
+        if args.action == "results":
+            if not args.job_id:
+                raise ValueError("results 需要指定任务ID")
+            for row in queue.results(args.job_id):
+                print(json.dumps(row, ensure_ascii=False))
+            return 0
+        print(json.dumps(queue.status(args.job_id), ensure_ascii=False, indent=2))
+        return 0
+    finally:
+        queue.close()
+
+
+def cmd_worker(args):
+    """多机模式的工作进程：从共享队列领取分片执行，转账日志使用共享存储上的同一个数据库"""
+    queue = WorkQueue(args.queue)
+    journal = TxJournal(args.journal, shared=True)
+    nonce_manager = NonceManager(args.nonce_db)
+    screener = open_screener(args)
+    vault = None
+    keys = {}
+
+    def key_for(shard):
+        # 分片中不含私钥：按 key_label 从本机密钥库取（只解锁一次），没有标签时读环境变量
+        nonlocal vault
+        label = args.key_label or shard['key_label']
+        if label not in keys:
+            if label:
+                vault = vault or open_vault(args.vault)
+                keys[label] = VaultKey(vault, label)
+            else:
+                keys[label] = read_private_key(args.key_env)
+        return keys[label]
+
+    try:
+        wallet_util = WalletUtil(journal=journal, nonce_manager=nonce_manager, screener=screener)
+        worker = ShardWorker(queue, journal, key_for, wallet_util, worker_id=args.worker_id,
+                             lease_seconds=args.lease, concurrency=args.concurrency)
+        summary = worker.run(exit_when_idle=not args.forever)
+        print(json.dumps({"worker_id": worker.worker_id, **summary}, ensure_ascii=False))
+    finally:
+        journal.close()
+        nonce_manager.close()
+        queue.close()
+        if screener is not None:
+            screener.close()
+    return 0 if summary['failed'] == 0 else 1
+
+
+def cmd_profile(args):
+    """汇总性能分析结果"""
+    paths = args.paths or list_profiles(args.dir, last=args.last)
+    if not paths:
+        print(f"没有找到性能分析文件: {args.dir}")
+        return 1
+    print(summarize(paths, args.top))
+    return 0
+
+
+def cmd_plan(args):
+    """生成离线签名计划（在线查询nonce和gas价格，也可手动指定以完全离线）"""
+    job = load_job(args.job)
+    wallet_util = WalletUtil(screener=open_screener(args))
+    nonce, gas_price = args.nonce, args.gas_price
+    if nonce is None or gas_price is None:
+        chain_info = wallet_util._get_chain_info(job['items'][0]['chain_name'])
+        params = fetch_plan_params(chain_info, args.sender)
+        nonce = params['nonce'] if nonce is None else nonce
+        gas_price = params['gas_price'] if gas_price is None else gas_price
+    plan = build_plan(job, args.sender, nonce, gas_price, wallet_util)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=2, ensure_ascii=False)
+    print(f"签名计划已生成: {args.out}，共{len(plan['transactions'])}笔，nonce从{nonce}开始，gasPrice={gas_price}")
+    return 0
+
+
+def cmd_sign(args):
+    """离线批量签名"""
+    with open(args.plan, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+    private_key = read_signing_key(args)
+    if isinstance(private_key, VaultKey):
+        # 签名进程之间只能传递私钥本身
+        private_key = private_key.signer(KIND_EVM).key.hex()
+    count = sign_plan(plan, [private_key], args.out, workers=args.workers)
+    print(f"已签名{count}笔: {args.out}")
+    return 0
+
+
+def cmd_broadcast(args):
+    """广播已签名交易"""
+    journal = TxJournal(args.journal)
+    try:
+        results = broadcast_signed(args.signed, rpc_url=args.rpc, concurrency=args.concurrency,
+                                   batch_size=args.batch_size, journal=journal)
+    finally:
+        journal.close()
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+    return 0 if all(r['success'] for r in results) else 1
+
+
+def cmd_vault(args):
+    """管理加密密钥库"""
+    vault = KeyVault(args.vault)
+    if args.action == "list":
+        if not vault.exists:
+            print(f"密钥库不存在: {args.vault}")
+            return 1
+        print(json.dumps(vault.labels(), ensure_ascii=False, indent=2))
+        return 0
+    if not args.label and args.action != "init":
+        print("需要指定标签")
+        return 1
+    vault = open_vault(args.vault, create=args.action in ("init", "add"))
+    try:
+        if args.action == "add":
+            private_key = read_private_key(args.key_env)
+            if args.kind == KIND_SOLANA:
+                secret = bytes(parse_solana_keypair(private_key))
+            else:
+                secret = bytes(Account.from_key(private_key).key)
+            print(f"已加入 {args.label} ({args.kind}): {vault.add(args.label, args.kind, secret)}")
+        elif args.action == "remove":
+            vault.remove(args.label)
+            print(f"已删除 {args.label}")
+        else:
+            print(f"密钥库已就绪: {args.vault}")
+    finally:
+        vault.lock()
+    return 0
+
+
+def cmd_screen(args):
+    """建立风险地址筛查索引 / 筛查地址"""
+    screener = AddressScreen(args.screen_db)
+    try:
+        if args.action == "build":
+            for path in args.okx:
+                print(f"{path}: 导入 {screener.import_okx_dump(path, level=args.okx_level, rebuild=False)} 个地址")
+            for path in args.blocklist:
+                print(f"{path}: 导入 {screener.import_blocklist(path, rebuild=False)} 个地址")
+            screener.rebuild_bloom()
+            print(json.dumps(screener.stats(), ensure_ascii=False, indent=2))
+            return 0
+        if args.action == "stats":
+            print(json.dumps(screener.stats(), ensure_ascii=False, indent=2))
+            return 0
+        # check：命令行地址和文件中每行第一个字段（流式读取）
+        def addresses():
+            yield from args.addresses
+            if args.file:
+                with open(args.file, 'r', encoding='utf-8-sig') as f:
+                    for line in f:
+                        field = line.strip().split(',')[0]
+                        if field and not field.startswith('#'):
+                            yield field
+        blocked = 0
+        for address, hit in screener.screen(addresses()):
+            blocked += hit['level'] == LEVEL_BLOCK
+            print(describe_hit(hit))
+        return 1 if blocked else 0
+    finally:
+        screener.close()
+
+
+def cmd_wallets(args):
+    """批量生成钱包到列式存储文件 / 导出CSV / 按地址查找"""
+    if args.action == "generate":
+        store = WalletStore()
+        if os.path.exists(args.store):
+            with WalletStore.open(args.store) as existing:
+                store = existing.copy()
+        WalletUtil().generate_wallets(args.count, store)
+        store.save(args.store)
+        print(f"{args.store}: 共 {len(store)} 个钱包")
+        return 0
+    with WalletStore.open(args.store) as store:
+        if args.action == "export":
+            if not args.out:
+                raise ValueError("export 需要 --out 指定输出文件")
+            print(f"{args.out}: 导出 {store.export_csv(args.out, include_private_key=args.with_keys)} 个钱包")
+            return 0
+        missing = 0
+        for address in args.addresses:
+            record = store.find(address)
+            missing += record is None
+            print(f"{address}: " + (f"第{record.index}个钱包" if record is not None else "不在存储中"))
+        return 1 if missing else 0
+
+
+def watched_addresses(args):
+    """监控地址：命令行地址、地址文件每行第一个字段、钱包存储文件中的全部钱包"""
+    addresses = list(args.addresses)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8-sig') as f:
+            for line in f:
+                field = line.strip().split(',')[0]
+                if field and not field.startswith('#'):
+                    addresses.append(field)
+    if args.store:
+        with WalletStore.open(args.store) as store:
+            addresses.extend(store.address_at(index) for index in range(len(store)))
+    return addresses
+
+
+def cmd_deposits(args):
+    """ERC20充值监控：scan 增量扫描 / list 查看已记录的充值 / reset 删除游标"""
+    watcher = DepositWatcher(args.db)
+    try:
+        if args.action == "list":
+            for row in watcher.deposits(chain_name=args.chain[0] if args.chain else None,
+                                        address=args.addresses[0] if args.addresses else None, limit=args.limit):
+                print(json.dumps(row, ensure_ascii=False))
+            return 0
+        if not args.chain:
+            raise ValueError(f"{args.action} 需要 --chain 指定链名")
+        if args.action == "reset":
+            for chain_name in args.chain:
+                watcher.reset_cursor(chain_name)
+                print(f"{chain_name}: 已删除游标")
+            return 0
+        addresses = watched_addresses(args)
+        if not addresses:
+            raise ValueError("没有监控地址：请指定地址、--file 或 --store")
+        failed = False
+        while True:
+            results = watcher.scan(args.chain, addresses, coin_names=args.coin, from_block=args.from_block,
+                                   lookback=args.lookback, confirmations=args.confirmations,
+                                   topic_filter=False if args.local_filter else None,
+                                   on_deposit=lambda row: print(json.dumps(row, ensure_ascii=False)))
+            failed = any('error' in result for result in results.values())
+            if not args.follow:
+                break
+            # 持续监控时只有第一轮使用 --from-block，之后从游标继续
+            args.from_block = None
+            time.sleep(args.follow)
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 1 if failed else 0
+    finally:
+        watcher.close()
+
+
+def cmd_validate(args):
+    """校验、规范化并去重收款地址文件"""
+    decimals = args.decimals
+    if decimals is None and args.coin:
+        _, token_info = WalletUtil()._validate_chain_and_token(args.chain, args.coin)
+        decimals = token_info['decimals']
+    validator = RecipientValidator(args.chain, decimals=decimals, default_amount=args.amount,
+                                   require_checksum=args.strict_checksum, dedupe="disk" if args.disk else "memory")
+    summary = validator.validate_file(args.input, args.out, args.errors)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0 if summary['invalid'] == 0 else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="MyWalletTool 命令行（无界面模式）")
+    parser.add_argument("--journal", default=DEFAULT_JOURNAL_PATH, help="转账日志数据库路径")
+    parser.add_argument("--nonce-db", default=DEFAULT_NONCE_DB_PATH, help="nonce管理数据库路径")
+    parser.add_argument("--metrics-port", type=int, help="在该端口提供 Prometheus 格式的RPC指标 (/metrics)")
+    parser.add_argument("--metrics-file", help="定期把 Prometheus 格式的RPC指标写入该文件")
+    parser.add_argument("--vault", default=DEFAULT_VAULT_PATH, help="加密密钥库路径")
+    parser.add_argument("--screen-db", default=DEFAULT_SCREEN_DB_PATH, help="收款地址风险筛查索引路径（存在时自动筛查）")
+    parser.add_argument("--rpc-cache", nargs="?", const=DEFAULT_RPC_CACHE_PATH,
+                        help=f"把链ID、ATA是否存在等只读数据缓存到文件，重启后复用（缺省路径 {DEFAULT_RPC_CACHE_PATH}）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    batch = sub.add_parser("batch", help="执行或续跑批量转账任务")
+    batch.add_argument("job", help="任务文件(JSON)")
+    batch.add_argument("--key-env", default="MYWALLET_PRIVATE_KEY", help="读取私钥的环境变量名")
+    batch.add_argument("--key-label", help="使用密钥库中该标签的私钥（优先于任务文件中的 key_label）")
+    batch.add_argument("--profile", help="性能分析模式: cpu / mem / cpu,mem（默认读取 MYWALLET_PROFILE）")
+    batch.add_argument("--skip-preflight", action="store_true", help="跳过执行前的余额和手续费预检")
+    batch.add_argument("--concurrency", type=int, default=1, help="同时进行的转账数")
+    batch.add_argument("--engine", choices=("thread", "async"), default="thread",
+                       help="执行方式: thread 每笔进行中的转账占用一个线程; async 在一个事件循环中执行，适合高并发")
+    batch.add_argument("--priority", choices=tuple(PRIORITY_PRESETS),
+                       help=f"Solana优先费档位（优先于任务文件中的 priority，缺省 {DEFAULT_PRIORITY}）")
+    batch.add_argument("--simulate", action="store_true", help="发送前逐条模拟，模拟失败的条目不发送")
+    batch.add_argument("--disperse", action="store_true",
+                       help="EVM条目通过 Disperse 合约合并发送（每笔交易最多200个地址，代币先 approve）")
+    batch.set_defaults(func=cmd_batch)
+
+    queue = sub.add_parser("queue", help="多机模式协调方：submit 拆分并提交任务 / status 查看进度 / results 查看条目结果")
+    queue.add_argument("action", choices=["submit", "status", "results"])
+    queue.add_argument("jobs", nargs="*", help="submit 时的任务文件(JSON)")
+    queue.add_argument("--job-id", help="status / results 时只看该任务")
+    queue.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="共享分片队列数据库路径")
+    queue.add_argument("--key-env", default="MYWALLET_PRIVATE_KEY", help="任务没有 key_label 时读取私钥（确定发送方地址）的环境变量名")
+    queue.add_argument("--key-label", help="使用密钥库中该标签的地址作为发送方（优先于任务文件中的 key_label，不需要口令）")
+    queue.add_argument("--solana-shard-size", type=int, default=DEFAULT_SOLANA_SHARD_SIZE, help="Solana每个分片的条目数")
+    queue.set_defaults(func=cmd_queue)
+
+    worker = sub.add_parser("worker", help="多机模式工作进程：从共享队列领取分片执行（--journal 需指向共享存储）")
+    worker.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="共享分片队列数据库路径")
+    worker.add_argument("--worker-id", help="工作进程ID，默认 主机名-进程号")
+    worker.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS, help="租约时长（秒）")
+    worker.add_argument("--concurrency", type=int, default=1, help="每个分片内同时进行的转账数")
+    worker.add_argument("--forever", action="store_true", help="队列清空后继续等待新的分片")
+    worker.add_argument("--key-env", default="MYWALLET_PRIVATE_KEY", help="分片没有 key_label 时读取私钥的环境变量名")
+    worker.add_argument("--key-label", help="使用密钥库中该标签的私钥（优先于分片的 key_label）")
+    worker.set_defaults(func=cmd_worker)
+
+    preflight = sub.add_parser("preflight", help="检查发送方余额是否足够支付批量金额和手续费")
+    preflight.add_argument("job", help="任务文件(JSON)")
+    preflight.add_argument("--key-env", default="MYWALLET_PRIVATE_KEY", help="读取私钥的环境变量名")
+    preflight.add_argument("--key-label", help="使用密钥库中该标签的私钥")
+    preflight.set_defaults(func=cmd_preflight)
+
+    simulate = sub.add_parser("simulate", help="逐条模拟批量任务，预测手续费和失败原因，不发出交易")
+    simulate.add_argument("job", help="任务文件(JSON)")
+    simulate.add_argument("--key-env", default="MYWALLET_PRIVATE_KEY", help="读取私钥的环境变量名")
+    simulate.add_argument("--key-label", help="使用密钥库中该标签的私钥")
+    simulate.add_argument("--priority", choices=tuple(PRIORITY_PRESETS), help="Solana优先费档位")
+    simulate.set_defaults(func=cmd_simulate)
+
+    nonces = sub.add_parser("nonces", help="查看未确认的nonce，对齐链上nonce，提价重发卡住的交易")
+    nonces.add_argument("chain", help="链名称")
+    nonces.add_argument("--address", help="发送方地址（缺省时列出全部）")
+    nonces.add_argument("--resync", action="store_true", help="立即与链上nonce对齐")
+    nonces.add_argument("--replace-stuck", action="store_true", help="gas价格低于市价的未确认交易提价重发（需要私钥）")
+    nonces.add_argument("--min-age", type=float, default=120.0, help="未确认超过该秒数才视为卡住")
+    nonces.add_argument("--key-env", default="MYWALLET_PRIVATE_KEY", help="读取私钥的环境变量名")
+    nonces.set_defaults(func=cmd_nonces)
+
+    status = sub.add_parser("status", help="查看批量任务状态")
+    status.add_argument("job_id", help="批量任务ID")
+    status.set_defaults(func=cmd_status)
+
+    plan = sub.add_parser("plan", help="由批量任务生成离线签名计划（确定nonce和gas价格）")
+    plan.add_argument("job", help="任务文件(JSON)")
+    plan.add_argument("--from", dest="sender", required=True, help="发送方地址")
+    plan.add_argument("--out", required=True, help="签名计划输出路径")
+    plan.add_argument("--nonce", type=int, help="起始nonce，缺省时在线查询")
+    plan.add_argument("--gas-price", type=int, help="gas价格(wei)，缺省时在线查询")
+    plan.set_defaults(func=cmd_plan)
+
+    sign = sub.add_parser("sign", help="离线批量签名（多进程）")
+    sign.add_argument("plan", help="签名计划文件")
+    sign.add_argument("--out", required=True, help="已签名交易输出路径(JSONL)")
+    sign.add_argument("--workers", type=int, help="签名进程数，默认CPU核数")
+    sign.add_argument("--key-env", default="MYWALLET_PRIVATE_KEY", help="读取私钥的环境变量名")
+    sign.add_argument("--key-label", help="使用密钥库中该标签的EVM私钥")
+    sign.set_defaults(func=cmd_sign)
+
+    broadcast = sub.add_parser("broadcast", help="广播已签名交易（连接池 + 批量请求）")
+    broadcast.add_argument("signed", help="已签名交易文件(JSONL)")
+    broadcast.add_argument("--rpc", help="RPC节点，默认取 chain.json 配置")
+    broadcast.add_argument("--concurrency", type=int, default=8, help="并发连接数")
+    broadcast.add_argument("--batch-size", type=int, default=50, help="每个批量请求的交易数")
+    broadcast.set_defaults(func=cmd_broadcast)
+
+    vault = sub.add_parser("vault", help="管理加密密钥库（口令读取 MYWALLET_VAULT_PASSPHRASE，未设置时交互输入）")
+    vault.add_argument("action", choices=["init", "add", "list", "remove"])
+    vault.add_argument("label", nargs="?", help="私钥标签")
+    vault.add_argument("--kind", choices=[KIND_EVM, KIND_SOLANA], default=KIND_EVM, help="私钥所属链类型")
+    vault.add_argument("--key-env", default="MYWALLET_PRIVATE_KEY", help="add 时读取私钥的环境变量名")
+    vault.set_defaults(func=cmd_vault)
+
+    screen = sub.add_parser("screen", help="收款地址风险筛查：build 建立索引 / check 筛查地址 / stats 查看索引")
+    screen.add_argument("action", choices=["build", "check", "stats"])
+    screen.add_argument("addresses", nargs="*", help="check 时要筛查的地址")
+    screen.add_argument("--okx", nargs="*", default=[], help="build 时导入的 OKX 搜索导出文件（addressVoList）")
+    screen.add_argument("--okx-level", choices=[LEVEL_WARN, LEVEL_BLOCK], default=LEVEL_WARN,
+                        help="OKX 导出地址的命中等级")
+    screen.add_argument("--blocklist", nargs="*", default=[], help="build 时导入的黑名单文件（每行: 地址[,原因]，命中即拒绝）")
+    screen.add_argument("--file", help="check 时逐行筛查的地址文件（每行第一个字段）")
+    screen.set_defaults(func=cmd_screen)
+
+    wallets = sub.add_parser("wallets", help="批量生成钱包（列式存储文件）：generate 生成 / export 导出CSV / find 按地址查找")
+    wallets.add_argument("action", choices=["generate", "export", "find"])
+    wallets.add_argument("store", help="钱包存储文件，generate 时文件已存在则追加")
+    wallets.add_argument("addresses", nargs="*", help="find 时要查找的地址")
+    wallets.add_argument("--count", type=int, default=1000, help="generate 时生成的数量")
+    wallets.add_argument("--out", help="export 时的CSV输出文件")
+    wallets.add_argument("--with-keys", action="store_true", help="export 时同时导出私钥")
+    wallets.set_defaults(func=cmd_wallets)
+
+    deposits = sub.add_parser("deposits", help="ERC20充值监控：scan 增量扫描 Transfer 日志 / list 查看充值 / reset 删除游标")
+    deposits.add_argument("action", choices=["scan", "list", "reset"])
+    deposits.add_argument("addresses", nargs="*", help="scan 时监控的收款地址；list 时只看该地址的充值")
+    deposits.add_argument("--chain", nargs="+", help="链名称（与 chain.json 一致），scan 时多条链并行扫描")
+    deposits.add_argument("--coin", nargs="+", help="只监控这些代币，缺省时为 contract.json 中该链全部ERC20代币")
+    deposits.add_argument("--file", help="监控地址文件（每行第一个字段）")
+    deposits.add_argument("--store", help="钱包存储文件（wallets generate 生成），监控其中全部钱包")
+    deposits.add_argument("--from-block", type=int, help="从该区块开始补扫（忽略游标，已记录的充值不会重复）")
+    deposits.add_argument("--lookback", type=int, default=0,
+                          help="没有游标时从当前安全高度往前扫描的区块数，缺省只监控之后的新区块")
+    deposits.add_argument("--confirmations", type=int, default=DEFAULT_CONFIRMATIONS, help="只扫描到 最新区块-确认数")
+    deposits.add_argument("--local-filter", action="store_true",
+                          help="总是取回全部 Transfer 日志在本地过滤（缺省地址不多时在节点上按收款地址过滤）")
+    deposits.add_argument("--follow", type=float, help="扫描完后每隔该秒数继续扫描新区块")
+    deposits.add_argument("--limit", type=int, default=100, help="list 时最多显示的条数")
+    deposits.add_argument("--db", default=DEFAULT_DEPOSIT_DB_PATH, help="充值记录和游标数据库路径")
+    deposits.set_defaults(func=cmd_deposits)
+
+    validate = sub.add_parser("validate", help="校验、规范化并去重收款地址文件（每行: 地址,金额）")
+    validate.add_argument("input", help="收款文件")
+    validate.add_argument("--chain", required=True, help="链名称（与 chain.json 一致）")
+    validate.add_argument("--out", required=True, help="规范化后的输出文件")
+    validate.add_argument("--errors", help="逐行错误输出文件")
+    validate.add_argument("--coin", help="代币名称，用于校验金额精度")
+    validate.add_argument("--decimals", type=int, help="代币精度（优先于 --coin）")
+    validate.add_argument("--amount", help="行内没有金额时使用的默认金额")
+    validate.add_argument("--strict-checksum", action="store_true", help="EVM地址必须带 EIP-55 校验和")
+    validate.add_argument("--disk", action="store_true", help="使用磁盘外部排序去重（超大文件）")
+    validate.set_defaults(func=cmd_validate)
+
+    profile = sub.add_parser("profile", help="按累计耗时汇总性能分析结果")
+    profile.add_argument("paths", nargs="*", help=".prof / .mem 文件，缺省取输出目录中最新的文件")
+    profile.add_argument("--dir", default=DEFAULT_PROFILE_DIR, help="性能分析输出目录")
+    profile.add_argument("--last", type=int, default=1, help="缺省时汇总最新的N个任务")
+    profile.add_argument("--top", type=int, default=20, help="列出的函数数量")
+    profile.set_defaults(func=cmd_profile)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    if args.rpc_cache:
+        RPC_CACHE.enable_persistence(args.rpc_cache)
+    stop_writer = start_metrics_file_writer(args.metrics_file) if args.metrics_file else None
+    try:
+        return args.func(args)
+    finally:
+        RPC_CACHE.close()
+        if stop_writer is not None:
+            stop_writer.set()
+            RPC_METRICS.write_prometheus(args.metrics_file)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,48 @@
+import time
+# 启动耗时统计的起点：在导入其他模块之前记录
+STARTUP_STARTED = time.perf_counter()
 import sys
 import json
 import os
-import time
+import threading
+import asyncio
 from datetime import datetime
+from decimal import Decimal
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout, QListWidget, QTextEdit, QPushButton, QLabel, QPlainTextEdit, QFormLayout, QLineEdit, QStackedWidget, QSizePolicy, QSpacerItem, QComboBox, QMessageBox
+    QApplication, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout, QListWidget, QTextEdit, QPushButton, QLabel, QPlainTextEdit, QFormLayout, QLineEdit, QStackedWidget, QSizePolicy, QSpacerItem, QComboBox, QMessageBox, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QInputDialog, QTableView,
+    QFileDialog, QSpinBox, QCheckBox
 )
-from PyQt5.QtCore import Qt, QSize, QTimer, pyqtSignal, QThread, QMetaObject, Q_ARG
+from PyQt5.QtCore import (Qt, QSize, QTimer, pyqtSignal, QThread, QMetaObject, Q_ARG, QAbstractTableModel, QModelIndex,
+                          QObject)
 from PyQt5.QtGui import QFont, QColor, QPalette, QBrush
-from util.walletUtil import WalletUtil
+from util.rpcMetrics import RPC_METRICS
+from util.configCache import load_json_config
+from util.addressScreen import AddressScreen, DEFAULT_SCREEN_DB_PATH
+from util.txJournal import (TxJournal, TransferHistory, DEFAULT_JOURNAL_PATH, HISTORY_COLUMNS, STATE_PLANNED,
+                            STATE_FAILED, STATE_CONFIRMED)
+from util.taskProfiler import profiler_from_env, summarize, list_profiles
+from util.priorityFee import PRIORITY_ECONOMY, PRIORITY_FAST, PRIORITY_URGENT, DEFAULT_PRIORITY
+# 钱包工具等依赖 web3/solana 的模块由 AppServices 在后台线程中导入，这里只导入界面启动需要的轻量模块
+IMPORTS_DONE = time.perf_counter()
+
+# 设置环境变量 MYWALLET_PROFILE=cpu,mem 开启任务性能分析，结果写入 logs/profile
+TASK_PROFILER = profiler_from_env()
+# 收款地址风险筛查索引（用 wallet_cli.py screen build 生成），存在时转账前自动筛查
+ADDRESS_SCREEN = AddressScreen(DEFAULT_SCREEN_DB_PATH) if os.path.exists(DEFAULT_SCREEN_DB_PATH) else None
+# 图形界面的单笔转账也写入转账日志（任务ID为 gui），在「历史」页查看
+TX_JOURNAL = TxJournal(DEFAULT_JOURNAL_PATH)
+GUI_JOB_ID = "gui"
+# Solana优先费档位的显示名称
+PRIORITY_LABELS = {PRIORITY_ECONOMY: "经济（便宜，确认较慢）", PRIORITY_FAST: "快速", PRIORITY_URGENT: "加急（网络拥堵时使用）"}
+
+
+def make_priority_combo(font):
+    """Solana优先费档位下拉框，currentData() 为档位名"""
+    combo = QComboBox(); combo.setFont(font); combo.setMinimumHeight(32)
+    for priority, label in PRIORITY_LABELS.items():
+        combo.addItem(label, priority)
+    combo.setCurrentIndex(combo.findData(DEFAULT_PRIORITY))
+    return combo
 
 def resource_path(relative_path):
     """获取资源文件的绝对路径，兼容 PyInstaller 打包和源码运行"""
@@ -45,6 +79,98 @@ def resource_path(relative_path):
         print(f"resource_path error for {relative_path}: {e}")
         return relative_path
 
+class AppServices(QObject):
+    """
+    界面共用的服务和配置
+
+    钱包工具、密钥库、nonce管理器和异步引擎依赖 web3/solana，导入和创建要一秒多，
+    在后台线程中加载，完成后发出 loaded 信号，窗口不必等它们就能显示；用到它们的标签页
+    在加载完成后才创建。chain.json / contract.json 只解析一次，文件修改后再次读取时重新解析。
+    """
+    loaded = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.wallet_util = None
+        self.key_vault = None
+        self.nonce_manager = None
+        self.async_engine = None
+        self.load_seconds = None
+        self.load_error = None
+        self._thread = None
+        self._done = threading.Event()
+
+    @property
+    def is_loaded(self):
+        return self._done.is_set()
+
+    def start(self):
+        """在后台线程中加载（重复调用无效）"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._load, name="app-services", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout=None):
+        """等待加载完成（未启动时先启动后台加载）"""
+        self.start()
+        return self._done.wait(timeout)
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            from util.walletUtil import WalletUtil
+            from util.keyVault import KeyVault, DEFAULT_VAULT_PATH
+            from util.nonceManager import NonceManager, DEFAULT_NONCE_DB_PATH
+            from util.asyncEngine import AsyncEngineHost, AsyncTransferEngine
+            # 批量转账和收款文件校验用到的模块一并导入，打开转账页时不再卡顿
+            import util.batchRunner, util.recipientValidator  # noqa: F401
+            # 加密密钥库：转账页私钥填写 @标签 时使用，每次启动只需输入一次口令
+            self.key_vault = KeyVault(DEFAULT_VAULT_PATH)
+            self.nonce_manager = NonceManager(DEFAULT_NONCE_DB_PATH)
+            self.wallet_util = WalletUtil(journal=TX_JOURNAL, nonce_manager=self.nonce_manager,
+                                          screener=ADDRESS_SCREEN)
+            # 转账和批量转账共用的异步引擎，事件循环在后台线程中运行（第一次转账时启动）
+            self.async_engine = AsyncEngineHost(AsyncTransferEngine(self.wallet_util))
+        except Exception as e:
+            self.load_error = str(e)
+        self.load_seconds = time.perf_counter() - started
+        self._done.set()
+        self.loaded.emit()
+
+    def load_config(self, relative_path):
+        """读取配置文件（与 WalletUtil 共用按修改时间缓存的解析结果），文件不存在或格式错误时抛出异常"""
+        return load_json_config(resource_path(relative_path))
+
+    def chain_config(self):
+        try:
+            return self.load_config("config/chain.json")
+        except Exception as e:
+            print(f"加载chain.json失败: {e}")
+            return {"evm_chains": [], "solana_chains": [], "testnet_chains": []}
+
+    def contract_config(self):
+        try:
+            return self.load_config("config/contract.json")
+        except Exception as e:
+            print(f"加载contract.json失败: {e}")
+            return {"tokens": []}
+
+    def close(self):
+        """关闭窗口时调用；后台加载未完成时等待完成，避免关闭到一半的数据库"""
+        if self._thread is None:
+            return
+        self._done.wait()
+        if self.async_engine is not None:
+            self.async_engine.stop()
+        if self.key_vault is not None:
+            self.key_vault.lock()
+        if self.nonce_manager is not None:
+            self.nonce_manager.close()
+
+
+SERVICES = AppServices()
+
+
 class WorkerThread(QThread):
     """工作线程类"""
     result_ready = pyqtSignal(str, str)  # 信号：(结果类型, 结果内容)
@@ -55,9 +181,17 @@ class WorkerThread(QThread):
         self.task_type = task_type
         self.args = args
         self.kwargs = kwargs
-        self.wallet_util = WalletUtil()
+        self.wallet_util = SERVICES.wallet_util
     
     def run(self):
+        """执行任务（开启性能分析时记录本任务的CPU和内存情况）"""
+        if TASK_PROFILER is None:
+            self._run_task()
+        else:
+            TASK_PROFILER.run(self.task_type, self._run_task)
+            self.log_ready.emit(f"{self.task_type} 性能分析结果已写入 {TASK_PROFILER.output_dir}")
+    
+    def _run_task(self):
         """执行任务"""
         try:
             if self.task_type == "generate_evm_address":
@@ -78,43 +212,69 @@ class WorkerThread(QThread):
                 self.result_ready.emit("wallet", result)
                 self.log_ready.emit(f"钱包生成成功: {wallet['evm_address']}")
                 
-            elif self.task_type == "evm_transfer":
-                private_key, to_address, chain_name, coin_name, amount = self.args
-                try:
-                    result = self.wallet_util.transfer_token(private_key, to_address, chain_name, coin_name, amount)
-                    result_json = json.dumps(result, indent=2, ensure_ascii=False)
-                    self.result_ready.emit("evm_transfer", result_json)
-                    
-                    if result.get("success"):
-                        self.log_ready.emit(f"EVM转账成功: {result.get('tx_hash', '')}")
-                    else:
-                        self.log_ready.emit(f"EVM转账失败: {result.get('error', '')}")
-                except Exception as e:
-                    error_result = {"success": False, "error": str(e)}
-                    self.result_ready.emit("evm_transfer", json.dumps(error_result, indent=2, ensure_ascii=False))
-                    self.log_ready.emit(f"EVM转账异常: {e}")
-                    
-            elif self.task_type == "sol_transfer":
-                private_key, to_address, coin_name, amount = self.args
-                try:
-                    result = self.wallet_util.transfer_token(private_key, to_address, "Solana Mainnet", coin_name, amount)
-                    result_json = json.dumps(result, indent=2, ensure_ascii=False)
-                    self.result_ready.emit("sol_transfer", result_json)
-                    
-                    if result.get("success"):
-                        self.log_ready.emit(f"Solana转账成功: {result.get('tx_hash', '')}")
-                    else:
-                        self.log_ready.emit(f"Solana转账失败: {result.get('error', '')}")
-                except Exception as e:
-                    error_result = {"success": False, "error": str(e)}
-                    self.result_ready.emit("sol_transfer", json.dumps(error_result, indent=2, ensure_ascii=False))
-                    self.log_ready.emit(f"Solana转账异常: {e}")
-                    
         except Exception as e:
             error_msg = f"{self.task_type} 执行失败: {e}"
             self.result_ready.emit(self.task_type, error_msg)
             self.log_ready.emit(error_msg)
 
+
+class EngineTask(QObject):
+    """
+    在共享的异步引擎中执行一笔转账，信号与 WorkerThread 相同
+
+    转账不再各占一个线程：协程在引擎的事件循环中运行，结果通过信号回到界面线程。
+    """
+    result_ready = pyqtSignal(str, str)
+    log_ready = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, task_type, private_key, to_address, chain_name, coin_name, amount, priority=None):
+        from util.recipientValidator import SOLANA_CHAIN_NAME
+        super().__init__()
+        self.task_type = task_type
+        self.args = (private_key, to_address, chain_name, coin_name, amount, priority)
+        self.label = "Solana" if chain_name == SOLANA_CHAIN_NAME else "EVM"
+
+    def start(self):
+        SERVICES.async_engine.submit(self._run())
+
+    async def _run(self):
+        try:
+            result = await self._journaled_transfer(*self.args)
+            self.result_ready.emit(self.task_type, json.dumps(result, indent=2, ensure_ascii=False))
+            if result.get("success"):
+                self.log_ready.emit(f"{self.label}转账成功: {result.get('tx_hash', '')}")
+            else:
+                self.log_ready.emit(f"{self.label}转账失败: {result.get('error', '')}")
+        except Exception as e:
+            error_result = {"success": False, "error": str(e)}
+            self.result_ready.emit(self.task_type, json.dumps(error_result, indent=2, ensure_ascii=False))
+            self.log_ready.emit(f"{self.label}转账异常: {e}")
+        finally:
+            self.finished.emit()
+
+    @staticmethod
+    async def _journaled_transfer(private_key, to_address, chain_name, coin_name, amount, priority):
+        """转账并写入转账日志；签名前就失败的转账也记为 failed，便于在历史页查看"""
+        item_id = f"{time.strftime('%Y%m%d%H%M%S')}-{os.urandom(4).hex()}"
+        # 转账日志是同步SQLite写入，放到线程中执行，不阻塞引擎的事件循环
+        await asyncio.to_thread(TX_JOURNAL.plan, GUI_JOB_ID, [{'item_id': item_id, 'chain_name': chain_name,
+                                                               'coin_name': coin_name, 'to_address': to_address,
+                                                               'amount': amount}])
+        result = await SERVICES.async_engine.engine.transfer(private_key, to_address, chain_name, coin_name, amount,
+                                                             job_id=GUI_JOB_ID, item_id=item_id, priority=priority)
+        await asyncio.to_thread(EngineTask._finish_journal, item_id, result)
+        return result
+
+    @staticmethod
+    def _finish_journal(item_id, result):
+        if not result.get("success"):
+            entry = TX_JOURNAL.get(GUI_JOB_ID, item_id)
+            if entry and entry['state'] == STATE_PLANNED:
+                TX_JOURNAL.record(GUI_JOB_ID, item_id, STATE_FAILED, error=result.get('error'))
+        TX_JOURNAL.flush()
+
+
 class LogWidget(QTextEdit):
     def __init__(self):
         super().__init__()
@@ -238,6 +398,9 @@ class CodeBlockTextEdit(QTextEdit):
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.DefaultContextMenu)
 
 class HomeTab(QWidget):
+    # README 在后台线程读取，读完后通过信号回到界面线程显示
+    readme_ready = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         layout = QVBoxLayout()
@@ -247,18 +410,23 @@ class HomeTab(QWidget):
         self.readme_view = QTextEdit()
         self.readme_view.setReadOnly(True)
         self.readme_view.setFont(QFont('Consolas', 12))
+        self.readme_view.setText("正在加载 README.md ...")
+        layout.addWidget(self.readme_view)
+        self.setLayout(layout)
+        self.readme_ready.connect(self.readme_view.setText)
+        threading.Thread(target=self.load_readme, name="readme", daemon=True).start()
+
+    def load_readme(self):
         try:
             readme_path = resource_path("README.md")
             print(f"尝试加载README文件: {readme_path}")
             if os.path.exists(readme_path):
                 with open(readme_path, "r", encoding="utf-8") as f:
-                    self.readme_view.setText(f.read())
+                    self.readme_ready.emit(f.read())
             else:
-                self.readme_view.setText(f"README.md 文件不存在: {readme_path}")
+                self.readme_ready.emit(f"README.md 文件不存在: {readme_path}")
         except Exception as e:
-            self.readme_view.setText(f"README.md 加载失败: {str(e)}")
-        layout.addWidget(self.readme_view)
-        self.setLayout(layout)
+            self.readme_ready.emit(f"README.md 加载失败: {str(e)}")
 
 class ConfigTab(QWidget):
     def __init__(self):
@@ -328,11 +496,9 @@ class ConfigTab(QWidget):
         """加载链配置"""
         try:
             chain_path = resource_path("config/chain.json")
-            print(f"尝试加载chain.json文件: {chain_path}")
             if os.path.exists(chain_path):
-                with open(chain_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.chain_edit.setPlainText(json.dumps(data, indent=2, ensure_ascii=False))
+                data = SERVICES.load_config("config/chain.json")
+                self.chain_edit.setPlainText(json.dumps(data, indent=2, ensure_ascii=False))
             else:
                 self.chain_edit.setPlainText(f"chain.json文件不存在: {chain_path}")
         except Exception as e:
@@ -342,11 +508,9 @@ class ConfigTab(QWidget):
         """加载合约配置"""
         try:
             contract_path = resource_path("config/contract.json")
-            print(f"尝试加载contract.json文件: {contract_path}")
             if os.path.exists(contract_path):
-                with open(contract_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.token_edit.setPlainText(json.dumps(data, indent=2, ensure_ascii=False))
+                data = SERVICES.load_config("config/contract.json")
+                self.token_edit.setPlainText(json.dumps(data, indent=2, ensure_ascii=False))
             else:
                 self.token_edit.setPlainText(f"contract.json文件不存在: {contract_path}")
         except Exception as e:
@@ -412,7 +576,6 @@ class WalletTab(QWidget):
     def __init__(self, log_widget):
         super().__init__()
         self.log_widget = log_widget
-        self.wallet_util = WalletUtil()
         
         main_layout = QHBoxLayout()
         self.sidebar = StyledSidebar(["生成随机EVM地址", "生成随机Sol地址", "生成EVM钱包"])
@@ -554,17 +717,413 @@ class WalletTab(QWidget):
         self.wallet_btn.setEnabled(True)
         self.wallet_btn.setText("开始生成")
 
+class BatchTableModel(QAbstractTableModel):
+    """
+    批量转账表格模型
+
+    转账线程通过 queue_result 提交结果（只写入待更新字典，同一行多次更新只保留最后一次），
+    界面线程的定时器调用 apply_updates 一次性应用，每个周期只发出一次 dataChanged，
+    几千笔同时进行时也不会因逐行信号拖慢界面。
+    """
+    HEADERS = ["行号", "收款地址", "金额", "状态", "交易哈希/错误"]
+    STATUS_PENDING = "待执行"
+    STATUS_SUCCESS = "成功"
+    STATUS_FAILED = "失败"
+    STATUS_STOPPED = "未执行"
+    STATUS_COLORS = {STATUS_SUCCESS: QColor(30, 140, 60), STATUS_FAILED: QColor(200, 40, 40),
+                     STATUS_STOPPED: QColor(140, 140, 140)}
+
+    def __init__(self):
+        super().__init__()
+        self._rows = []
+        self._updates = {}
+        self._updates_lock = threading.Lock()
+        self.counts = {}
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self.counts = {}
+        with self._updates_lock:
+            self._updates = {}
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        """追加导入的行 [(行号, 地址, 金额)]"""
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+        self._rows.extend([line_no, address, amount, self.STATUS_PENDING, ""] for line_no, address, amount in rows)
+        self.endInsertRows()
+        self.counts[self.STATUS_PENDING] = self.counts.get(self.STATUS_PENDING, 0) + len(rows)
+
+    def rows(self):
+        return self._rows
+
+    def reset_status(self):
+        """重新执行前把全部行恢复为待执行"""
+        for row in self._rows:
+            row[3], row[4] = self.STATUS_PENDING, ""
+        self.counts = {self.STATUS_PENDING: len(self._rows)} if self._rows else {}
+        if self._rows:
+            self.dataChanged.emit(self.index(0, 3), self.index(len(self._rows) - 1, 4))
+
+    def queue_result(self, row, result):
+        """记录一行的转账结果（可在任意线程调用）"""
+        if result.get("success"):
+            update = (self.STATUS_SUCCESS, result.get("tx_hash") or "")
+        elif result.get("stopped"):
+            update = (self.STATUS_STOPPED, "")
+        else:
+            update = (self.STATUS_FAILED, result.get("error") or "")
+        with self._updates_lock:
+            self._updates[row] = update
+
+    def apply_updates(self):
+        """应用积累的结果（界面线程定时调用），返回本次更新的行数"""
+        with self._updates_lock:
+            updates, self._updates = self._updates, {}
+        if not updates:
+            return 0
+        for row, (status, detail) in updates.items():
+            old = self._rows[row][3]
+            self.counts[old] = self.counts.get(old, 0) - 1
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self._rows[row][3], self._rows[row][4] = status, detail
+        self.dataChanged.emit(self.index(min(updates), 3), self.index(max(updates), 4))
+        return len(updates)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        if role == Qt.DisplayRole:
+            return str(value)
+        if role == Qt.ForegroundRole and index.column() == 3:
+            color = self.STATUS_COLORS.get(value)
+            return QBrush(color) if color is not None else None
+        if role == Qt.ToolTipRole and index.column() == 4 and value:
+            return str(value)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+
+class CsvImportThread(QThread):
+    """流式导入收款文件：边校验边分批发给界面，大文件导入时界面不卡顿"""
+    rows_ready = pyqtSignal(list)
+    import_done = pyqtSignal(dict)
+    CHUNK_SIZE = 2000
+
+    def __init__(self, path, chain_name):
+        super().__init__()
+        self.path = path
+        self.chain_name = chain_name
+
+    def run(self):
+        summary = {'valid': 0, 'errors': 0, 'first_errors': [], 'total_amount': Decimal(0), 'exception': None}
+
+        def on_error(line_no, reason):
+            summary['errors'] += 1
+            if len(summary['first_errors']) < 20:
+                summary['first_errors'].append(f"第{line_no}行: {reason}")
+
+        from util.recipientValidator import RecipientValidator
+        chunk = []
+        try:
+            for line_no, address, amount in RecipientValidator(self.chain_name).iter_file(self.path, on_error):
+                chunk.append((line_no, address, f"{amount:f}"))
+                summary['valid'] += 1
+                summary['total_amount'] += amount
+                if len(chunk) >= self.CHUNK_SIZE:
+                    self.rows_ready.emit(chunk)
+                    chunk = []
+        except Exception as e:
+            summary['exception'] = str(e)
+        if chunk:
+            self.rows_ready.emit(chunk)
+        summary['total_amount'] = f"{summary['total_amount']:f}"
+        self.import_done.emit(summary)
+
+
+class BatchTransferThread(QThread):
+    """批量转账线程：BatchRunner 把条目交给异步引擎并发执行，结果写入表格模型的待更新队列"""
+    log_ready = pyqtSignal(str)
+
+    def __init__(self, model, job_id, items, private_key, concurrency, simulate=False):
+        super().__init__()
+        self.model = model
+        self.job_id = job_id
+        self.items = items
+        self.private_key = private_key
+        self.concurrency = concurrency
+        self.simulate = simulate
+        self.runner = None
+
+    def stop(self):
+        if self.runner is not None:
+            self.runner.stop()
+
+    def run(self):
+        try:
+            from util.batchRunner import BatchRunner
+            self.runner = BatchRunner(TX_JOURNAL, profiler=TASK_PROFILER, concurrency=self.concurrency,
+                                      engine=SERVICES.async_engine, simulate=self.simulate)
+
+            def on_result(item, result):
+                self.model.queue_result(int(item['item_id']), result)
+
+            results = self.runner.run(self.job_id, self.items, self.private_key, on_result)
+            succeeded = sum(1 for r in results if r.get("success"))
+            self.log_ready.emit(f"[批量转账] 任务 {self.job_id} 结束: 共{len(results)}笔, 成功{succeeded}笔")
+        except Exception as e:
+            self.log_ready.emit(f"[批量转账] 任务 {self.job_id} 执行失败: {e}")
+
+
+class BatchTransferPanel(QWidget):
+    """批量转账：导入 "地址,金额" 文件，按并发数执行，逐行显示状态"""
+    # 表格状态刷新周期（毫秒）
+    UPDATE_INTERVAL_MS = 250
+
+    def __init__(self, log_widget, transfer_tab):
+        super().__init__()
+        self.log_widget = log_widget
+        self.transfer_tab = transfer_tab
+        self.import_thread = None
+        self.transfer_thread = None
+        self.import_summary = None
+        self.import_chain = None
+        # 同一次导入、同一币种重复点击开始时沿用任务ID，已完成的行不会重复转账
+        self.job_id = None
+        self.job_coin = None
+
+        layout = QVBoxLayout()
+        form = QFormLayout()
+        form.setLabelAlignment(Qt.AlignmentFlag.AlignRight)
+        form.setHorizontalSpacing(24)
+        form.setVerticalSpacing(12)
+        font = QFont('微软雅黑', 13)
+        self.priv = QLineEdit(); self.priv.setFont(font); self.priv.setMinimumHeight(32)
+        self.priv.setPlaceholderText("私钥，或 @标签 使用密钥库中的私钥")
+        self.chain = QComboBox(); self.chain.setFont(font); self.chain.setMinimumHeight(32)
+        self.coin = QComboBox(); self.coin.setFont(font); self.coin.setMinimumHeight(32)
+        self.concurrency = QSpinBox(); self.concurrency.setFont(font); self.concurrency.setMinimumHeight(32)
+        self.concurrency.setRange(1, 256)
+        self.concurrency.setValue(16)
+        self.priority = make_priority_combo(font)
+        self.priority.setEnabled(False)
+        form.addRow("私钥:", self.priv)
+        form.addRow("链名:", self.chain)
+        form.addRow("币种:", self.coin)
+        form.addRow("并发数:", self.concurrency)
+        form.addRow("Solana优先费:", self.priority)
+        self.simulate = QCheckBox("发送前逐条模拟，跳过会失败的行"); self.simulate.setFont(font)
+        self.simulate.setChecked(True)
+        form.addRow("", self.simulate)
+        layout.addLayout(form)
+
+        btn_layout = QHBoxLayout()
+        self.import_btn = QPushButton("导入收款文件")
+        self.start_btn = QPushButton("开始转账")
+        self.stop_btn = QPushButton("停止")
+        for btn in (self.import_btn, self.start_btn, self.stop_btn):
+            btn.setFixedSize(200, 50)
+            btn_layout.addWidget(btn)
+        btn_layout.addStretch(1)
+        self.status_label = QLabel("请选择链名和币种后导入收款文件（每行 地址,金额）")
+        self.status_label.setFont(QFont('微软雅黑', 12))
+        btn_layout.addWidget(self.status_label)
+        layout.addLayout(btn_layout)
+
+        self.model = BatchTableModel()
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setFont(QFont('Consolas', 11))
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(26)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(1, 420)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+        self.update_timer = QTimer(self)
+        self.update_timer.timeout.connect(self.apply_updates)
+        self.import_btn.clicked.connect(self.import_file)
+        self.start_btn.clicked.connect(self.start_transfer)
+        self.stop_btn.clicked.connect(self.stop_transfer)
+        self.chain.currentTextChanged.connect(self.on_chain_changed)
+        self.stop_btn.setEnabled(False)
+        self.init_chain_combo()
+
+    def init_chain_combo(self):
+        """初始化链名下拉框（EVM主网、测试网和Solana），保留当前选择"""
+        current = self.chain.currentText()
+        chain_data = self.transfer_tab.chain_data
+        self.chain.blockSignals(True)
+        self.chain.clear()
+        self.chain.addItem("请选择链名")
+        for key in ("evm_chains", "testnet_chains", "solana_chains"):
+            for chain in chain_data.get(key, []):
+                self.chain.addItem(chain["chainName"])
+        self.chain.blockSignals(False)
+        if current and self.chain.findText(current) >= 0:
+            self.chain.setCurrentText(current)
+        self.on_chain_changed(self.chain.currentText())
+
+    def on_chain_changed(self, chain_name):
+        from util.recipientValidator import SOLANA_CHAIN_NAME
+        current = self.coin.currentText()
+        self.coin.clear()
+        self.priority.setEnabled(chain_name == SOLANA_CHAIN_NAME)
+        if chain_name == "请选择链名":
+            self.coin.addItem("请先选择链名")
+            return
+        self.coin.addItem("请选择币种")
+        for token in self.transfer_tab.contract_data.get("tokens", []):
+            if token["chainName"] == chain_name:
+                self.coin.addItem(token["coinName"])
+        if self.coin.findText(current) >= 0:
+            self.coin.setCurrentText(current)
+
+    def _busy(self):
+        return any(t is not None and t.isRunning() for t in (self.import_thread, self.transfer_thread))
+
+    def import_file(self):
+        """流式导入收款文件，地址按当前链校验并去重"""
+        chain_name = self.chain.currentText()
+        if chain_name in ["请选择链名", ""]:
+            QMessageBox.warning(self, "错误", "请先选择链名，导入时按链校验地址")
+            return
+        if self._busy():
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "选择收款文件", "", "收款文件 (*.csv *.txt);;所有文件 (*)")
+        if not path:
+            return
+        self.model.clear()
+        self.import_summary = None
+        self.job_id = None
+        self.import_chain = chain_name
+        self.import_thread = CsvImportThread(path, chain_name)
+        self.import_thread.rows_ready.connect(self.model.append_rows)
+        self.import_thread.import_done.connect(self.on_import_done)
+        self.import_thread.start()
+        self.import_btn.setEnabled(False)
+        self.start_btn.setEnabled(False)
+        self.status_label.setText("导入中...")
+        self.log_widget.append_log(f"[批量转账] 开始导入 {path}")
+
+    def on_import_done(self, summary):
+        self.import_summary = summary
+        self.import_btn.setEnabled(True)
+        self.start_btn.setEnabled(True)
+        if summary['exception']:
+            self.log_widget.append_log(f"[批量转账] 导入失败: {summary['exception']}")
+        for error in summary['first_errors']:
+            self.log_widget.append_log(f"[批量转账] 跳过 {error}")
+        if summary['errors'] > len(summary['first_errors']):
+            self.log_widget.append_log(f"[批量转账] 另有{summary['errors'] - len(summary['first_errors'])}行无效或重复")
+        self.status_label.setText(f"已导入{summary['valid']}笔，合计{summary['total_amount']}，跳过{summary['errors']}行")
+        self.log_widget.append_log(f"[批量转账] 导入完成: 有效{summary['valid']}笔, 合计{summary['total_amount']}, "
+                                   f"无效或重复{summary['errors']}行")
+
+    def start_transfer(self):
+        """确认后开始批量转账"""
+        if self._busy():
+            return
+        if not self.model.rowCount():
+            QMessageBox.warning(self, "错误", "请先导入收款文件")
+            return
+        chain_name = self.chain.currentText()
+        coin_name = self.coin.currentText()
+        if chain_name != self.import_chain:
+            QMessageBox.warning(self, "错误", f"收款文件按【{self.import_chain}】校验，请重新导入或切换回该链")
+            return
+        if coin_name in ["请选择币种", "请先选择链名", ""]:
+            QMessageBox.warning(self, "错误", "请选择币种")
+            return
+        if not self.priv.text().strip():
+            QMessageBox.warning(self, "错误", "请填写私钥")
+            return
+        private_key = self.transfer_tab.resolve_key(self.priv.text().strip())
+        if private_key is None:
+            return
+        confirm = QMessageBox.question(
+            self, "批量转账确认",
+            f"是否确认在【{chain_name}】链向{self.model.rowCount()}个地址转账，合计【{self.import_summary['total_amount']}】{coin_name}？",
+            QMessageBox.Yes | QMessageBox.No)
+        if confirm != QMessageBox.Yes:
+            self.log_widget.append_log("[批量转账] 用户取消了本次批量转账")
+            return
+        if self.job_id is None or self.job_coin != coin_name:
+            self.job_id = f"gui-batch-{time.strftime('%Y%m%d%H%M%S')}"
+            self.job_coin = coin_name
+        priority = self.priority.currentData()
+        items = [{'item_id': str(index), 'to_address': row[1], 'chain_name': chain_name, 'coin_name': coin_name,
+                  'amount': row[2], 'priority': priority} for index, row in enumerate(self.model.rows())]
+        self.model.reset_status()
+        self.transfer_tab.refresh_configs()
+        self.transfer_thread = BatchTransferThread(self.model, self.job_id, items, private_key,
+                                                   self.concurrency.value(), self.simulate.isChecked())
+        self.transfer_thread.log_ready.connect(self.log_widget.append_log)
+        self.transfer_thread.finished.connect(self.on_transfer_finished)
+        self.transfer_thread.start()
+        self.update_timer.start(self.UPDATE_INTERVAL_MS)
+        self.import_btn.setEnabled(False)
+        self.start_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.log_widget.append_log(f"[批量转账] 任务 {self.job_id} 开始，{len(items)}笔，并发{self.concurrency.value()}")
+
+    def stop_transfer(self):
+        if self.transfer_thread is not None:
+            self.transfer_thread.stop()
+            self.stop_btn.setEnabled(False)
+            self.log_widget.append_log("[批量转账] 正在停止，等待进行中的转账完成...")
+
+    def apply_updates(self):
+        self.model.apply_updates()
+        counts = self.model.counts
+        text = (f"成功{counts.get(BatchTableModel.STATUS_SUCCESS, 0)} / 失败{counts.get(BatchTableModel.STATUS_FAILED, 0)} / "
+                f"待执行{counts.get(BatchTableModel.STATUS_PENDING, 0)}")
+        if counts.get(BatchTableModel.STATUS_STOPPED):
+            text += f" / 未执行{counts[BatchTableModel.STATUS_STOPPED]}"
+        self.status_label.setText(f"{text} / 共{self.model.rowCount()}")
+
+    def shutdown(self):
+        """关闭窗口时停止提交新的转账，并等待进行中的转账完成"""
+        if self.transfer_thread is not None and self.transfer_thread.isRunning():
+            self.transfer_thread.stop()
+            self.transfer_thread.wait()
+
+    def on_transfer_finished(self):
+        self.update_timer.stop()
+        self.apply_updates()
+        self.import_btn.setEnabled(True)
+        self.start_btn.setEnabled(True)
+        self.stop_btn.setEnabled(False)
+
+
 class TransferTab(QWidget):
     def __init__(self, log_widget):
         super().__init__()
         self.log_widget = log_widget
-        self.wallet_util = WalletUtil()
         
         # 加载配置文件
         self.refresh_configs()
         
         main_layout = QHBoxLayout()
-        self.sidebar = StyledSidebar(["EVM地址一对一转账", "Sol地址一对一转账"])
+        self.sidebar = StyledSidebar(["EVM地址一对一转账", "Sol地址一对一转账", "批量转账"])
         self.stack = QStackedWidget()
         
         # EVM转账
@@ -582,6 +1141,7 @@ class TransferTab(QWidget):
         self.evm_coin = QComboBox(); self.evm_coin.setFont(font); self.evm_coin.setMinimumHeight(32)
         self.evm_amount = QLineEdit(); self.evm_amount.setFont(font); self.evm_amount.setMinimumHeight(32)
         self.init_evm_chain_combo()
+        self.evm_priv.setPlaceholderText("私钥，或 @标签 使用密钥库中的私钥")
         evm_form.addRow("私钥:", self.evm_priv)
         evm_form.addRow("收款地址:", self.evm_to)
         evm_form.addRow("链名:", self.evm_chain)
@@ -609,10 +1169,13 @@ class TransferTab(QWidget):
         self.sol_to = QLineEdit(); self.sol_to.setFont(font); self.sol_to.setMinimumHeight(32)
         self.sol_coin = QComboBox(); self.sol_coin.setFont(font); self.sol_coin.setMinimumHeight(32)
         self.sol_amount = QLineEdit(); self.sol_amount.setFont(font); self.sol_amount.setMinimumHeight(32)
+        self.sol_priority = make_priority_combo(font)
+        self.sol_priv.setPlaceholderText("私钥，或 @标签 使用密钥库中的私钥")
         sol_form.addRow("私钥:", self.sol_priv)
         sol_form.addRow("收款地址:", self.sol_to)
         sol_form.addRow("币种:", self.sol_coin)
         sol_form.addRow("金额:", self.sol_amount)
+        sol_form.addRow("优先费:", self.sol_priority)
         self.sol_transfer_btn = QPushButton("转账")
         self.sol_transfer_btn.setFixedSize(300, 75)
         btn_layout2 = QHBoxLayout()
@@ -624,8 +1187,10 @@ class TransferTab(QWidget):
         sol_layout.addWidget(self.sol_result)
         sol_widget.setLayout(sol_layout)
         self.init_sol_coin_combo()  # 保证控件初始化后再调用
+        self.batch_panel = BatchTransferPanel(log_widget, self)
         self.stack.addWidget(evm_widget)
         self.stack.addWidget(sol_widget)
+        self.stack.addWidget(self.batch_panel)
         self.sidebar.currentRowChanged.connect(self.stack.setCurrentIndex)
         main_layout.addWidget(self.sidebar)
         main_layout.addWidget(self.stack)
@@ -660,6 +1225,9 @@ class TransferTab(QWidget):
             if not to_address.startswith("0x") or len(to_address) != 42:
                 QMessageBox.warning(self, "错误", "收款地址格式不正确")
                 return
+            private_key = self.resolve_key(private_key)
+            if private_key is None:
+                return
             # 新增：弹窗确认
             confirm = QMessageBox.question(self, "转账确认", f"是否确认在【{chain_name}】链向【{to_address}】转账【{amount}】{coin_name}？", QMessageBox.Yes | QMessageBox.No)
             if confirm != QMessageBox.Yes:
@@ -669,7 +1237,7 @@ class TransferTab(QWidget):
             self.log_widget.append_log(f"[EVM转账] 开始，收款地址: {to_address}，链: {chain_name}，币种: {coin_name}，金额: {amount}")
             self.evm_transfer_btn.setEnabled(False)
             self.evm_transfer_btn.setText("转账中...")
-            self.evm_transfer_worker = WorkerThread("evm_transfer", private_key, to_address, chain_name, coin_name, amount)
+            self.evm_transfer_worker = EngineTask("evm_transfer", private_key, to_address, chain_name, coin_name, amount)
             self.evm_transfer_worker.result_ready.connect(self.on_evm_transfer_result)
             self.evm_transfer_worker.log_ready.connect(self.log_widget.append_log)
             self.evm_transfer_worker.finished.connect(self.on_evm_transfer_finished)
@@ -679,6 +1247,31 @@ class TransferTab(QWidget):
             self.evm_transfer_btn.setEnabled(True)
             self.evm_transfer_btn.setText("转账")
     
+    def resolve_key(self, text):
+        """私钥输入框为 @标签 时返回密钥库引用（首次使用时输入口令解锁），取消或解锁失败返回None"""
+        if not text.startswith("@"):
+            return text
+        from util.keyVault import VaultKey
+        key_vault = SERVICES.key_vault
+        label = text[1:]
+        if not key_vault.is_unlocked:
+            if not key_vault.exists:
+                QMessageBox.warning(self, "错误", f"密钥库不存在: {key_vault.path}，请先用 wallet_cli.py vault add 创建")
+                return None
+            passphrase, ok = QInputDialog.getText(self, "解锁密钥库", "请输入密钥库口令:", QLineEdit.Password)
+            if not ok:
+                return None
+            try:
+                key_vault.unlock(passphrase)
+            except ValueError as e:
+                QMessageBox.warning(self, "错误", str(e))
+                return None
+            self.log_widget.append_log("[密钥库] 已解锁")
+        if label not in key_vault.labels():
+            QMessageBox.warning(self, "错误", f"密钥库中没有标签: {label}")
+            return None
+        return VaultKey(key_vault, label)
+    
     def on_evm_transfer_result(self, result_type, result):
         self.evm_result.setPlainText(result)
         # --- 新增：转账后日志 ---
@@ -691,6 +1284,7 @@ class TransferTab(QWidget):
     
     def sol_transfer(self):
         """Solana转账"""
+        from util.recipientValidator import SOLANA_CHAIN_NAME
         try:
             private_key = self.sol_priv.text().strip()
             to_address = self.sol_to.text().strip()
@@ -702,6 +1296,9 @@ class TransferTab(QWidget):
             if coin_name in ["请选择币种", ""]:
                 QMessageBox.warning(self, "错误", "请选择币种")
                 return
+            private_key = self.resolve_key(private_key)
+            if private_key is None:
+                return
             # 新增：弹窗确认
             confirm = QMessageBox.question(self, "转账确认", f"是否确认在【Solana Mainnet】链向【{to_address}】转账【{amount}】{coin_name}？", QMessageBox.Yes | QMessageBox.No)
             if confirm != QMessageBox.Yes:
@@ -711,7 +1308,8 @@ class TransferTab(QWidget):
             self.log_widget.append_log(f"[Solana转账] 开始，收款地址: {to_address}，链: Solana Mainnet，币种: {coin_name}，金额: {amount}")
             self.sol_transfer_btn.setEnabled(False)
             self.sol_transfer_btn.setText("转账中...")
-            self.sol_transfer_worker = WorkerThread("sol_transfer", private_key, to_address, coin_name, amount)
+            self.sol_transfer_worker = EngineTask("sol_transfer", private_key, to_address, SOLANA_CHAIN_NAME, coin_name, amount,
+                                                  self.sol_priority.currentData())
             self.sol_transfer_worker.result_ready.connect(self.on_sol_transfer_result)
             self.sol_transfer_worker.log_ready.connect(self.log_widget.append_log)
             self.sol_transfer_worker.finished.connect(self.on_sol_transfer_finished)
@@ -731,22 +1329,12 @@ class TransferTab(QWidget):
         self.sol_transfer_btn.setText("转账")
     
     def load_chain_config(self):
-        """加载链配置文件"""
-        try:
-            with open(resource_path("config/chain.json"), "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"加载chain.json失败: {e}")
-            return {"evm_chains": [], "solana_chains": [], "testnet_chains": []}
+        """加载链配置文件（与配置页共用解析结果）"""
+        return SERVICES.chain_config()
     
     def load_contract_config(self):
-        """加载合约配置文件"""
-        try:
-            with open(resource_path("config/contract.json"), "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"加载contract.json失败: {e}")
-            return {"tokens": []}
+        """加载合约配置文件（与配置页共用解析结果）"""
+        return SERVICES.contract_config()
     
     def init_evm_chain_combo(self):
         """初始化EVM链名下拉框"""
@@ -788,9 +1376,299 @@ class TransferTab(QWidget):
         result_widget.setPlainText(msg)
         log_widget.append_log(msg)
 
+class MetricsTab(QWidget):
+    """RPC监控：按链实时展示调用次数、错误数和延迟"""
+    COLUMNS = ["链名", "调用次数", "错误次数", "重试次数", "合并次数", "平均延迟(ms)", "P50(ms)", "P99(ms)", "节点"]
+    
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout()
+        label = QLabel("各链RPC调用延迟（每秒刷新）：")
+        label.setFont(QFont('微软雅黑', 14, QFont.Bold))
+        layout.addWidget(label)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setFont(QFont('Consolas', 12))
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch(1)
+        self.profile_btn = QPushButton("最近性能分析")
+        self.profile_btn.setFixedSize(240, 60)
+        self.profile_btn.setEnabled(TASK_PROFILER is not None)
+        btn_layout.addWidget(self.profile_btn)
+        self.reset_btn = QPushButton("清空统计")
+        self.reset_btn.setFixedSize(200, 60)
+        btn_layout.addWidget(self.reset_btn)
+        layout.addLayout(btn_layout)
+        # 性能分析汇总（按累计耗时排序的函数）
+        self.profile_view = CodeBlockTextEdit()
+        self.profile_view.setVisible(False)
+        layout.addWidget(self.profile_view)
+        self.setLayout(layout)
+        self.reset_btn.clicked.connect(self.on_reset_clicked)
+        self.profile_btn.clicked.connect(self.on_profile_clicked)
+        
+        # 每秒刷新，标签页不可见时跳过
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+    
+    def refresh(self):
+        """刷新监控表格"""
+        if not self.isVisible():
+            return
+        rows = RPC_METRICS.summary_by_chain()
+        self.table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            values = [row["chain"], str(row["calls"]), str(row["errors"]), str(row["retries"]), str(row["coalesced"]),
+                      f"{row['avg_ms']:.1f}", f"{row['p50_ms']:.1f}", f"{row['p99_ms']:.1f}", row["endpoints"]]
+            for j, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if j == 2 and row["errors"]:
+                    item.setForeground(QBrush(QColor(200, 40, 40)))
+                self.table.setItem(i, j, item)
+    
+    def on_reset_clicked(self):
+        """清空统计按钮点击事件"""
+        RPC_METRICS.reset()
+        self.refresh()
+    
+    def on_profile_clicked(self):
+        """显示最近一个任务的性能分析汇总"""
+        paths = list_profiles(TASK_PROFILER.output_dir, last=1)
+        if not paths:
+            self.profile_view.setPlainText(f"暂无性能分析结果: {TASK_PROFILER.output_dir}")
+        else:
+            self.profile_view.setPlainText(summarize(paths, top=20))
+        self.profile_view.setVisible(True)
+
+class HistoryTableModel(QAbstractTableModel):
+    """转账历史表格模型：按需分页读取（滚动到底部时再取下一页），排序和过滤都在SQLite中完成"""
+    HEADERS = ["时间", "任务", "链名", "币种", "发送地址", "收款地址", "金额", "状态", "交易哈希", "错误"]
+    # 表头列 -> 排序键，None 表示该列不支持排序
+    SORT_KEYS = ["updated_at", None, "chain_name", "coin_name", None, "to_address", "amount", "state", None, None]
+    STATE_COLORS = {STATE_CONFIRMED: QColor(30, 140, 60), STATE_FAILED: QColor(200, 40, 40)}
+    PAGE_SIZE = 500
+
+    def __init__(self, history=None):
+        super().__init__()
+        self.history = history
+        self.filters = {}
+        self.sort_key = "updated_at"
+        self.descending = True
+        self._rows = []
+        self._cursor = None
+        self._total = 0
+
+    def set_history(self, history):
+        self.history = history
+        self.reload()
+
+    def set_filters(self, filters):
+        self.filters = {k: v for k, v in filters.items() if v}
+        self.reload()
+
+    def reload(self):
+        """清空已加载的行，重新读取第一页"""
+        self.beginResetModel()
+        self._rows = []
+        self._cursor = None
+        self._total = 0
+        if self.history is not None:
+            self._total = self.history.count(self.filters)
+            self._rows, self._cursor = self.history.page(self.filters, self.sort_key, self.descending,
+                                                         limit=self.PAGE_SIZE)
+        self.endResetModel()
+
+    def total(self):
+        return self._total
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._cursor is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._cursor is None:
+            return
+        rows, cursor = self.history.page(self.filters, self.sort_key, self.descending, after=self._cursor,
+                                         limit=self.PAGE_SIZE)
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+        self._cursor = cursor
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        value = row[index.column()]
+        if role == Qt.DisplayRole:
+            if value is None:
+                return ""
+            if HISTORY_COLUMNS[index.column()] == "updated_at":
+                return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+            return str(value)
+        if role == Qt.ForegroundRole and HISTORY_COLUMNS[index.column()] == "state":
+            color = self.STATE_COLORS.get(value)
+            return QBrush(color) if color is not None else None
+        if role == Qt.ToolTipRole and value is not None:
+            return str(value)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        key = self.SORT_KEYS[column]
+        if key is None:
+            return
+        self.sort_key = key
+        self.descending = order == Qt.DescendingOrder
+        self.reload()
+
+
+class HistoryTab(QWidget):
+    """转账历史：按链、币种、状态、地址过滤，滚动时分页加载"""
+    ALL = "全部"
+
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout()
+        filter_layout = QHBoxLayout()
+        font = QFont('微软雅黑', 12)
+        self.chain_combo = QComboBox(); self.chain_combo.setFont(font); self.chain_combo.setMinimumWidth(180)
+        self.coin_combo = QComboBox(); self.coin_combo.setFont(font); self.coin_combo.setMinimumWidth(120)
+        self.state_combo = QComboBox(); self.state_combo.setFont(font); self.state_combo.setMinimumWidth(120)
+        self.address_edit = QLineEdit(); self.address_edit.setFont(font)
+        self.address_edit.setPlaceholderText("发送或收款地址")
+        self.refresh_btn = QPushButton("刷新")
+        self.refresh_btn.setFixedSize(120, 40)
+        for label, widget in (("链名:", self.chain_combo), ("币种:", self.coin_combo), ("状态:", self.state_combo),
+                              ("地址:", self.address_edit)):
+            filter_label = QLabel(label)
+            filter_label.setFont(font)
+            filter_layout.addWidget(filter_label)
+            filter_layout.addWidget(widget)
+        filter_layout.addWidget(self.refresh_btn)
+        layout.addLayout(filter_layout)
+
+        self.model = HistoryTableModel()
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setFont(QFont('Consolas', 11))
+        self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().setSortIndicator(0, Qt.DescendingOrder)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        # 固定行高和列宽，避免按内容计算尺寸时遍历全部行
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(28)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+        self.count_label = QLabel()
+        self.count_label.setFont(font)
+        layout.addWidget(self.count_label)
+        self.setLayout(layout)
+
+        self.refresh_btn.clicked.connect(self.refresh)
+        for combo in (self.chain_combo, self.coin_combo, self.state_combo):
+            combo.activated.connect(self.apply_filters)
+        self.address_edit.returnPressed.connect(self.apply_filters)
+
+    def refresh(self):
+        """重新读取过滤选项和第一页数据（切换到历史页时调用）"""
+        if self.model.history is None:
+            if not os.path.exists(TX_JOURNAL.db_path):
+                return
+            self.model.history = TransferHistory(TX_JOURNAL.db_path)
+        for combo, column in ((self.chain_combo, "chain_name"), (self.coin_combo, "coin_name"),
+                              (self.state_combo, "state")):
+            current = combo.currentText()
+            combo.clear()
+            combo.addItems([self.ALL] + self.model.history.distinct(column))
+            combo.setCurrentText(current if current else self.ALL)
+        self.apply_filters()
+
+    def apply_filters(self):
+        def value(combo):
+            return None if combo.currentText() == self.ALL else combo.currentText()
+        self.model.set_filters({'chain_name': value(self.chain_combo), 'coin_name': value(self.coin_combo),
+                                'state': value(self.state_combo), 'address': self.address_edit.text().strip()})
+        self.count_label.setText(f"共 {self.model.total()} 条")
+
+    def closeEvent(self, event):
+        if self.model.history is not None:
+            self.model.history.close()
+        event.accept()
+
+
+class LazyTab(QWidget):
+    """
+    标签页占位：第一次切换到该页时才创建实际页面
+
+    needs_services 为 True 的页面（钱包操作、转账）要用到后台加载的服务，加载完成前显示
+    "正在加载..."，加载完成后立即创建。页面创建后发出 built 信号。
+    """
+    built = pyqtSignal(object)
+
+    def __init__(self, factory, needs_services=False):
+        super().__init__()
+        self.factory = factory
+        self.needs_services = needs_services
+        self.widget = None
+        self._waiting = False
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.placeholder = QLabel("正在加载...")
+        self.placeholder.setFont(QFont('微软雅黑', 14))
+        self.placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.placeholder)
+        self.setLayout(layout)
+
+    def ensure_built(self):
+        """创建页面（已创建时直接返回），服务未加载完成时返回None"""
+        if self.widget is not None:
+            return self.widget
+        if self.needs_services and not SERVICES.is_loaded:
+            if not self._waiting:
+                self._waiting = True
+                SERVICES.loaded.connect(self.ensure_built)
+                SERVICES.start()
+            return None
+        if self.needs_services and SERVICES.load_error:
+            self.placeholder.setText(f"加载失败: {SERVICES.load_error}")
+            return None
+        self.widget = self.factory()
+        self.layout().removeWidget(self.placeholder)
+        self.placeholder.deleteLater()
+        self.layout().addWidget(self.widget)
+        self.built.emit(self.widget)
+        return self.widget
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.ensure_built()
+
+
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
+        self.window_started = time.perf_counter()
+        self.first_painted = False
         self.setWindowTitle("MyWalletTool 钱包工具")
         self.resize(1200, 800)
         
@@ -831,16 +1709,21 @@ class MainWindow(QWidget):
         
         self.log_widget = LogWidget()
         
-        # 创建各个标签页
+        # 创建各个标签页：首页立即创建，其他页第一次显示时才创建
         self.home_tab = HomeTab()
-        self.config_tab = ConfigTab()
-        self.wallet_tab = WalletTab(self.log_widget)
-        self.transfer_tab = TransferTab(self.log_widget)
+        self.config_tab = LazyTab(ConfigTab)
+        self.wallet_tab = LazyTab(lambda: WalletTab(self.log_widget), needs_services=True)
+        self.transfer_tab = LazyTab(lambda: TransferTab(self.log_widget), needs_services=True)
+        self.metrics_tab = LazyTab(MetricsTab)
+        self.history_tab = LazyTab(HistoryTab)
+        self.history_tab.built.connect(lambda tab: tab.refresh())
         
         self.tabs.addTab(self.home_tab, "首页")
         self.tabs.addTab(self.config_tab, "配置")
         self.tabs.addTab(self.wallet_tab, "钱包操作")
         self.tabs.addTab(self.transfer_tab, "转账")
+        self.tabs.addTab(self.metrics_tab, "监控")
+        self.tabs.addTab(self.history_tab, "历史")
         
         # 监听标签页切换事件，用于刷新配置
         self.tabs.currentChanged.connect(self.on_tab_changed)
@@ -859,19 +1742,54 @@ class MainWindow(QWidget):
         
         self.setLayout(main_layout)
         
-        # 记录启动时间
-        self.log_widget.append_log("GUI启动成功")
+        self.window_built = time.perf_counter()
+        SERVICES.loaded.connect(self.on_services_loaded)
+    
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_painted:
+            self.first_painted = True
+            # 首次绘制完成后再记录日志和开始后台加载，不推迟窗口显示
+            QTimer.singleShot(0, self.on_first_paint)
+    
+    def on_first_paint(self):
+        """记录启动耗时：导入模块、创建窗口、首次绘制（从进程启动算起）"""
+        painted = time.perf_counter()
+        self.log_widget.append_log(
+            f"GUI启动成功，首次绘制用时 {(painted - STARTUP_STARTED) * 1000:.0f}ms"
+            f"（导入 {(IMPORTS_DONE - STARTUP_STARTED) * 1000:.0f}ms，"
+            f"创建窗口 {(self.window_built - self.window_started) * 1000:.0f}ms，"
+            f"绘制 {(painted - self.window_built) * 1000:.0f}ms）")
+        SERVICES.start()
+    
+    def on_services_loaded(self):
+        if SERVICES.load_error:
+            self.log_widget.append_log(f"后台服务加载失败: {SERVICES.load_error}")
+        else:
+            self.log_widget.append_log(f"后台服务加载完成，用时 {SERVICES.load_seconds * 1000:.0f}ms")
     
     def on_tab_changed(self, index):
         """标签页切换事件"""
-        if index == 3:  # 转账标签页
+        tab = self.tabs.widget(index)
+        if not isinstance(tab, LazyTab) or tab.widget is None:
+            # 第一次显示，创建时已读取最新配置
+            return
+        if tab is self.transfer_tab:
             # 刷新转账页面的配置
-            self.transfer_tab.refresh_configs()
-            self.transfer_tab.init_evm_chain_combo()
+            transfer_tab = tab.widget
+            transfer_tab.refresh_configs()
+            transfer_tab.init_evm_chain_combo()
+            transfer_tab.batch_panel.init_chain_combo()
+        elif tab is self.history_tab:
+            tab.widget.refresh()
     
     def closeEvent(self, event):
         """关闭事件"""
         self.log_widget.append_log("GUI正在关闭...")
+        if self.transfer_tab.widget is not None:
+            self.transfer_tab.widget.batch_panel.shutdown()
+        SERVICES.close()
+        TX_JOURNAL.close()
         self.log_widget.flush_log_buffer()
         event.accept()
 